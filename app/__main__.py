@@ -1,10 +1,21 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi_pagination import add_pagination
 from uvicorn import run
 
 from app.config import DefaultSettings, get_settings
+from app.db.connection import (
+    PoolUsageMiddleware,
+    SlowQueryRouteMiddleware,
+    slow_query_recorder,
+)
 from app.routes import list_of_routes as api_routes
+from app.services.admission import AdmissionController, AdmissionMiddleware, RateLimiter
+from app.services.audit import audit_writer
+from app.services.change_feed import ChangeFeed
+from app.services.jobs import JobRunner
 from app.utils.common import get_hostname
 
 
@@ -19,6 +30,36 @@ def bind_routes(application: FastAPI, setting: DefaultSettings) -> None:
     #     application.include_router(route, prefix=setting.PATH_PREFIX_FRONTEND)
 
 
+@asynccontextmanager
+async def lifespan(application: FastAPI):
+    """
+    Starts and stops background subsystems together with the application.
+    """
+    settings = application.state.settings
+    await slow_query_recorder.start()
+    await audit_writer.start()
+    job_runner = None
+    if settings.JOB_ENABLED:
+        job_runner = JobRunner(settings)
+        await job_runner.start()
+        application.state.job_runner = job_runner
+    change_feed = None
+    if settings.CHANGE_FEED_ENABLED:
+        change_feed = ChangeFeed(settings)
+        await change_feed.start()
+        application.state.change_feed = change_feed
+
+    yield
+
+    if change_feed is not None:
+        await change_feed.stop()
+    if job_runner is not None:
+        await job_runner.stop()
+    # after everything which writes, the buffered entries are written on stop
+    await audit_writer.stop()
+    await slow_query_recorder.stop()
+
+
 def get_app() -> FastAPI:
     """
     Creates application and all dependable objects.
@@ -39,10 +80,21 @@ def get_app() -> FastAPI:
         openapi_url="/openapi",
         version="0.1.0",
         openapi_tags=tags_metadata,
+        lifespan=lifespan,
     )
     settings = get_settings()
     bind_routes(application, settings)
     add_pagination(application)
+    application.add_middleware(SlowQueryRouteMiddleware)
+    application.add_middleware(PoolUsageMiddleware)
+    if settings.ADMISSION_ENABLED:
+        application.state.admission = AdmissionController.from_settings(settings)
+        application.add_middleware(
+            AdmissionMiddleware,
+            controller=application.state.admission,
+            rate_limiter=RateLimiter.from_settings(settings),
+            prefix=settings.PATH_PREFIX_API,
+        )
     application.state.settings = settings
     return application
 
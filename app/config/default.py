@@ -1,4 +1,6 @@
+import os
 import secrets
+import tempfile
 from os import environ
 from typing import ClassVar
 
@@ -19,6 +21,7 @@ class DefaultSettings(BaseSettings):
     PATH_PREFIX_FRONTEND: str = environ.get("PATH_PREFIX_FRONTEND", "/")
     API_HOST: str = environ.get("APP_HOST", "http://127.0.0.1")
     API_PORT: int = int(environ.get("API_PORT", 8000))
+    CLINIC_TIMEZONE: str = environ.get("CLINIC_TIMEZONE", "Europe/Moscow")
 
     POSTGRES_DB: str = environ.get("POSTGRES_DB", "bookmarker_db")
     POSTGRES_HOST: str = environ.get("POSTGRES_HOST", "localhost")
@@ -26,8 +29,140 @@ class DefaultSettings(BaseSettings):
     POSTGRES_PORT: int = int(environ.get("POSTGRES_PORT", "5432"))
     POSTGRES_PASSWORD: str = environ.get("POSTGRES_PASSWORD", "hackme")
     DB_CONNECT_RETRY: int = environ.get("DB_CONNECT_RETRY", 20)
-    DB_POOL_SIZE: int = environ.get("DB_POOL_SIZE", 15)
+    DB_POOL_SIZE: int = int(environ.get("DB_POOL_SIZE", 15))
     DB_ECHO: bool = environ.get("DB_ECHO", False)
+    # compiled statements kept by SQLAlchemy and server-side prepared statements per connection
+    DB_QUERY_CACHE_SIZE: int = int(environ.get("DB_QUERY_CACHE_SIZE", 1200))
+    DB_PREPARED_STATEMENT_CACHE_SIZE: int = int(environ.get("DB_PREPARED_STATEMENT_CACHE_SIZE", 500))
+    # Server-Timing header with the time a request held pooled connections
+    DB_SERVER_TIMING: bool = environ.get("DB_SERVER_TIMING", "true").lower() == "true"
+
+    SLOW_QUERY_ENABLED: bool = environ.get("SLOW_QUERY_ENABLED", "true").lower() == "true"
+    SLOW_QUERY_THRESHOLD_MS: float = float(environ.get("SLOW_QUERY_THRESHOLD_MS", 200))
+    SLOW_QUERY_BUFFER_SIZE: int = int(environ.get("SLOW_QUERY_BUFFER_SIZE", 200))
+    SLOW_QUERY_MAX_FINGERPRINTS: int = int(environ.get("SLOW_QUERY_MAX_FINGERPRINTS", 500))
+    SLOW_QUERY_EXPLAIN: bool = environ.get("SLOW_QUERY_EXPLAIN", "true").lower() == "true"
+    # a fingerprint is explained again after this interval
+    SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS: float = float(
+        environ.get("SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS", 300)
+    )
+    # required in the X-Admin-Token header of /admin and /audit endpoints, unset disables them
+    ADMIN_TOKEN: str = environ.get("ADMIN_TOKEN", "")
+
+    # requests running at once, defaults to DB_POOL_SIZE; see app/services/admission.py
+    ADMISSION_ENABLED: bool = environ.get("ADMISSION_ENABLED", "true").lower() == "true"
+    ADMISSION_CAPACITY: int = int(environ.get("ADMISSION_CAPACITY", 0))
+    # slots only writes may take
+    ADMISSION_WRITE_RESERVE: int = int(environ.get("ADMISSION_WRITE_RESERVE", 2))
+    ADMISSION_SEARCH_CONCURRENCY: int = int(environ.get("ADMISSION_SEARCH_CONCURRENCY", 6))
+    ADMISSION_REPORT_CONCURRENCY: int = int(environ.get("ADMISSION_REPORT_CONCURRENCY", 3))
+    # waiting requests per class and how long they may wait before a 503
+    ADMISSION_QUEUE_SIZE: int = int(environ.get("ADMISSION_QUEUE_SIZE", 50))
+    ADMISSION_MAX_WAIT_SECONDS: float = float(environ.get("ADMISSION_MAX_WAIT_SECONDS", 2))
+    # per caller token bucket, 0 (the default) disables rate limiting; reports (exports,
+    # analytics) take RATE_LIMIT_REPORT_COST. Callers are told apart by the user authenticated
+    # by the proxy or their address, forwarded by TRUSTED_PROXIES
+    RATE_LIMIT_PER_SECOND: float = float(environ.get("RATE_LIMIT_PER_SECOND", 0))
+    RATE_LIMIT_BURST: float = float(environ.get("RATE_LIMIT_BURST", 40))
+    RATE_LIMIT_REPORT_COST: float = float(environ.get("RATE_LIMIT_REPORT_COST", 5))
+
+    # comma separated addresses or networks of reverse proxies whose X-Forwarded-For
+    # and X-Real-IP headers are believed
+    TRUSTED_PROXIES: str = environ.get("TRUSTED_PROXIES", "127.0.0.1,::1")
+
+    # comma separated "host:port" list of streaming replicas used by read-only endpoints
+    DB_REPLICA_HOSTS: str = environ.get("DB_REPLICA_HOSTS", "")
+    DB_REPLICA_MAX_LAG_SECONDS: float = float(environ.get("DB_REPLICA_MAX_LAG_SECONDS", 5))
+    DB_REPLICA_LAG_CHECK_SECONDS: float = float(environ.get("DB_REPLICA_LAG_CHECK_SECONDS", 2))
+    # reads of a caller go to the primary this long after its write, the writes are marked in
+    # RESULT_CACHE_GENERATIONS_PATH (kept for RESULT_CACHE_TTL_SECONDS) for all workers of a host
+    DB_READ_YOUR_WRITES_SECONDS: float = float(environ.get("DB_READ_YOUR_WRITES_SECONDS", 10))
+
+    # batched backfills in migrations, see app/db/migrator/online.py
+    MIGRATION_BATCH_SIZE: int = int(environ.get("MIGRATION_BATCH_SIZE", 5000))
+    MIGRATION_BATCH_SLEEP_SECONDS: float = float(environ.get("MIGRATION_BATCH_SLEEP_SECONDS", 0.1))
+
+    # audit entries are written with COPY in batches of this size or after the interval
+    AUDIT_ENABLED: bool = environ.get("AUDIT_ENABLED", "true").lower() == "true"
+    AUDIT_BATCH_SIZE: int = int(environ.get("AUDIT_BATCH_SIZE", 500))
+    AUDIT_FLUSH_INTERVAL_SECONDS: float = float(environ.get("AUDIT_FLUSH_INTERVAL_SECONDS", 1))
+    AUDIT_MAX_BUFFER: int = int(environ.get("AUDIT_MAX_BUFFER", 100_000))
+
+    IDEMPOTENCY_TTL_SECONDS: int = int(environ.get("IDEMPOTENCY_TTL_SECONDS", 24 * 60 * 60))
+    IDEMPOTENCY_CACHE_SIZE: int = int(environ.get("IDEMPOTENCY_CACHE_SIZE", 10_000))
+    IDEMPOTENCY_WAIT_SECONDS: float = float(environ.get("IDEMPOTENCY_WAIT_SECONDS", 5))
+    # a key stays claimed this long without a stored response, then a retry may take it over
+    # (its worker died); must outlast the slowest write
+    IDEMPOTENCY_LEASE_SECONDS: float = float(
+        environ.get("IDEMPOTENCY_LEASE_SECONDS", IDEMPOTENCY_WAIT_SECONDS * 6)
+    )
+
+    JOB_ENABLED: bool = environ.get("JOB_ENABLED", "true").lower() == "true"
+    # jobs use their own pool of this size, so they never take connections from requests
+    JOB_CONCURRENCY: int = int(environ.get("JOB_CONCURRENCY", 2))
+    JOB_POLL_SECONDS: float = float(environ.get("JOB_POLL_SECONDS", 2))
+    # a running job sends a heartbeat every third of this, silent longer it is claimed again
+    JOB_STALE_SECONDS: int = int(environ.get("JOB_STALE_SECONDS", 300))
+    # claims of a job whose worker keeps stopping (out of memory) before it fails
+    JOB_MAX_ATTEMPTS: int = int(environ.get("JOB_MAX_ATTEMPTS", 3))
+    # large results (CSV export) are stored in the database in chunks of this size,
+    # finished jobs and their results are deleted after the retention
+    JOB_RESULT_CHUNK_BYTES: int = int(environ.get("JOB_RESULT_CHUNK_BYTES", 1024 * 1024))
+    JOB_RETENTION_DAYS: int = int(environ.get("JOB_RETENTION_DAYS", 7))
+
+    CHANGE_FEED_ENABLED: bool = environ.get("CHANGE_FEED_ENABLED", "true").lower() == "true"
+    CHANGE_FEED_QUEUE_SIZE: int = int(environ.get("CHANGE_FEED_QUEUE_SIZE", 1000))
+    CHANGE_FEED_RESUME_LIMIT: int = int(environ.get("CHANGE_FEED_RESUME_LIMIT", 500))
+    CHANGE_FEED_KEEPALIVE_SECONDS: float = float(environ.get("CHANGE_FEED_KEEPALIVE_SECONDS", 15))
+
+    DASHBOARD_CACHE_SECONDS: float = float(environ.get("DASHBOARD_CACHE_SECONDS", 5))
+    DASHBOARD_UPCOMING_LIMIT: int = int(environ.get("DASHBOARD_UPCOMING_LIMIT", 10))
+
+    # /sync: rows per entity in one response, changes wait for the next request until every
+    # transaction open when they were stamped has ended and for at least the lag (a margin),
+    # tokens and tombstones expire
+    SYNC_PAGE_SIZE: int = int(environ.get("SYNC_PAGE_SIZE", 500))
+    SYNC_SAFETY_LAG_SECONDS: float = float(environ.get("SYNC_SAFETY_LAG_SECONDS", 5))
+    SYNC_TOMBSTONE_RETENTION_DAYS: int = int(environ.get("SYNC_TOMBSTONE_RETENTION_DAYS", 30))
+
+    # Parquet export of visits (python -m app.utils.export, job "export_visits_parquet"),
+    # rows per record batch bound the memory used
+    EXPORT_DIR: str = environ.get("EXPORT_DIR", "exports/visits")
+    EXPORT_BATCH_SIZE: int = int(environ.get("EXPORT_BATCH_SIZE", 50_000))
+    EXPORT_PARQUET_COMPRESSION: str = environ.get("EXPORT_PARQUET_COMPRESSION", "zstd")
+
+    # /analytics: visit arrays are refreshed with changes at most this often,
+    # doctor utilization counts this many working hours per weekday
+    ANALYTICS_REFRESH_SECONDS: float = float(environ.get("ANALYTICS_REFRESH_SECONDS", 30))
+    ANALYTICS_WORKDAY_HOURS: float = float(environ.get("ANALYTICS_WORKDAY_HOURS", 8))
+
+    # dedup_clients job: blocks with more clients than this are too common to tell anything,
+    # pairs scoring below the minimum are not suggested, phones compare by their last digits
+    DEDUP_MAX_BLOCK_SIZE: int = int(environ.get("DEDUP_MAX_BLOCK_SIZE", 50))
+    DEDUP_MIN_SCORE: float = float(environ.get("DEDUP_MIN_SCORE", 0.7))
+    DEDUP_PHONE_SUFFIX_DIGITS: int = int(environ.get("DEDUP_PHONE_SUFFIX_DIGITS", 7))
+
+    # visit pages and client/doctor searches: results per worker, validated by generation
+    # counters in a SQLite file shared by the workers of a host, the TTL is only a backstop
+    # for writes made outside the application. Memory is bounded by count, not bytes: up to
+    # RESULT_CACHE_SIZE results of at most RESULT_CACHE_MAX_ROWS rows (larger ones are not kept)
+    RESULT_CACHE_ENABLED: bool = environ.get("RESULT_CACHE_ENABLED", "true").lower() == "true"
+    RESULT_CACHE_SIZE: int = int(environ.get("RESULT_CACHE_SIZE", 2000))
+    RESULT_CACHE_MAX_ROWS: int = int(environ.get("RESULT_CACHE_MAX_ROWS", 200))
+    RESULT_CACHE_TTL_SECONDS: float = float(environ.get("RESULT_CACHE_TTL_SECONDS", 600))
+    RESULT_CACHE_GENERATIONS_PATH: str = environ.get(
+        "RESULT_CACHE_GENERATIONS_PATH",
+        os.path.join(tempfile.gettempdir(), "medcenter_generations.sqlite3"),
+    )
+
+    # occurrences of one recurring visit series
+    SERIES_MAX_OCCURRENCES: int = int(environ.get("SERIES_MAX_OCCURRENCES", 100))
+
+    # ids accepted by the /batch endpoints in one request
+    BATCH_MAX_IDS: int = int(environ.get("BATCH_MAX_IDS", 100))
+
+    # "capped" and "estimate" visit counts stop counting exactly above this number
+    VISIT_COUNT_CAP: int = int(environ.get("VISIT_COUNT_CAP", 10_000))
 
     # to get a string like this run: "openssl rand -hex 32"
     SECRET_KEY: str = environ.get("SECRET_KEY", secrets.token_hex(32))
@@ -57,6 +192,31 @@ class DefaultSettings(BaseSettings):
             **self.database_settings,
         )
 
+    @property
+    def engine_options(self) -> dict:
+        return {
+            "echo": self.DB_ECHO,
+            "future": True,
+            "query_cache_size": self.DB_QUERY_CACHE_SIZE,
+            "connect_args": {
+                "prepared_statement_cache_size": self.DB_PREPARED_STATEMENT_CACHE_SIZE,
+            },
+        }
+
+    @property
+    def replica_database_uris(self) -> list[str]:
+        """
+        Get uris for connection with read-only replicas.
+        """
+        uris = []
+        for replica in filter(None, map(str.strip, self.DB_REPLICA_HOSTS.split(","))):
+            host, _, port = replica.partition(":")
+            settings = self.database_settings | {"host": host, "port": port or self.POSTGRES_PORT}
+            uris.append(
+                "postgresql+asyncpg://{user}:{password}@{host}:{port}/{database}".format(**settings)
+            )
+        return uris
+
     @property
     def database_uri_sync(self) -> str:
         """
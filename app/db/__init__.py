@@ -1,6 +1,8 @@
 from sqlalchemy import MetaData
 from sqlalchemy.orm import declarative_base
 
+from .explain import Explain
+
 convention = {
     "all_column_names": lambda constraint, table: "_".join(
         [str(column.name) for column in constraint.columns.values()]
@@ -17,4 +19,5 @@ DeclarativeBase = declarative_base(metadata=metadata)
 
 __all__ = [
     "DeclarativeBase",
+    "Explain",
 ]
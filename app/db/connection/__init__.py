@@ -1,6 +1,15 @@
-from .session import SessionManager, get_session
+from .lazy_session import LazySession
+from .pool_usage import PoolUsageMiddleware, pool_usage_recorder
+from .session import SessionManager, get_read_session, get_session
+from .slow_queries import SlowQueryRouteMiddleware, slow_query_recorder
 
 __all__ = [
     "get_session",
+    "get_read_session",
+    "LazySession",
+    "PoolUsageMiddleware",
+    "pool_usage_recorder",
     "SessionManager",
+    "SlowQueryRouteMiddleware",
+    "slow_query_recorder",
 ]
@@ -0,0 +1,90 @@
+from typing import Any
+
+from sqlalchemy import Select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import SessionTransactionOrigin
+
+from app.db.explain import Explain
+
+
+class LazySession(AsyncSession):
+    """
+    AsyncSession which gives its connection back to the pool as soon as a read finishes.
+
+    Like any AsyncSession it takes a connection on the first statement only, so requests
+    answered from a cache or rejected before querying never touch the pool. After a plain
+    SELECT in an implicit transaction it commits, the rows are already buffered and
+    objects stay loaded (sessions are made with expire_on_commit=False). A session that
+    writes, locks rows, streams or was begun explicitly keeps its connection until
+    commit, rollback or close, as before.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self._pinned = False
+
+    async def execute(self, statement, *args: Any, **kwargs: Any):
+        self._pin_unless(_is_read(statement))
+        result = await super().execute(statement, *args, **kwargs)
+        await self._release_if_idle()
+        return result
+
+    async def scalar(self, statement, *args: Any, **kwargs: Any):
+        self._pin_unless(_is_read(statement))
+        result = await super().scalar(statement, *args, **kwargs)
+        await self._release_if_idle()
+        return result
+
+    async def get(self, *args: Any, **kwargs: Any):
+        self._pin_unless(not kwargs.get("with_for_update"))
+        result = await super().get(*args, **kwargs)
+        await self._release_if_idle()
+        return result
+
+    async def refresh(self, *args: Any, **kwargs: Any) -> None:
+        self._pin_unless(not kwargs.get("with_for_update"))
+        await super().refresh(*args, **kwargs)
+        await self._release_if_idle()
+
+    async def stream(self, *args: Any, **kwargs: Any):
+        # a server-side cursor lives as long as its transaction
+        self._pinned = True
+        return await super().stream(*args, **kwargs)
+
+    async def stream_scalars(self, *args: Any, **kwargs: Any):
+        self._pinned = True
+        return await super().stream_scalars(*args, **kwargs)
+
+    async def commit(self) -> None:
+        await super().commit()
+        self._pinned = False
+
+    async def rollback(self) -> None:
+        await super().rollback()
+        self._pinned = False
+
+    async def close(self) -> None:
+        await super().close()
+        self._pinned = False
+
+    def _pin_unless(self, read: bool) -> None:
+        # autoflush of pending objects writes in the statement's transaction
+        if not read or self.new or self.dirty or self.deleted:
+            self._pinned = True
+
+    async def _release_if_idle(self) -> None:
+        if self._pinned or self.in_nested_transaction():
+            return
+        transaction = self.sync_session.get_transaction()
+        if transaction is None or transaction.origin is not SessionTransactionOrigin.AUTOBEGIN:
+            return
+        await self.commit()
+
+
+def _is_read(statement: Any) -> bool:
+    """
+    Text statements may call functions which write, they are not treated as reads.
+    """
+    if isinstance(statement, Explain):
+        return True
+    return isinstance(statement, Select) and statement._for_update_arg is None
@@ -0,0 +1,129 @@
+import contextvars
+import time
+from dataclasses import dataclass, field
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.config import get_settings
+
+# connections taken by the request being served (set by PoolUsageMiddleware)
+current_pool_usage: contextvars.ContextVar["PoolUsage | None"] = contextvars.ContextVar(
+    "current_pool_usage", default=None
+)
+
+
+@dataclass
+class PoolUsage:
+    checkouts: int = 0
+    held_seconds: float = 0
+    # id of the connection record -> perf_counter() of its checkout
+    holding: dict[int, float] = field(default_factory=dict)
+
+    def held_until(self, now: float) -> float:
+        return self.held_seconds + sum(now - started for started in self.holding.values())
+
+
+class PoolUsageRecorder:
+    """
+    Measures how long requests hold pooled connections, from checkout to checkin.
+    """
+
+    def __init__(self) -> None:
+        self.engines: list[AsyncEngine] = []
+        self.checkouts = 0
+        self.held_seconds = 0.0
+        self.requests = 0
+        self.requests_without_connection = 0
+        self.request_held_seconds_max = 0.0
+
+    def attach(self, engine: AsyncEngine) -> None:
+        self.engines.append(engine)
+        event.listen(engine.sync_engine, "checkout", self._on_checkout)
+        event.listen(engine.sync_engine, "checkin", self._on_checkin)
+
+    def observe_request(self, usage: PoolUsage) -> None:
+        held = usage.held_until(time.perf_counter())
+        self.requests += 1
+        if not usage.checkouts:
+            self.requests_without_connection += 1
+        self.request_held_seconds_max = max(self.request_held_seconds_max, held)
+
+    def render_metrics(self) -> str:
+        """
+        Prometheus text exposition of pool occupancy.
+        """
+        lines = [
+            "# TYPE medcenter_db_pool_checkouts_total counter",
+            f"medcenter_db_pool_checkouts_total {self.checkouts}",
+            "# TYPE medcenter_db_pool_held_seconds_sum counter",
+            f"medcenter_db_pool_held_seconds_sum {round(self.held_seconds, 6)}",
+            "# TYPE medcenter_db_requests_total counter",
+            f"medcenter_db_requests_total {self.requests}",
+            "# TYPE medcenter_db_requests_without_connection_total counter",
+            f"medcenter_db_requests_without_connection_total {self.requests_without_connection}",
+            "# TYPE medcenter_db_request_held_seconds_max gauge",
+            f"medcenter_db_request_held_seconds_max {round(self.request_held_seconds_max, 6)}",
+            "# TYPE medcenter_db_pool_checked_out gauge",
+        ]
+        for engine in self.engines:
+            lines.append(
+                f'medcenter_db_pool_checked_out{{host="{engine.url.host}:{engine.url.port}"}} '
+                f"{engine.pool.checkedout()}"
+            )
+        return "\n".join(lines) + "\n"
+
+    def _on_checkout(self, _dbapi_connection, connection_record, _connection_proxy) -> None:
+        usage = current_pool_usage.get()
+        started = time.perf_counter()
+        connection_record.info["pool_usage"] = (usage, started)
+        if usage is not None:
+            usage.checkouts += 1
+            usage.holding[id(connection_record)] = started
+
+    def _on_checkin(self, _dbapi_connection, connection_record) -> None:
+        usage, started = connection_record.info.pop("pool_usage", (None, None))
+        if started is None:
+            return
+        held = time.perf_counter() - started
+        self.checkouts += 1
+        self.held_seconds += held
+        if usage is not None:
+            usage.holding.pop(id(connection_record), None)
+            usage.held_seconds += held
+
+
+class PoolUsageMiddleware:
+    """
+    Tracks the connections taken by each request and reports them in a Server-Timing
+    header: time connections were held so far and the number of checkouts.
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+        self.server_timing = get_settings().DB_SERVER_TIMING
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        usage = PoolUsage()
+        token = current_pool_usage.set(usage)
+
+        async def send_with_timing(message) -> None:
+            if message["type"] == "http.response.start" and self.server_timing:
+                held_ms = usage.held_until(time.perf_counter()) * 1000
+                message["headers"] = [*message.get("headers", ()), (
+                    b"server-timing",
+                    f'db-pool;dur={held_ms:.1f};desc="checkouts {usage.checkouts}"'.encode(),
+                )]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            current_pool_usage.reset(token)
+            pool_usage_recorder.observe_request(usage)
+
+
+pool_usage_recorder = PoolUsageRecorder()
@@ -1,7 +1,58 @@
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+import asyncio
+import itertools
+import logging
+import sqlite3
+import time
+
+from fastapi import Request
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
 
 from app.config import get_settings
+from app.services.result_cache import result_cache
+from app.utils.common import caller_key, skip_coalescing
+
+from .lazy_session import LazySession
+from .pool_usage import pool_usage_recorder
+from .slow_queries import slow_query_recorder
+
+logger = logging.getLogger(__name__)
+
+SAFE_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+REPLICA_LAG_QUERY = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+
+class ReplicaState:
+    """
+    Read-only replica with the last measured replication lag.
+    """
+
+    def __init__(self, engine: AsyncEngine) -> None:
+        self.engine = engine
+        self.session_maker = sessionmaker(engine, class_=LazySession, expire_on_commit=False)
+        self.lag: float = float("inf")
+        self.checked_at: float = float("-inf")
+        self.lock = asyncio.Lock()
+
+    async def refresh_lag(self, check_interval: float) -> float:
+        if time.monotonic() - self.checked_at < check_interval:
+            return self.lag
+        async with self.lock:
+            if time.monotonic() - self.checked_at < check_interval:
+                return self.lag
+            try:
+                async with self.engine.connect() as conn:
+                    self.lag = float(await conn.scalar(REPLICA_LAG_QUERY))
+            except Exception:
+                logger.warning("Replica %s is unavailable", self.engine.url.host, exc_info=True)
+                self.lag = float("inf")
+            self.checked_at = time.monotonic()
+        return self.lag
 
 
 class SessionManager:
@@ -11,7 +62,8 @@ class SessionManager:
     """
 
     def __init__(self) -> None:
-        self.refresh()
+        if not hasattr(self, "engine"):
+            self.refresh()
 
     def __new__(cls):
         if not hasattr(cls, "instance"):
@@ -19,13 +71,104 @@ class SessionManager:
         return cls.instance  # noqa
 
     def get_session_maker(self) -> sessionmaker:
-        return sessionmaker(self.engine, class_=AsyncSession, expire_on_commit=False)
+        return self.session_maker
+
+    async def get_read_session_maker(self, wrote_recently: bool = False) -> sessionmaker:
+        """
+        Round-robins over replicas which lag less than allowed.
+        Falls back to the primary when there is no such replica
+        or when the caller has written recently.
+        """
+        if not self.replicas or wrote_recently:
+            return self.session_maker
+
+        settings = get_settings()
+        for _ in range(len(self.replicas)):
+            replica = next(self._replica_cycle)
+            lag = await replica.refresh_lag(settings.DB_REPLICA_LAG_CHECK_SECONDS)
+            if lag <= settings.DB_REPLICA_MAX_LAG_SECONDS:
+                return replica.session_maker
+        return self.session_maker
+
+    async def mark_write(self, caller: str) -> None:
+        """
+        Remembers the write in the generation file of the result cache, which every
+        worker of the host reads, so the next read goes to the primary whichever worker
+        serves it.
+        """
+        try:
+            await asyncio.to_thread(result_cache.generations.bump, [_writer_scope(caller)])
+        except sqlite3.Error:
+            logger.exception("Could not mark a write of %s", caller)
+
+    async def wrote_recently(self, caller: str) -> bool:
+        try:
+            marks = await asyncio.to_thread(
+                result_cache.generations.read, [_writer_scope(caller)]
+            )
+        except sqlite3.Error:
+            logger.exception("Could not read writes of %s", caller)
+            return False
+        _, marked_at = marks.get(_writer_scope(caller), (0, float("-inf")))
+        return marked_at > time.time() - get_settings().DB_READ_YOUR_WRITES_SECONDS
 
     def refresh(self) -> None:
-        self.engine = create_async_engine(get_settings().database_uri, echo=get_settings().DB_ECHO, future=True)
+        settings = get_settings()
+        self.engine = create_async_engine(
+            settings.database_uri, pool_size=settings.DB_POOL_SIZE, **settings.engine_options
+        )
+        self.session_maker = sessionmaker(self.engine, class_=LazySession, expire_on_commit=False)
+        self.replicas = [
+            ReplicaState(
+                create_async_engine(uri, pool_size=settings.DB_POOL_SIZE, **settings.engine_options)
+            )
+            for uri in settings.replica_database_uris
+        ]
+        for engine in (self.engine, *(replica.engine for replica in self.replicas)):
+            slow_query_recorder.attach(engine)
+            pool_usage_recorder.attach(engine)
+        self._replica_cycle = itertools.cycle(self.replicas)
+
+
+def _writer_scope(caller: str) -> str:
+    return f"writer:{caller}"
+
+
+def get_caller_key(request: Request) -> str | None:
+    """
+    Identifies the caller for read-your-writes stickiness: X-Client-Id, which the SPA sends
+    per browser tab, or the client address forwarded by TRUSTED_PROXIES.
+    """
+    return caller_key(request.scope)
 
 
-async def get_session() -> AsyncSession:
-    session_maker = SessionManager().get_session_maker()
+async def get_session(request: Request) -> AsyncSession:
+    """
+    A LazySession: no connection is taken until the first statement
+    and reads give it back as soon as they finish.
+    """
+    manager = SessionManager()
+    caller = get_caller_key(request)
+    writes = bool(caller) and request.method not in SAFE_METHODS
+    if writes:
+        await manager.mark_write(caller)
+    async with manager.get_session_maker()() as session:
+        yield session
+    if writes:
+        # again once the write is over, a long one would outlast the first mark
+        await manager.mark_write(caller)
+
+
+async def get_read_session(request: Request) -> AsyncSession:
+    """
+    A session on a replica, or on the primary for a caller who has written recently;
+    such a caller also does not join reads already running (SingleFlight).
+    """
+    manager = SessionManager()
+    caller = get_caller_key(request)
+    wrote_recently = bool(caller) and await manager.wrote_recently(caller)
+    if wrote_recently:
+        skip_coalescing.set(True)
+    session_maker = await manager.get_read_session_maker(wrote_recently)
     async with session_maker() as session:
-        yield session
\ No newline at end of file
+        yield session
@@ -0,0 +1,266 @@
+import asyncio
+import contextvars
+import datetime
+import decimal
+import hashlib
+import json
+import logging
+import re
+import time
+import uuid
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Any
+
+import asyncpg
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.config import DefaultSettings, get_settings
+
+logger = logging.getLogger(__name__)
+
+# ASGI scope of the request being served (set by SlowQueryRouteMiddleware)
+# or a {"method", "path"} stand-in of a background job
+current_scope: contextvars.ContextVar[dict | None] = contextvars.ContextVar(
+    "current_scope", default=None
+)
+
+EXPLAINABLE = re.compile(r"^\s*(SELECT|WITH|INSERT|UPDATE|DELETE)\b", re.IGNORECASE)
+FINGERPRINT_RULES = (
+    (re.compile(r"'(?:[^']|'')*'"), "?"),
+    (re.compile(r"\$\d+(?:::[\w\[\]]+)?"), "?"),
+    (re.compile(r"\b\d+(?:\.\d+)?\b"), "?"),
+    (re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)"), "(?, ...)"),
+    (re.compile(r"\s+"), " "),
+)
+MAX_ROUTES_PER_FINGERPRINT = 10
+MAX_REDACTED_ITEMS = 20
+
+
+@dataclass
+class SlowQuery:
+    fingerprint: str
+    statement: str
+    parameters: list[Any]
+    route: str | None
+    duration_ms: float
+    dt_captured: datetime.datetime
+
+
+@dataclass
+class FingerprintStats:
+    fingerprint: str
+    statement: str
+    count: int = 0
+    total_ms: float = 0
+    max_ms: float = 0
+    routes: Counter = field(default_factory=Counter)
+    plan: Any = None
+    dt_explained: float = float("-inf")
+    dt_last_seen: datetime.datetime | None = None
+
+
+class SlowQueryRecorder:
+    """
+    Keeps statements slower than SLOW_QUERY_THRESHOLD_MS in a ring buffer and aggregates
+    them by fingerprint. Plans are fetched by a background task on its own connection.
+    """
+
+    def __init__(self, settings: DefaultSettings) -> None:
+        self.enabled = settings.SLOW_QUERY_ENABLED
+        self.threshold_ms = settings.SLOW_QUERY_THRESHOLD_MS
+        self.max_fingerprints = settings.SLOW_QUERY_MAX_FINGERPRINTS
+        self.explain_enabled = settings.SLOW_QUERY_EXPLAIN
+        self.explain_interval = settings.SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS
+        self.dsn = settings.database_uri_sync
+        self.recent: deque[SlowQuery] = deque(maxlen=settings.SLOW_QUERY_BUFFER_SIZE)
+        self.fingerprints: dict[str, FingerprintStats] = {}
+        self._explain_queue: asyncio.Queue[tuple[str, str, Any]] | None = None
+        self._task: asyncio.Task | None = None
+
+    def attach(self, engine: AsyncEngine) -> None:
+        if not self.enabled:
+            return
+        event.listen(engine.sync_engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(engine.sync_engine, "after_cursor_execute", self._after_cursor_execute)
+        event.listen(engine.sync_engine, "handle_error", self._handle_error)
+
+    async def start(self) -> None:
+        if self.enabled and self.explain_enabled:
+            self._explain_queue = asyncio.Queue(100)
+            self._task = asyncio.create_task(self._explain_forever(), name="slow-query-explain")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        self._explain_queue = None
+
+    def clear(self) -> None:
+        self.recent.clear()
+        self.fingerprints.clear()
+
+    def record(
+            self,
+            statement: str,
+            parameters: Any,
+            duration_ms: float,
+            route: str | None,
+    ) -> None:
+        fingerprint_statement = fingerprint_sql(statement)
+        fingerprint = hashlib.sha1(fingerprint_statement.encode()).hexdigest()[:16]
+        now = datetime.datetime.now(datetime.UTC)
+        self.recent.append(SlowQuery(
+            fingerprint=fingerprint,
+            statement=statement,
+            parameters=redact(parameters),
+            route=route,
+            duration_ms=round(duration_ms, 2),
+            dt_captured=now,
+        ))
+
+        stats = self.fingerprints.get(fingerprint)
+        if stats is None:
+            if len(self.fingerprints) >= self.max_fingerprints:
+                cheapest = min(self.fingerprints.values(), key=lambda item: item.total_ms)
+                del self.fingerprints[cheapest.fingerprint]
+            stats = self.fingerprints[fingerprint] = FingerprintStats(
+                fingerprint, fingerprint_statement
+            )
+        stats.count += 1
+        stats.total_ms += duration_ms
+        stats.max_ms = max(stats.max_ms, duration_ms)
+        stats.dt_last_seen = now
+        if route is not None and (
+                route in stats.routes or len(stats.routes) < MAX_ROUTES_PER_FINGERPRINT
+        ):
+            stats.routes[route] += 1
+
+        self._schedule_explain(stats, statement, parameters)
+
+    def _schedule_explain(self, stats: FingerprintStats, statement: str, parameters: Any) -> None:
+        if self._explain_queue is None or not EXPLAINABLE.match(statement):
+            return
+        if time.monotonic() - stats.dt_explained < self.explain_interval:
+            return
+        stats.dt_explained = time.monotonic()
+        try:
+            # real parameters live only until the plan is fetched, they are never stored
+            self._explain_queue.put_nowait((stats.fingerprint, statement, parameters))
+        except asyncio.QueueFull:
+            stats.dt_explained = float("-inf")
+
+    def _before_cursor_execute(self, conn, _cursor, _statement, _parameters, _context, _many):
+        conn.info.setdefault("slow_query_started", []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, _cursor, statement, parameters, _context, many):
+        duration_ms = (time.perf_counter() - conn.info["slow_query_started"].pop()) * 1000
+        if duration_ms < self.threshold_ms:
+            return
+        if many and parameters:
+            parameters = parameters[0]
+        try:
+            self.record(statement, parameters, duration_ms, route_name(current_scope.get()))
+        except Exception:
+            logger.exception("Could not record a slow query")
+
+    def _handle_error(self, context) -> None:
+        # a failed statement gets no after_cursor_execute, its start time is dropped here
+        if context.connection is None or context.statement is None:
+            return
+        started = context.connection.info.get("slow_query_started")
+        if started:
+            started.pop()
+
+    async def _explain_forever(self) -> None:
+        connection: asyncpg.Connection | None = None
+        try:
+            while True:
+                fingerprint, statement, parameters = await self._explain_queue.get()
+                try:
+                    if connection is None or connection.is_closed():
+                        connection = await asyncpg.connect(
+                            self.dsn, server_settings={"statement_timeout": "5000"}
+                        )
+                    plan = await connection.fetchval(
+                        f"EXPLAIN (FORMAT JSON) {statement}", *(parameters or ())
+                    )
+                    plan = json.loads(plan) if isinstance(plan, str) else plan
+                except Exception as e:
+                    logger.warning("Could not explain slow query %s: %s", fingerprint, e)
+                    plan = {"error": str(e)}
+                stats = self.fingerprints.get(fingerprint)
+                if stats is not None:
+                    stats.plan = plan
+        finally:
+            if connection is not None:
+                await connection.close()
+
+
+class SlowQueryRouteMiddleware:
+    """
+    Makes the request scope available to the recorder, the matched route is read from it
+    when a query is recorded.
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token = current_scope.set(scope)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_scope.reset(token)
+
+
+def fingerprint_sql(statement: str) -> str:
+    """
+    Statement with literals and parameters replaced by "?", IN lists collapsed.
+    """
+    for pattern, replacement in FINGERPRINT_RULES:
+        statement = pattern.sub(replacement, statement)
+    return statement.strip()
+
+
+def redact(value: Any) -> Any:
+    """
+    Keeps values which cannot identify a person: ids, numbers, timestamps, flags.
+    Strings are reduced to their length, dates (a date of birth) to their type.
+    """
+    if value is None or isinstance(value, bool | int | float):
+        return value
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, uuid.UUID | decimal.Decimal | datetime.datetime | datetime.time
+                  | datetime.timedelta):
+        return str(value)
+    if isinstance(value, datetime.date):
+        return "<date>"
+    if isinstance(value, str):
+        return f"<str len={len(value)}>"
+    if isinstance(value, list | tuple):
+        redacted = [redact(item) for item in value[:MAX_REDACTED_ITEMS]]
+        if len(value) > MAX_REDACTED_ITEMS:
+            redacted.append(f"<{len(value) - MAX_REDACTED_ITEMS} more>")
+        return redacted
+    if isinstance(value, dict):
+        return {key: redact(item) for key, item in value.items()}
+    return f"<{type(value).__name__}>"
+
+
+def route_name(scope: dict | None) -> str | None:
+    if scope is None:
+        return None
+    route = scope.get("route")
+    path = getattr(route, "path", None) or scope.get("path")
+    return f"{scope.get('method')} {path}"
+
+
+slow_query_recorder = SlowQueryRecorder(get_settings())
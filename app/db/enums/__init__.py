@@ -1,5 +1,9 @@
+from .audit import AuditActionEnum
+from .job import JobStatusEnum
 from .visit import VisitStatusEnum
 
 __all__ = [
+    "AuditActionEnum",
+    "JobStatusEnum",
     "VisitStatusEnum",
 ]
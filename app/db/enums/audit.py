@@ -0,0 +1,7 @@
+from enum import Enum
+
+
+class AuditActionEnum(str, Enum):
+    CREATE = "CREATE"
+    UPDATE = "UPDATE"
+    DELETE = "DELETE"
@@ -0,0 +1,8 @@
+from enum import Enum
+
+
+class JobStatusEnum(str, Enum):
+    QUEUED = "QUEUED"
+    RUNNING = "RUNNING"
+    DONE = "DONE"
+    FAILED = "FAILED"
@@ -0,0 +1,25 @@
+from typing import Any
+
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql import ClauseElement, Executable
+from sqlalchemy.sql.visitors import InternalTraversal
+
+
+class Explain(Executable, ClauseElement):
+    """
+    ``EXPLAIN (FORMAT JSON)`` of a statement, executed with the statement's parameters.
+    The single row holds the plan: ``[{"Plan": {"Plan Rows": ..., ...}}]``.
+    """
+
+    inherit_cache = True
+    _traverse_internals = [
+        ("statement", InternalTraversal.dp_clauseelement),
+    ]
+
+    def __init__(self, statement: Executable) -> None:
+        self.statement = statement
+
+
+@compiles(Explain, "postgresql")
+def _compile_explain(element: Explain, compiler: Any, **kw: Any) -> str:
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.statement, **kw)
@@ -4,6 +4,7 @@ from logging.config import fileConfig
 from alembic import context
 from app.config import get_settings
 from app.db import DeclarativeBase
+from app.db.migrator.online import CHECKPOINT_TABLE
 from app.db.models import *  # noqa
 from dotenv import load_dotenv
 from sqlalchemy.ext.asyncio import create_async_engine
@@ -38,6 +39,11 @@ target_metadata = DeclarativeBase.metadata
 # ... etc.
 
 
+def include_name(name, type_, parent_names) -> bool:
+    # backfill checkpoints are bookkeeping of app/db/migrator/online.py, not a model
+    return not (type_ == "table" and name == CHECKPOINT_TABLE)
+
+
 def run_migrations_offline() -> None:
     """Run migrations in 'offline' mode.
 
@@ -56,6 +62,7 @@ def run_migrations_offline() -> None:
         target_metadata=target_metadata,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
+        include_name=include_name,
     )
 
     with context.begin_transaction():
@@ -63,18 +70,25 @@ def run_migrations_offline() -> None:
 
 
 def run_migrations_online():
-    """Online migrations using asyncpg."""
+    """Online migrations using asyncpg.
+
+    Every revision runs in its own transaction, so a revision may leave it
+    (autocommit_block) for batched backfills and concurrent index builds.
+    """
     connectable = create_async_engine(DATABASE_URL, future=True)
 
     async def run_async_migrations():
-        async with connectable.begin() as conn:
+        async with connectable.connect() as conn:
             await conn.run_sync(do_run_migrations)
+        await connectable.dispose()
 
     def do_run_migrations(connection):
         context.configure(
             connection=connection,
             target_metadata=target_metadata,
             compare_type=True,
+            include_name=include_name,
+            transaction_per_migration=True,
         )
         with context.begin_transaction():
             context.run_migrations()
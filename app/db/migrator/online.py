@@ -0,0 +1,234 @@
+"""
+Helpers for revisions which must not lock big tables for long.
+
+- ``backfill`` updates rows in keyset batches, each committed on its own, and keeps a
+  checkpoint so an interrupted backfill resumes after the last committed batch.
+- ``create_index_concurrently`` / ``drop_index_concurrently`` run outside the
+  revision transaction.
+- ``add_*_not_valid`` + ``validate_constraint`` split a constraint into a short
+  exclusive lock and a validation which does not block writes, ``set_not_null``
+  uses the same trick.
+
+Statements in an autocommit block are committed immediately, so DDL before them
+has to be repeatable (``IF NOT EXISTS``) for a rerun of a failed revision to pass.
+"""
+import logging
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+import sqlalchemy as sa
+from alembic import op
+from app.config import get_settings
+from sqlalchemy.engine import Connection
+
+logger = logging.getLogger("alembic.online")
+
+CHECKPOINT_TABLE = "migration_checkpoint"
+PROGRESS_INTERVAL_SECONDS = 5
+
+
+def backfill(
+        name: str,
+        table: str,
+        set_clause: str,
+        where: str | None = None,
+        batch_size: int | None = None,
+        sleep_seconds: float | None = None,
+        key: str = "id",
+        key_type: str = "uuid",
+) -> int:
+    """
+    Runs ``UPDATE table SET set_clause`` over rows matching ``where`` in batches ordered by
+    ``key``. Every batch commits together with its checkpoint row ``name``, which is
+    removed when the backfill finishes. Returns the number of updated rows.
+    """
+    settings = get_settings()
+    batch_size = batch_size or settings.MIGRATION_BATCH_SIZE
+    if sleep_seconds is None:
+        sleep_seconds = settings.MIGRATION_BATCH_SLEEP_SECONDS
+
+    with _autocommit() as conn:
+        _ensure_checkpoint_table(conn)
+        checkpoint = conn.execute(
+            sa.text(f"SELECT last_key, rows_done FROM {CHECKPOINT_TABLE} WHERE name = :name"),
+            {"name": name},
+        ).first()
+        last_key, rows_done = checkpoint if checkpoint is not None else (None, 0)
+        if last_key is not None:
+            logger.info("%s: resuming after %s=%s, %d rows done", name, key, last_key, rows_done)
+
+        estimate = _estimate_rows(conn, table)
+        first_batch = _batch_stmt(table, set_clause, where, key, key_type, after_key=False)
+        next_batch = _batch_stmt(table, set_clause, where, key, key_type, after_key=True)
+        started = reported = time.monotonic()
+        started_rows = rows_done
+        while True:
+            row = conn.execute(
+                first_batch if last_key is None else next_batch,
+                {"name": name, "last_key": last_key, "batch_size": batch_size},
+            ).first()
+            if row is None:
+                break
+            last_key, rows_done = row
+
+            if time.monotonic() - reported >= PROGRESS_INTERVAL_SECONDS:
+                reported = time.monotonic()
+                rate = (rows_done - started_rows) / (reported - started)
+                logger.info(
+                    "%s: %d of ~%d rows, %.0f rows/s, %s=%s",
+                    name, rows_done, estimate, rate, key, last_key,
+                )
+            if sleep_seconds:
+                time.sleep(sleep_seconds)
+
+        conn.execute(
+            sa.text(f"DELETE FROM {CHECKPOINT_TABLE} WHERE name = :name"), {"name": name}
+        )
+    logger.info("%s: done, %d rows in %.1fs", name, rows_done, time.monotonic() - started)
+    return rows_done
+
+
+def create_index_concurrently(
+        name: str,
+        table: str,
+        columns: str,
+        unique: bool = False,
+        where: str | None = None,
+        using: str | None = None,
+) -> None:
+    """
+    ``CREATE INDEX CONCURRENTLY``, ``columns`` is the SQL between the parentheses.
+    An invalid index left by an interrupted build is dropped and built again.
+    """
+    with _autocommit() as conn:
+        invalid = conn.execute(
+            sa.text("SELECT NOT indisvalid FROM pg_index WHERE indexrelid = to_regclass(:name)"),
+            {"name": name},
+        ).scalar()
+        if invalid:
+            logger.warning("Index %s is invalid, rebuilding it", name)
+            conn.execute(sa.text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+
+        logger.info("Creating index %s on %s", name, table)
+        conn.execute(sa.text(
+            f"CREATE {'UNIQUE ' if unique else ''}INDEX CONCURRENTLY IF NOT EXISTS {name} "
+            f"ON {table} {f'USING {using} ' if using else ''}({columns})"
+            f"{f' WHERE {where}' if where else ''}"
+        ))
+
+
+def drop_index_concurrently(name: str) -> None:
+    with _autocommit() as conn:
+        conn.execute(sa.text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+
+
+def add_check_constraint_not_valid(name: str, table: str, condition: str) -> None:
+    """
+    Checks new and updated rows only, existing rows are checked by ``validate_constraint``.
+    """
+    op.execute(f"ALTER TABLE {table} ADD CONSTRAINT {name} CHECK ({condition}) NOT VALID")
+
+
+def add_foreign_key_not_valid(
+        name: str,
+        table: str,
+        columns: list[str],
+        referred_table: str,
+        referred_columns: list[str],
+        ondelete: str | None = None,
+) -> None:
+    op.execute(
+        f"ALTER TABLE {table} ADD CONSTRAINT {name} "
+        f"FOREIGN KEY ({', '.join(columns)}) "
+        f"REFERENCES {referred_table} ({', '.join(referred_columns)})"
+        f"{f' ON DELETE {ondelete}' if ondelete else ''} NOT VALID"
+    )
+
+
+def validate_constraint(name: str, table: str) -> None:
+    """
+    Scans existing rows in its own transaction under a lock which lets writes through.
+    """
+    with _autocommit() as conn:
+        logger.info("Validating constraint %s on %s", name, table)
+        conn.execute(sa.text(f"ALTER TABLE {table} VALIDATE CONSTRAINT {name}"))
+
+
+def set_not_null(table: str, column: str) -> None:
+    """
+    ``SET NOT NULL`` without a table scan under the exclusive lock: a validated
+    ``CHECK (column IS NOT NULL)`` proves it, then the check is dropped.
+    """
+    check = f"ck__{table}__{column}_not_null"
+    add_check_constraint_not_valid(check, table, f"{column} IS NOT NULL")
+    validate_constraint(check, table)
+    op.alter_column(table, column, nullable=False)
+    op.drop_constraint(check, table, type_="check")
+
+
+# --- HELPERS ---
+
+@contextmanager
+def _autocommit() -> Iterator[Connection]:
+    with op.get_context().autocommit_block():
+        yield op.get_bind()
+
+
+def _ensure_checkpoint_table(conn: Connection) -> None:
+    conn.execute(sa.text(f"""
+        CREATE TABLE IF NOT EXISTS {CHECKPOINT_TABLE} (
+            name TEXT PRIMARY KEY,
+            last_key TEXT NOT NULL,
+            rows_done BIGINT NOT NULL DEFAULT 0,
+            dt_updated TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+    """))
+
+
+def _estimate_rows(conn: Connection, table: str) -> int:
+    reltuples = conn.execute(
+        sa.text("SELECT reltuples FROM pg_class WHERE oid = to_regclass(:table)"),
+        {"table": table},
+    ).scalar()
+    return max(int(reltuples or 0), 0)
+
+
+def _batch_stmt(
+        table: str,
+        set_clause: str,
+        where: str | None,
+        key: str,
+        key_type: str,
+        after_key: bool,
+) -> sa.TextClause:
+    """
+    One statement per batch: select the next keys, update them and move the checkpoint.
+    Returns no row when there is nothing left.
+    """
+    conditions = [f"({where})"] if where else []
+    if after_key:
+        conditions.append(f"{key} > CAST(:last_key AS {key_type})")
+    return sa.text(f"""
+        WITH batch AS (
+            SELECT {key} FROM {table}
+            {f"WHERE {' AND '.join(conditions)}" if conditions else ""}
+            ORDER BY {key}
+            LIMIT :batch_size
+        ), updated AS (
+            UPDATE {table} SET {set_clause}
+            FROM batch
+            WHERE {table}.{key} = batch.{key}
+            RETURNING 1
+        ), checkpoint AS (
+            INSERT INTO {CHECKPOINT_TABLE} (name, last_key, rows_done)
+            SELECT :name, CAST(last.{key} AS TEXT), (SELECT count(*) FROM updated)
+            FROM (SELECT {key} FROM batch ORDER BY {key} DESC LIMIT 1) AS last
+            ON CONFLICT (name) DO UPDATE SET
+                last_key = EXCLUDED.last_key,
+                rows_done = {CHECKPOINT_TABLE}.rows_done + EXCLUDED.rows_done,
+                dt_updated = now()
+            RETURNING last_key, rows_done
+        )
+        SELECT last_key, rows_done FROM checkpoint
+    """)
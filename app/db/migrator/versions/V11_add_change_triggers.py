@@ -0,0 +1,96 @@
+"""add dt_updated and change notification triggers
+
+Revision ID: V11
+Revises: V10
+Create Date: 2026-10-19 14:55:30.204871
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'V11'
+down_revision: Union[str, None] = 'V10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = ('client', 'doctor', 'visit')
+CHANNEL = 'medcenter_changes'
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("""
+        CREATE OR REPLACE FUNCTION set_dt_updated() RETURNS trigger AS $$
+        BEGIN
+            IF NEW IS DISTINCT FROM OLD THEN
+                NEW.dt_updated = clock_timestamp();
+            END IF;
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+    op.execute(f"""
+        CREATE OR REPLACE FUNCTION notify_change() RETURNS trigger AS $$
+        DECLARE
+            row_data jsonb;
+            old_data jsonb;
+            payload jsonb;
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                row_data = to_jsonb(OLD);
+            ELSE
+                row_data = to_jsonb(NEW);
+            END IF;
+            payload = jsonb_build_object(
+                'table', TG_TABLE_NAME,
+                'op', TG_OP,
+                'id', row_data -> 'id',
+                'client_id', row_data -> 'client_id',
+                'doctor_id', row_data -> 'doctor_id',
+                'cabinet', row_data -> 'cabinet',
+                'start_date', row_data -> 'start_date',
+                'dt_updated', CASE WHEN TG_OP = 'DELETE' THEN to_jsonb(clock_timestamp())
+                                   ELSE row_data -> 'dt_updated' END
+            );
+            IF TG_OP = 'UPDATE' THEN
+                old_data = to_jsonb(OLD);
+                payload = payload || jsonb_build_object(
+                    'old_doctor_id', old_data -> 'doctor_id',
+                    'old_cabinet', old_data -> 'cabinet',
+                    'old_start_date', old_data -> 'start_date'
+                );
+            END IF;
+            PERFORM pg_notify('{CHANNEL}', jsonb_strip_nulls(payload)::text);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+    for table in TABLES:
+        op.execute(f"""
+            CREATE TRIGGER {table}_set_dt_updated
+            BEFORE UPDATE ON {table}
+            FOR EACH ROW EXECUTE FUNCTION set_dt_updated();
+        """)
+        op.execute(f"""
+            CREATE TRIGGER {table}_notify_change
+            AFTER INSERT OR DELETE ON {table}
+            FOR EACH ROW EXECUTE FUNCTION notify_change();
+        """)
+        op.execute(f"""
+            CREATE TRIGGER {table}_notify_update
+            AFTER UPDATE ON {table}
+            FOR EACH ROW WHEN (OLD.* IS DISTINCT FROM NEW.*) EXECUTE FUNCTION notify_change();
+        """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in TABLES:
+        op.execute(f"DROP TRIGGER IF EXISTS {table}_notify_update ON {table}")
+        op.execute(f"DROP TRIGGER IF EXISTS {table}_notify_change ON {table}")
+        op.execute(f"DROP TRIGGER IF EXISTS {table}_set_dt_updated ON {table}")
+    op.execute("DROP FUNCTION IF EXISTS notify_change()")
+    op.execute("DROP FUNCTION IF EXISTS set_dt_updated()")
@@ -0,0 +1,57 @@
+"""add client phone_digits
+
+Revision ID: V12
+Revises: V11
+Create Date: 2026-10-19 16:02:47.660318
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+from app.db.migrator.online import backfill, create_index_concurrently
+
+# revision identifiers, used by Alembic.
+revision: str = 'V12'
+down_revision: Union[str, None] = 'V11'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# must match app.utils.common.phone.phone_digits
+PHONE_DIGITS_EXPRESSION = """
+    CASE
+        WHEN d ~ '^8[0-9]{10}$' THEN '7' || substr(d, 2)
+        WHEN d ~ '^9[0-9]{9}$' THEN '7' || d
+        ELSE nullif(d, '')
+    END
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("ALTER TABLE client ADD COLUMN IF NOT EXISTS phone_digits TEXT")
+
+    backfill(
+        "V12_client_phone_digits",
+        "client",
+        f"""phone_digits = (
+            SELECT {PHONE_DIGITS_EXPRESSION}
+            FROM regexp_replace(client.phone_number, '[^0-9]', '', 'g') AS d
+        )""",
+    )
+
+    # not unique yet: clients typed in different formats may share digits until they are
+    # merged (POST /clients/{id}/merge), V21 makes it unique
+    create_index_concurrently(
+        'ix__client__phone_digits', 'client', 'phone_digits text_pattern_ops'
+    )
+    create_index_concurrently(
+        'ix__client__phone_digits_reversed', 'client', 'reverse(phone_digits) text_pattern_ops'
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix__client__phone_digits_reversed', table_name='client')
+    op.drop_index('ix__client__phone_digits', table_name='client')
+    op.drop_column('client', 'phone_digits')
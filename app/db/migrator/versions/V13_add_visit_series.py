@@ -0,0 +1,36 @@
+"""add visit series
+
+Revision ID: V13
+Revises: V12
+Create Date: 2026-10-19 18:12:31.208145
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+from app.db.migrator.online import create_index_concurrently, drop_index_concurrently
+
+# revision identifiers, used by Alembic.
+revision: str = 'V13'
+down_revision: Union[str, None] = 'V12'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # repeatable, the index below is built after this transaction is committed
+    op.execute("ALTER TABLE visit ADD COLUMN IF NOT EXISTS series_id UUID")
+    op.execute("ALTER TABLE visit ADD COLUMN IF NOT EXISTS series_index INTEGER")
+    create_index_concurrently(
+        'ix__visit__series_id_series_index', 'visit', 'series_id, series_index',
+        where='series_id IS NOT NULL',
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    drop_index_concurrently('ix__visit__series_id_series_index')
+    op.drop_column('visit', 'series_index')
+    op.drop_column('visit', 'series_id')
@@ -0,0 +1,65 @@
+"""add dt_updated indexes and tombstones for delta sync
+
+Revision ID: V14
+Revises: V13
+Create Date: 2026-10-19 20:41:07.518320
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+from app.db.migrator.online import create_index_concurrently, drop_index_concurrently
+
+# revision identifiers, used by Alembic.
+revision: str = 'V14'
+down_revision: Union[str, None] = 'V13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = ('client', 'doctor', 'visit')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # repeatable, the indexes below are built after this transaction is committed
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS tombstone (
+            table_name TEXT NOT NULL,
+            record_id UUID NOT NULL,
+            id UUID DEFAULT gen_random_uuid() NOT NULL,
+            dt_created TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP NOT NULL,
+            dt_updated TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP NOT NULL,
+            CONSTRAINT pk__tombstone PRIMARY KEY (id),
+            CONSTRAINT uq__tombstone__id UNIQUE (id)
+        )
+    """)
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix__tombstone__dt_created_id ON tombstone (dt_created, id)"
+    )
+    op.execute("""
+        CREATE OR REPLACE FUNCTION write_tombstone() RETURNS trigger AS $$
+        BEGIN
+            INSERT INTO tombstone (table_name, record_id) VALUES (TG_TABLE_NAME, OLD.id);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+    for table in TABLES:
+        op.execute(f"""
+            CREATE OR REPLACE TRIGGER {table}_tombstone
+            AFTER DELETE ON {table}
+            FOR EACH ROW EXECUTE FUNCTION write_tombstone();
+        """)
+    for table in TABLES:
+        create_index_concurrently(f'ix__{table}__dt_updated_id', table, 'dt_updated, id')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in TABLES:
+        drop_index_concurrently(f'ix__{table}__dt_updated_id')
+        op.execute(f"DROP TRIGGER IF EXISTS {table}_tombstone ON {table}")
+    op.execute("DROP FUNCTION IF EXISTS write_tombstone()")
+    op.drop_index('ix__tombstone__dt_created_id', table_name='tombstone')
+    op.drop_table('tombstone')
@@ -0,0 +1,67 @@
+"""exclude visit statistics from change tracking of clients and doctors
+
+Revision ID: V18
+Revises: V17
+Create Date: 2026-10-20 10:12:41.083516
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'V18'
+down_revision: Union[str, None] = 'V17'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = ('client', 'doctor')
+# denormalized statistics are refreshed with every visit write, they are not a change
+# of the client or doctor: dt_updated, /sync and the change feed ignore them
+IGNORED = "ARRAY['visit_count', 'paid_total', 'last_visit_at', 'next_visit_at', 'dt_updated']"
+CHANGED = f"(to_jsonb(OLD) - {IGNORED}) IS DISTINCT FROM (to_jsonb(NEW) - {IGNORED})"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute(f"""
+        CREATE OR REPLACE FUNCTION set_dt_updated_except_stats() RETURNS trigger AS $$
+        BEGIN
+            IF {CHANGED} THEN
+                NEW.dt_updated = clock_timestamp();
+            END IF;
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+    for table in TABLES:
+        op.execute(f"DROP TRIGGER IF EXISTS {table}_set_dt_updated ON {table}")
+        op.execute(f"""
+            CREATE TRIGGER {table}_set_dt_updated
+            BEFORE UPDATE ON {table}
+            FOR EACH ROW EXECUTE FUNCTION set_dt_updated_except_stats();
+        """)
+        op.execute(f"DROP TRIGGER IF EXISTS {table}_notify_update ON {table}")
+        op.execute(f"""
+            CREATE TRIGGER {table}_notify_update
+            AFTER UPDATE ON {table}
+            FOR EACH ROW WHEN ({CHANGED}) EXECUTE FUNCTION notify_change();
+        """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in TABLES:
+        op.execute(f"DROP TRIGGER IF EXISTS {table}_notify_update ON {table}")
+        op.execute(f"""
+            CREATE TRIGGER {table}_notify_update
+            AFTER UPDATE ON {table}
+            FOR EACH ROW WHEN (OLD.* IS DISTINCT FROM NEW.*) EXECUTE FUNCTION notify_change();
+        """)
+        op.execute(f"DROP TRIGGER IF EXISTS {table}_set_dt_updated ON {table}")
+        op.execute(f"""
+            CREATE TRIGGER {table}_set_dt_updated
+            BEFORE UPDATE ON {table}
+            FOR EACH ROW EXECUTE FUNCTION set_dt_updated();
+        """)
+    op.execute("DROP FUNCTION IF EXISTS set_dt_updated_except_stats()")
@@ -0,0 +1,59 @@
+"""backfill raw phone digits of clients left without phone_digits
+
+Revision ID: V19
+Revises: V18
+Create Date: 2026-10-20 11:40:18.527310
+
+"""
+import logging
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.db.migrator.online import backfill
+
+# revision identifiers, used by Alembic.
+revision: str = 'V19'
+down_revision: Union[str, None] = 'V18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+logger = logging.getLogger("alembic.online")
+
+RAW_DIGITS = "regexp_replace({table}.phone_number, '[^0-9]', '', 'g')"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # V12 left numbers of unusual length NULL, which made them unsearchable by phone.
+    # Digits taken by another client stay NULL, those clients are duplicates to merge.
+    raw = RAW_DIGITS.format(table="client")
+    other_raw = RAW_DIGITS.format(table="other")
+    backfill(
+        "V19_client_raw_phone_digits",
+        "client",
+        f"phone_digits = {raw}",
+        where=f"""
+            client.phone_digits IS NULL
+            AND {raw} <> ''
+            AND NOT EXISTS (
+                SELECT 1 FROM client other
+                WHERE other.phone_digits = {raw}
+                   OR (other.phone_digits IS NULL AND other.id < client.id AND {other_raw} = {raw})
+            )
+        """,
+    )
+
+    left = op.get_bind().execute(sa.text("""
+        SELECT count(*) FROM client
+        WHERE phone_digits IS NULL AND phone_number ~ '[0-9]'
+    """)).scalar()
+    if left:
+        logger.warning("%d clients share phone digits with another client and stay NULL", left)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # the raw digits are indistinguishable from normalized ones, they are kept
+    pass
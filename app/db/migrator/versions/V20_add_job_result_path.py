@@ -0,0 +1,27 @@
+"""add job result_path
+
+Revision ID: V20
+Revises: V19
+Create Date: 2026-10-20 12:05:33.912457
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'V20'
+down_revision: Union[str, None] = 'V19'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('job', sa.Column('result_path', sa.TEXT(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('job', 'result_path')
@@ -0,0 +1,47 @@
+"""make client phone_digits unique
+
+Revision ID: V21
+Revises: V20
+Create Date: 2026-10-20 15:21:09.406732
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.db.migrator.online import create_index_concurrently, drop_index_concurrently
+
+# revision identifiers, used by Alembic.
+revision: str = 'V21'
+down_revision: Union[str, None] = 'V20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    duplicates = op.get_bind().execute(sa.text("""
+        SELECT phone_digits, count(*) FROM client
+        WHERE phone_digits IS NOT NULL
+        GROUP BY phone_digits HAVING count(*) > 1
+        LIMIT 10
+    """)).all()
+    if duplicates:
+        # the application runs on V20, the dedup_clients job and /clients/duplicates merge them
+        raise RuntimeError(
+            "Clients with the same normalized phone number must be merged before this migration "
+            "(job dedup_clients, GET /clients/duplicates, POST /clients/{id}/merge): "
+            + ", ".join(f"{digits} ({count})" for digits, count in duplicates)
+        )
+
+    create_index_concurrently(
+        'uq__client__phone_digits', 'client', 'phone_digits text_pattern_ops', unique=True
+    )
+    drop_index_concurrently('ix__client__phone_digits')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    create_index_concurrently('ix__client__phone_digits', 'client', 'phone_digits text_pattern_ops')
+    drop_index_concurrently('uq__client__phone_digits')
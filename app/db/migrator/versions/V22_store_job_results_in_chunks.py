@@ -0,0 +1,46 @@
+"""store large job results in chunks, count job attempts
+
+Revision ID: V22
+Revises: V21
+Create Date: 2026-10-20 16:48:52.207319
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'V22'
+down_revision: Union[str, None] = 'V21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('job_result_chunk',
+    sa.Column('job_id', sa.UUID(), nullable=False),
+    sa.Column('seq', sa.INTEGER(), nullable=False),
+    sa.Column('data', postgresql.BYTEA(), nullable=False),
+    sa.Column('id', sa.UUID(), server_default=sa.text('gen_random_uuid()'), nullable=False),
+    sa.Column('dt_created', sa.TIMESTAMP(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=False),
+    sa.Column('dt_updated', sa.TIMESTAMP(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=False),
+    sa.ForeignKeyConstraint(['job_id'], ['job.id'], name=op.f('fk__job_result_chunk__job_id__job'), ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id', name=op.f('pk__job_result_chunk')),
+    sa.UniqueConstraint('id', name=op.f('uq__job_result_chunk__id')),
+    sa.UniqueConstraint('job_id', 'seq', name=op.f('uq__job_result_chunk__job_id_seq'))
+    )
+    op.add_column('job', sa.Column('result_chunked', sa.BOOLEAN(), server_default=sa.text('false'), nullable=False))
+    op.add_column('job', sa.Column('attempts', sa.INTEGER(), server_default=sa.text('0'), nullable=False))
+    # results written to the local disk of one host are not served any more
+    op.drop_column('job', 'result_path')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.add_column('job', sa.Column('result_path', sa.TEXT(), nullable=True))
+    op.drop_column('job', 'attempts')
+    op.drop_column('job', 'result_chunked')
+    op.drop_table('job_result_chunk')
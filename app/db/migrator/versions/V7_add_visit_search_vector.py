@@ -0,0 +1,51 @@
+"""add visit search vector
+
+Revision ID: V7
+Revises: V6
+Create Date: 2026-10-19 10:12:41.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'V7'
+down_revision: Union[str, None] = 'V6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SEARCH_VECTOR_EXPRESSION = (
+    "setweight(to_tsvector('russian', coalesce(procedure, '')), 'A') || "
+    "setweight(to_tsvector('russian', coalesce(cabinet, '')), 'B')"
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        'visit',
+        sa.Column(
+            'search_vector',
+            postgresql.TSVECTOR(),
+            sa.Computed(SEARCH_VECTOR_EXPRESSION, persisted=True),
+            nullable=True,
+        ),
+    )
+    op.create_index(
+        'ix__visit__search_vector', 'visit', ['search_vector'], unique=False, postgresql_using='gin'
+    )
+    op.create_index(op.f('ix__visit__client_id'), 'visit', ['client_id'], unique=False)
+    op.create_index(op.f('ix__visit__doctor_id'), 'visit', ['doctor_id'], unique=False)
+    op.create_index(op.f('ix__visit__start_date'), 'visit', ['start_date'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix__visit__start_date'), table_name='visit')
+    op.drop_index(op.f('ix__visit__doctor_id'), table_name='visit')
+    op.drop_index(op.f('ix__visit__client_id'), table_name='visit')
+    op.drop_index('ix__visit__search_vector', table_name='visit', postgresql_using='gin')
+    op.drop_column('visit', 'search_vector')
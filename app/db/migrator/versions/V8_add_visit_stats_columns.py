@@ -0,0 +1,58 @@
+"""add visit stats columns
+
+Revision ID: V8
+Revises: V7
+Create Date: 2026-10-19 11:03:17.482915
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'V8'
+down_revision: Union[str, None] = 'V7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = (('client', 'client_id'), ('doctor', 'doctor_id'))
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table, _ in TABLES:
+        op.add_column(table, sa.Column('visit_count', sa.INTEGER(), server_default=sa.text('0'), nullable=False))
+        op.add_column(table, sa.Column('paid_total', sa.FLOAT(), server_default=sa.text('0'), nullable=False))
+        op.add_column(table, sa.Column('last_visit_at', postgresql.TIMESTAMP(timezone=True), nullable=True))
+        op.add_column(table, sa.Column('next_visit_at', postgresql.TIMESTAMP(timezone=True), nullable=True))
+
+    conn = op.get_bind()
+    for table, owner_column in TABLES:
+        conn.execute(sa.text(f"""
+            UPDATE {table}
+            SET visit_count = s.visit_count,
+                paid_total = COALESCE(s.paid_total, 0),
+                last_visit_at = s.last_visit_at,
+                next_visit_at = s.next_visit_at
+            FROM (
+                SELECT {owner_column} AS owner_id,
+                       count(*) AS visit_count,
+                       sum(cost) FILTER (WHERE status = 'PAID') AS paid_total,
+                       max(start_date) FILTER (WHERE start_date <= now()) AS last_visit_at,
+                       min(start_date) FILTER (WHERE start_date > now()) AS next_visit_at
+                FROM visit
+                GROUP BY {owner_column}
+            ) AS s
+            WHERE {table}.id = s.owner_id
+        """))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table, _ in TABLES:
+        op.drop_column(table, 'next_visit_at')
+        op.drop_column(table, 'last_visit_at')
+        op.drop_column(table, 'paid_total')
+        op.drop_column(table, 'visit_count')
@@ -1,9 +1,23 @@
+from .audit_log import AuditLogEntry
 from .client import Client
+from .client_duplicate import ClientDuplicate
 from .doctor import Doctor
+from .idempotency_key import IdempotencyKey
+from .job import Job, JobResultChunk
+from .speciality import Speciality, doctor_speciality
+from .tombstone import Tombstone
 from .visit import Visit
 
 __all__ = [
+    "AuditLogEntry",
     "Client",
+    "ClientDuplicate",
     "Doctor",
+    "IdempotencyKey",
+    "Job",
+    "JobResultChunk",
+    "Speciality",
+    "Tombstone",
     "Visit",
+    "doctor_speciality",
 ]
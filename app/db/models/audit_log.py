@@ -0,0 +1,33 @@
+import uuid
+
+from sqlalchemy import Index
+from sqlalchemy.dialects.postgresql import JSONB, TEXT, UUID
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base
+
+
+class AuditLogEntry(Base):
+    """
+    One committed change of a client, doctor or visit, written in batches by
+    ``app.services.audit``. dt_created is the time of the change.
+    """
+
+    __tablename__ = "audit_log"
+    __table_args__ = (
+        Index("ix__audit_log__entity_id_dt_created", "entity_id", "dt_created"),
+        Index("ix__audit_log__dt_created", "dt_created"),
+    )
+
+    entity: Mapped[str] = mapped_column(TEXT, nullable=False, doc="Table name (type TEXT)")
+    entity_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), nullable=False)
+    action: Mapped[str] = mapped_column(
+        TEXT, nullable=False, doc="AuditActionEnum value (type TEXT)"
+    )
+    actor: Mapped[str | None] = mapped_column(
+        TEXT, nullable=True, doc="X-Client-Id or address of the caller (type TEXT)"
+    )
+    route: Mapped[str | None] = mapped_column(TEXT, nullable=True)
+    changes: Mapped[dict] = mapped_column(
+        JSONB, nullable=False, doc='{"field": [before, after]} (type JSONB)'
+    )
@@ -1,15 +1,35 @@
 from datetime import datetime
 
+from sqlalchemy import Index, text
 from sqlalchemy.dialects.postgresql import DATE, TEXT
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .human import Human
+from .visit_stats import VisitStatsMixin
 
 
-class Client(Human):
+class Client(Human, VisitStatsMixin):
     __tablename__ = "client"
+    __table_args__ = (
+        # serves exact and prefix (LIKE '7999%') lookups
+        Index(
+            "uq__client__phone_digits",
+            "phone_digits",
+            unique=True,
+            postgresql_ops={"phone_digits": "text_pattern_ops"},
+        ),
+        # serves "last digits" lookups as a prefix search over the reversed number
+        Index("ix__client__phone_digits_reversed", text("reverse(phone_digits) text_pattern_ops")),
+        # keyset over changes for /sync
+        Index("ix__client__dt_updated_id", "dt_updated", "id"),
+    )
 
     phone_number: Mapped[str] = mapped_column(TEXT, unique=True, nullable=False)
+    phone_digits: Mapped[str | None] = mapped_column(
+        TEXT,
+        nullable=True,
+        doc="Canonical E.164 digits of phone_number (type TEXT)",
+    )
     date_of_birth: Mapped[datetime] = mapped_column(DATE, nullable=True)
 
     visits: Mapped[list["Visit"]] = relationship(back_populates="client") # noqa
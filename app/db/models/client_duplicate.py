@@ -0,0 +1,43 @@
+import uuid
+
+from sqlalchemy import ForeignKey, Index, UniqueConstraint, text
+from sqlalchemy.dialects.postgresql import BOOLEAN, FLOAT, JSONB, UUID
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+
+from .base import Base
+from .client import Client
+
+
+class ClientDuplicate(Base):
+    """
+    A pair of clients the dedup_clients job takes for the same person, client_id < duplicate_id.
+    Pairs are suggested again on every run unless dismissed, merging deletes the pair.
+    """
+
+    __tablename__ = "client_duplicate"
+    __table_args__ = (
+        UniqueConstraint("client_id", "duplicate_id"),
+        Index("ix__client_duplicate__duplicate_id", "duplicate_id"),
+        Index("ix__client_duplicate__score", "score", postgresql_where=text("NOT dismissed")),
+    )
+
+    client_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("client.id", ondelete="CASCADE", onupdate="CASCADE"),
+        nullable=False,
+    )
+    duplicate_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("client.id", ondelete="CASCADE", onupdate="CASCADE"),
+        nullable=False,
+    )
+    score: Mapped[float] = mapped_column(FLOAT, nullable=False, doc="0..1 (type FLOAT)")
+    reasons: Mapped[dict] = mapped_column(
+        JSONB, nullable=False, doc="Similarities the score was made of (type JSONB)"
+    )
+    dismissed: Mapped[bool] = mapped_column(
+        BOOLEAN, nullable=False, default=False, server_default=text("false")
+    )
+
+    client: Mapped[Client] = relationship(foreign_keys=[client_id], lazy="selectin")
+    duplicate: Mapped[Client] = relationship(foreign_keys=[duplicate_id], lazy="selectin")
@@ -1,11 +1,17 @@
+from sqlalchemy import Index
 from sqlalchemy.dialects.postgresql import TEXT
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .human import Human
+from .visit_stats import VisitStatsMixin
 
 
-class Doctor(Human):
+class Doctor(Human, VisitStatsMixin):
     __tablename__ = "doctor"
+    __table_args__ = (
+        # keyset over changes for /sync
+        Index("ix__doctor__dt_updated_id", "dt_updated", "id"),
+    )
 
     speciality: Mapped[str] = mapped_column(TEXT)
 
@@ -0,0 +1,22 @@
+from datetime import datetime
+
+from sqlalchemy.dialects.postgresql import INTEGER, JSONB, TEXT, TIMESTAMP
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base
+
+
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_key"
+
+    key: Mapped[str] = mapped_column(TEXT, unique=True, nullable=False)
+    request_hash: Mapped[str] = mapped_column(TEXT, nullable=False)
+
+    status_code: Mapped[int | None] = mapped_column(
+        INTEGER,
+        nullable=True,
+        doc="Stored response status, NULL while the first request is in progress",
+    )
+    response_body: Mapped[dict | None] = mapped_column(JSONB, nullable=True)
+
+    expires_at: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), nullable=False, index=True)
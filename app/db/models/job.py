@@ -0,0 +1,94 @@
+import uuid
+from datetime import datetime
+
+from sqlalchemy import ForeignKey, Index, UniqueConstraint, text
+from sqlalchemy.dialects.postgresql import (
+    BOOLEAN,
+    BYTEA,
+    ENUM,
+    FLOAT,
+    INTEGER,
+    JSONB,
+    TEXT,
+    TIMESTAMP,
+    UUID,
+)
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.enums import JobStatusEnum
+
+from .base import Base
+
+
+class Job(Base):
+    __tablename__ = "job"
+    __table_args__ = (
+        Index(
+            "ix__job__queued",
+            "dt_created",
+            postgresql_where=text("status IN ('QUEUED', 'RUNNING')"),
+        ),
+    )
+
+    kind: Mapped[str] = mapped_column(TEXT, nullable=False)
+    params: Mapped[dict] = mapped_column(JSONB, nullable=False, server_default=text("'{}'::jsonb"))
+
+    status: Mapped[JobStatusEnum] = mapped_column(
+        ENUM(JobStatusEnum, name="job_status", create_type=True),
+        nullable=False,
+        default=JobStatusEnum.QUEUED,
+        server_default=text("'QUEUED'::job_status"),
+    )
+    progress: Mapped[float] = mapped_column(FLOAT, nullable=False, default=0, server_default=text("0"))
+    attempts: Mapped[int] = mapped_column(
+        INTEGER,
+        nullable=False,
+        default=0,
+        server_default=text("0"),
+        doc="Claims of the job, a job whose worker stopped JOB_MAX_ATTEMPTS times fails",
+    )
+    message: Mapped[str | None] = mapped_column(TEXT, nullable=True)
+    error: Mapped[str | None] = mapped_column(TEXT, nullable=True)
+
+    result: Mapped[bytes | None] = mapped_column(BYTEA, nullable=True, deferred=True)
+    result_content_type: Mapped[str | None] = mapped_column(TEXT, nullable=True)
+    result_filename: Mapped[str | None] = mapped_column(TEXT, nullable=True)
+    result_chunked: Mapped[bool] = mapped_column(
+        BOOLEAN,
+        nullable=False,
+        default=False,
+        server_default=text("false"),
+        doc="The result is stored in job_result_chunk rather than in the result column",
+    )
+
+    dt_started: Mapped[datetime | None] = mapped_column(TIMESTAMP(timezone=True), nullable=True)
+    dt_heartbeat: Mapped[datetime | None] = mapped_column(
+        TIMESTAMP(timezone=True),
+        nullable=True,
+        doc="Last sign of life of the worker, stale RUNNING jobs are claimed again",
+    )
+    dt_finished: Mapped[datetime | None] = mapped_column(TIMESTAMP(timezone=True), nullable=True)
+
+    @property
+    def has_result(self) -> bool:
+        return self.result_content_type is not None
+
+
+class JobResultChunk(Base):
+    """
+    A part of a large job result (CSV export), written while the job runs and read back
+    in ``seq`` order, so neither side holds the whole result.
+    """
+
+    __tablename__ = "job_result_chunk"
+    __table_args__ = (
+        UniqueConstraint("job_id", "seq"),
+    )
+
+    job_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("job.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+    seq: Mapped[int] = mapped_column(INTEGER, nullable=False)
+    data: Mapped[bytes] = mapped_column(BYTEA, nullable=False)
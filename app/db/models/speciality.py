@@ -0,0 +1,39 @@
+from sqlalchemy import Column, ForeignKey, Index, Table, text
+from sqlalchemy.dialects.postgresql import TEXT, UUID
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base
+
+
+class Speciality(Base):
+    """
+    A doctor speciality. Names are unique ignoring case, rows are created and linked to
+    doctors by the doctor_speciality trigger from the comma separated Doctor.speciality.
+    """
+
+    __tablename__ = "speciality"
+    __table_args__ = (
+        Index("uq__speciality__lower_name", text("lower(name)"), unique=True),
+    )
+
+    name: Mapped[str] = mapped_column(TEXT, nullable=False)
+
+
+doctor_speciality = Table(
+    "doctor_speciality",
+    Base.metadata,
+    Column(
+        "doctor_id",
+        UUID(as_uuid=True),
+        ForeignKey("doctor.id", ondelete="CASCADE", onupdate="CASCADE"),
+        primary_key=True,
+    ),
+    Column(
+        "speciality_id",
+        UUID(as_uuid=True),
+        ForeignKey("speciality.id", ondelete="CASCADE", onupdate="CASCADE"),
+        primary_key=True,
+    ),
+    # doctors of a speciality, the primary key serves the other direction
+    Index("ix__doctor_speciality__speciality_id_doctor_id", "speciality_id", "doctor_id"),
+)
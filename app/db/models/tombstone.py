@@ -0,0 +1,22 @@
+import uuid
+
+from sqlalchemy import Index
+from sqlalchemy.dialects.postgresql import TEXT, UUID
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base
+
+
+class Tombstone(Base):
+    """
+    A deleted client, doctor or visit, written by the <table>_tombstone triggers.
+    dt_created is the time of deletion.
+    """
+
+    __tablename__ = "tombstone"
+    __table_args__ = (
+        Index("ix__tombstone__dt_created_id", "dt_created", "id"),
+    )
+
+    table_name: Mapped[str] = mapped_column(TEXT, nullable=False)
+    record_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), nullable=False)
@@ -1,8 +1,8 @@
 import uuid
 from datetime import datetime
 
-from sqlalchemy import ForeignKey, text
-from sqlalchemy.dialects.postgresql import ENUM, FLOAT, TEXT, TIMESTAMP, UUID
+from sqlalchemy import Computed, ForeignKey, Index, text
+from sqlalchemy.dialects.postgresql import ENUM, FLOAT, INTEGER, TEXT, TIMESTAMP, TSVECTOR, UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.db.enums import VisitStatusEnum
@@ -11,25 +11,39 @@ from .base import Base
 from .client import Client
 from .doctor import Doctor
 
+SEARCH_CONFIG = "russian"
+
 
 class Visit(Base):
     __tablename__ = "visit"
+    __table_args__ = (
+        Index("ix__visit__search_vector", "search_vector", postgresql_using="gin"),
+        # keyset over changes for /sync
+        Index("ix__visit__dt_updated_id", "dt_updated", "id"),
+        Index(
+            "ix__visit__series_id_series_index", "series_id", "series_index",
+            postgresql_where=text("series_id IS NOT NULL"),
+        ),
+    )
 
     client_id: Mapped[uuid.UUID] = mapped_column(
         UUID(as_uuid=True),
         ForeignKey("client.id", ondelete="CASCADE", onupdate="CASCADE"),
         nullable=False,
+        index=True,
     )
     doctor_id: Mapped[uuid.UUID] = mapped_column(
         UUID(as_uuid=True),
         ForeignKey("doctor.id", ondelete="CASCADE", onupdate="CASCADE"),
         nullable=False,
+        index=True,
     )
 
     start_date: Mapped[datetime] = mapped_column(
         TIMESTAMP(timezone=True),
         nullable=False,
         server_default=text("CURRENT_TIMESTAMP"),
+        index=True,
     )
 
     end_date: Mapped[datetime] = mapped_column(
@@ -58,6 +72,28 @@ class Visit(Base):
         server_default=text("'UNCONFIRMED'::visit_status"),
     )
 
+    # occurrences of a recurring series share series_id and are numbered from 0
+    series_id: Mapped[uuid.UUID | None] = mapped_column(
+        UUID(as_uuid=True),
+        nullable=True,
+    )
+    series_index: Mapped[int | None] = mapped_column(
+        INTEGER,
+        nullable=True,
+    )
+
+    search_vector: Mapped[str | None] = mapped_column(
+        TSVECTOR,
+        Computed(
+            f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(procedure, '')), 'A') || "
+            f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(cabinet, '')), 'B')",
+            persisted=True,
+        ),
+        nullable=True,
+        deferred=True,
+        doc="Full-text search document over procedure and cabinet (type TSVECTOR)",
+    )
+
     client: Mapped[Client] = relationship(
         "Client", back_populates="visits", lazy="selectin"
     )
@@ -0,0 +1,40 @@
+from datetime import datetime
+
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import FLOAT, INTEGER, TIMESTAMP
+from sqlalchemy.orm import Mapped, mapped_column
+
+
+class VisitStatsMixin:
+    """
+    Denormalized visit statistics of a client or a doctor.
+
+    Columns are maintained by ``app.utils.stats`` on every visit write and can be
+    rebuilt in bulk with ``python -m app.utils.stats``. ``last_visit_at`` and
+    ``next_visit_at`` are relative to the moment of the last refresh.
+    """
+
+    visit_count: Mapped[int] = mapped_column(
+        INTEGER,
+        nullable=False,
+        default=0,
+        server_default=text("0"),
+        doc="Number of visits (type INTEGER)",
+    )
+    paid_total: Mapped[float] = mapped_column(
+        FLOAT,
+        nullable=False,
+        default=0,
+        server_default=text("0"),
+        doc="Sum of cost of paid visits (type FLOAT)",
+    )
+    last_visit_at: Mapped[datetime | None] = mapped_column(
+        TIMESTAMP(timezone=True),
+        nullable=True,
+        doc="Start of the latest visit in the past (type TIMESTAMP)",
+    )
+    next_visit_at: Mapped[datetime | None] = mapped_column(
+        TIMESTAMP(timezone=True),
+        nullable=True,
+        doc="Start of the nearest visit in the future (type TIMESTAMP)",
+    )
@@ -1,11 +1,25 @@
+from .admin import router as admin_router
+from .analytics import router as analytics_router
+from .audit import router as audit_router
 from .clients import router as client_router
+from .dashboard import router as dashboard_router
 from .doctors import router as doctor_router
+from .jobs import router as job_router
+from .specialities import router as speciality_router
+from .sync import router as sync_router
 from .visits import router as visit_router
 
 list_of_routes = [
     client_router,
     doctor_router,
+    speciality_router,
     visit_router,
+    job_router,
+    dashboard_router,
+    analytics_router,
+    sync_router,
+    admin_router,
+    audit_router,
 ]
 
 
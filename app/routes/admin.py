@@ -0,0 +1,108 @@
+import secrets
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request
+from fastapi.responses import PlainTextResponse
+from starlette import status
+
+from app.config import get_settings
+from app.db.connection import pool_usage_recorder, slow_query_recorder
+from app.schemas import SlowQueryFingerprint, SlowQueryReport, SlowQuerySample
+from app.services.audit import audit_writer
+from app.services.result_cache import result_cache
+from app.utils.common import render_single_flight_metrics
+
+
+def require_admin_token(
+        admin_token: str | None = Header(default=None, alias="X-Admin-Token"),
+) -> None:
+    """
+    /admin and /audit are served only with ADMIN_TOKEN set and given in X-Admin-Token.
+    """
+    expected = get_settings().ADMIN_TOKEN
+    if not expected:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Admin endpoints need ADMIN_TOKEN"
+        )
+    if not secrets.compare_digest(admin_token or "", expected):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN)
+
+
+router = APIRouter(prefix="/admin", tags=["admin"], dependencies=[Depends(require_admin_token)])
+
+
+@router.get(
+    "/slow-queries",
+    status_code=status.HTTP_200_OK,
+    response_model=SlowQueryReport,
+    responses={
+        status.HTTP_403_FORBIDDEN: {"description": "Wrong X-Admin-Token"},
+        status.HTTP_404_NOT_FOUND: {"description": "ADMIN_TOKEN is not set"},
+    }
+)
+async def get_slow_queries(
+        _: Request,
+        limit: int = Query(default=50, ge=1, le=1000, description="Recent samples to return"),
+):
+    """
+    Recent slow statements, newest first, and statistics by fingerprint, most total time first.
+    """
+    recent = list(slow_query_recorder.recent)[-limit:][::-1]
+    fingerprints = sorted(
+        slow_query_recorder.fingerprints.values(), key=lambda item: item.total_ms, reverse=True
+    )
+    return SlowQueryReport(
+        threshold_ms=slow_query_recorder.threshold_ms,
+        recent=[SlowQuerySample.model_validate(sample, from_attributes=True) for sample in recent],
+        fingerprints=[
+            SlowQueryFingerprint(
+                fingerprint=stats.fingerprint,
+                statement=stats.statement,
+                count=stats.count,
+                total_ms=round(stats.total_ms, 2),
+                mean_ms=round(stats.total_ms / stats.count, 2),
+                max_ms=round(stats.max_ms, 2),
+                routes=dict(stats.routes),
+                plan=stats.plan,
+                dt_last_seen=stats.dt_last_seen,
+            )
+            for stats in fingerprints
+        ],
+    )
+
+
+@router.delete(
+    "/slow-queries",
+    status_code=status.HTTP_204_NO_CONTENT,
+    responses={
+        status.HTTP_403_FORBIDDEN: {"description": "Wrong X-Admin-Token"},
+        status.HTTP_404_NOT_FOUND: {"description": "ADMIN_TOKEN is not set"},
+    }
+)
+async def clear_slow_queries(_: Request):
+    slow_query_recorder.clear()
+
+
+@router.get(
+    "/metrics",
+    status_code=status.HTTP_200_OK,
+    response_class=PlainTextResponse,
+    responses={
+        status.HTTP_403_FORBIDDEN: {"description": "Wrong X-Admin-Token"},
+        status.HTTP_404_NOT_FOUND: {"description": "ADMIN_TOKEN is not set"},
+    }
+)
+async def get_metrics(request: Request):
+    """
+    Metrics in the Prometheus text format: admission control state (slots in use,
+    queue depth, wait time and shed requests per priority class), pool occupancy,
+    audit entries waiting to be written, coalesced reads and result cache hits.
+    """
+    admission = getattr(request.app.state, "admission", None)
+    return PlainTextResponse(
+        (admission.render_metrics() if admission is not None else "")
+        + pool_usage_recorder.render_metrics()
+        + audit_writer.render_metrics()
+        + render_single_flight_metrics()
+        + result_cache.render_metrics(),
+        media_type="text/plain; version=0.0.4",
+    )
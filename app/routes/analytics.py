@@ -0,0 +1,100 @@
+from fastapi import APIRouter, Depends, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette import status
+
+from app.db.connection import get_session
+from app.schemas import (
+    AnalyticsRequest,
+    DoctorUtilizationResponse,
+    LoadHeatmapResponse,
+    ProcedureStatsResponse,
+    RevenueStatsResponse,
+)
+from app.utils.analytics import (
+    svc_get_doctor_utilization,
+    svc_get_load_heatmap,
+    svc_get_procedure_stats,
+    svc_get_revenue_stats,
+)
+
+router = APIRouter(prefix="/analytics", tags=["analytics"])
+
+RESPONSES = {
+    status.HTTP_400_BAD_REQUEST: {"description": "end_date is not after start_date"},
+    status.HTTP_501_NOT_IMPLEMENTED: {"description": "numpy is not installed"},
+}
+
+
+# Statistics are computed from visit arrays cached by the process. They are refreshed
+# from the primary, deletes are replayed from tombstones written there.
+
+@router.get(
+    "/revenue",
+    status_code=status.HTTP_200_OK,
+    response_model=RevenueStatsResponse,
+    responses=RESPONSES,
+)
+async def get_revenue_stats(
+        _: Request,
+        analytics: AnalyticsRequest = Depends(),
+        session: AsyncSession = Depends(get_session),
+):
+    """
+    Cost percentiles, totals and mean of the visits.
+    """
+    stats = await svc_get_revenue_stats(session, analytics)
+    return stats
+
+
+@router.get(
+    "/procedures",
+    status_code=status.HTTP_200_OK,
+    response_model=ProcedureStatsResponse,
+    responses=RESPONSES,
+)
+async def get_procedure_stats(
+        _: Request,
+        analytics: AnalyticsRequest = Depends(),
+        session: AsyncSession = Depends(get_session),
+):
+    """
+    Visits and average cost per procedure.
+    """
+    stats = await svc_get_procedure_stats(session, analytics)
+    return stats
+
+
+@router.get(
+    "/load",
+    status_code=status.HTTP_200_OK,
+    response_model=LoadHeatmapResponse,
+    responses=RESPONSES,
+)
+async def get_load_heatmap(
+        _: Request,
+        analytics: AnalyticsRequest = Depends(),
+        session: AsyncSession = Depends(get_session),
+):
+    """
+    Hour-of-week heatmap of visits and booked hours.
+    """
+    heatmap = await svc_get_load_heatmap(session, analytics)
+    return heatmap
+
+
+@router.get(
+    "/doctors",
+    status_code=status.HTTP_200_OK,
+    response_model=DoctorUtilizationResponse,
+    responses=RESPONSES,
+)
+async def get_doctor_utilization(
+        _: Request,
+        analytics: AnalyticsRequest = Depends(),
+        session: AsyncSession = Depends(get_session),
+):
+    """
+    Booked hours of each doctor against the working hours in the range.
+    """
+    utilization = await svc_get_doctor_utilization(session, analytics)
+    return utilization
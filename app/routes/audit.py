@@ -0,0 +1,43 @@
+import datetime
+import uuid
+
+from fastapi import APIRouter, Depends, Query, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette import status
+
+from app.db.connection import get_session
+from app.schemas import AuditEntryResponse
+from app.utils.audit import svc_get_audit_entries
+
+from .admin import require_admin_token
+
+router = APIRouter(prefix="/audit", tags=["audit"], dependencies=[Depends(require_admin_token)])
+
+
+@router.get(
+    "/",
+    status_code=status.HTTP_200_OK,
+    response_model=list[AuditEntryResponse],
+    responses={
+        status.HTTP_403_FORBIDDEN: {"description": "Wrong X-Admin-Token"},
+        status.HTTP_404_NOT_FOUND: {"description": "ADMIN_TOKEN is not set"},
+    }
+)
+async def get_audit_entries(
+        _: Request,
+        entity_id: uuid.UUID | None = Query(default=None),
+        entity: str | None = Query(default=None, description="client, doctor or visit"),
+        start_date: datetime.datetime | None = Query(default=None),
+        end_date: datetime.datetime | None = Query(default=None),
+        limit: int = Query(default=100, ge=1, le=500),
+        offset: int = Query(default=0, ge=0),
+        # the primary: entries flushed by this request are not on replicas yet
+        session: AsyncSession = Depends(get_session),
+):
+    """
+    Changes of clients, doctors and visits, newest first.
+    """
+    entries = await svc_get_audit_entries(
+        session, entity_id, entity, start_date, end_date, limit, offset
+    )
+    return entries
@@ -1,19 +1,35 @@
 import uuid
 
-from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request
+from fastapi import APIRouter, Body, Depends, Header, HTTPException, Query, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
 from starlette.status import HTTP_404_NOT_FOUND
 
-from app.db.connection import get_session
+from app.db.connection import get_read_session, get_session
 from app.schemas import (
+    BatchResponse,
     ClientCreateRequest,
+    ClientDuplicateResponse,
+    ClientMergeRequest,
+    ClientMergeResponse,
     ClientResponse,
     ClientUpdateRequest,
     VisitResponse,
     VisitSearchRequest,
 )
-from app.utils.client import create_new_client, find_client_by_substr, get_client_by_id, update_client
+from app.utils.client import (
+    create_new_client,
+    find_client_by_substr,
+    find_client_fields_by_substr,
+    get_client_by_id,
+    get_clients_by_ids,
+    update_client,
+)
+from app.utils.common import batch_ids, order_by_ids, sparse_fields
+from app.utils.dedup import dal_dismiss_duplicate, dal_get_duplicates, svc_merge_clients
+from app.utils.idempotency import svc_run_idempotent
 from app.utils.visit import svc_get_visits_by_filter
 
 router = APIRouter(prefix="/clients", tags=["client"])
@@ -26,9 +42,13 @@ router = APIRouter(prefix="/clients", tags=["client"])
 )
 async def find_clients(
         _: Request,
-        session: AsyncSession = Depends(get_session),
+        session: AsyncSession = Depends(get_read_session),
         search_substr: str = Query(default="", title="Search substr"),
+        fields: list[str] | None = Depends(sparse_fields(ClientResponse)),
 ):
+    if fields is not None:
+        clients = await find_client_fields_by_substr(session, search_substr, fields)
+        return JSONResponse(jsonable_encoder(clients))
     clients = await find_client_by_substr(session, search_substr)
     return clients
 
@@ -46,16 +66,77 @@ async def create_client(
         _: Request,
         potential_client: ClientCreateRequest = Body(...),
         session: AsyncSession = Depends(get_session),
+        idempotency_key: str | None = Header(default=None, alias="Idempotency-Key", max_length=255),
 ):
-    client, message = await create_new_client(session, potential_client)
+    async def create():
+        client, message = await create_new_client(session, potential_client)
 
-    if not client:
-        raise HTTPException(
-            status_code=status.HTTP_409_CONFLICT,
-            detail=message
-        )
+        if not client:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=message
+            )
 
-    return client
+        return client
+
+    return await svc_run_idempotent(
+        session, idempotency_key, "clients:create", potential_client, create, ClientResponse
+    )
+
+
+@router.get(
+    "/batch",
+    response_model=BatchResponse[ClientResponse],
+    status_code=status.HTTP_200_OK,
+    responses={
+        status.HTTP_422_UNPROCESSABLE_ENTITY: {"description": "Invalid ids or too many of them"},
+    }
+)
+async def get_clients_batch(
+        _: Request,
+        client_ids: list[uuid.UUID] = Depends(batch_ids),
+        session: AsyncSession = Depends(get_read_session),
+):
+    clients = await get_clients_by_ids(session, client_ids)
+    return order_by_ids(client_ids, clients)
+
+
+@router.get(
+    "/duplicates",
+    response_model=list[ClientDuplicateResponse],
+    status_code=status.HTTP_200_OK,
+)
+async def get_client_duplicates(
+        _: Request,
+        min_score: float = Query(default=0, ge=0, le=1),
+        limit: int = Query(default=50, ge=1, le=500),
+        offset: int = Query(default=0, ge=0),
+        session: AsyncSession = Depends(get_read_session),
+):
+    """
+    Pairs of clients suggested by the dedup_clients job, most similar first.
+    """
+    duplicates = await dal_get_duplicates(session, min_score, limit, offset)
+    return duplicates
+
+
+@router.post(
+    "/duplicates/{duplicate_pair_id}/dismiss",
+    status_code=status.HTTP_204_NO_CONTENT,
+    responses={
+        status.HTTP_404_NOT_FOUND: {"description": "Suggestion not found"},
+    }
+)
+async def dismiss_client_duplicate(
+        _: Request,
+        duplicate_pair_id: uuid.UUID,
+        session: AsyncSession = Depends(get_session),
+):
+    """
+    Marks the pair as different people, later runs of the job do not suggest it again.
+    """
+    if not await dal_dismiss_duplicate(session, duplicate_pair_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
 
 
 @router.get(
@@ -69,7 +150,7 @@ async def create_client(
 async def get_client(
         _: Request,
         client_id: uuid.UUID,
-        session: AsyncSession = Depends(get_session),
+        session: AsyncSession = Depends(get_read_session),
 ):
     client = await get_client_by_id(session, client_id)
     if not client:
@@ -97,6 +178,30 @@ async def patch_client(
     return client
 
 
+@router.post(
+    "/{client_id}/merge",
+    status_code=status.HTTP_200_OK,
+    response_model=ClientMergeResponse,
+    responses={
+        status.HTTP_400_BAD_REQUEST: {"description": "duplicate_id is the client itself"},
+        status.HTTP_404_NOT_FOUND: {"description": "Client or duplicate not found"},
+    }
+)
+async def merge_client(
+        _: Request,
+        client_id: uuid.UUID,
+        merge_request: ClientMergeRequest = Body(...),
+        session: AsyncSession = Depends(get_session),
+):
+    """
+    Moves the visits of the duplicate to the client and deletes the duplicate.
+    """
+    merged = await svc_merge_clients(session, client_id, merge_request.duplicate_id)
+    if merged is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    return merged
+
+
 @router.get(
     "/{client_id}/visits",
     response_model=list[VisitResponse],
@@ -105,7 +210,7 @@ async def patch_client(
 async def get_visits(
         _: Request,
         client_id: uuid.UUID,
-        session: AsyncSession = Depends(get_session),
+        session: AsyncSession = Depends(get_read_session),
 ):
     search = VisitSearchRequest(client_id=client_id)
     visits = await svc_get_visits_by_filter(session, search)
@@ -0,0 +1,29 @@
+import datetime
+from zoneinfo import ZoneInfo
+
+from fastapi import APIRouter, Depends, Query, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette import status
+
+from app.config import get_settings
+from app.db.connection import get_read_session
+from app.schemas import DashboardResponse
+from app.utils.dashboard import svc_get_dashboard
+
+router = APIRouter(prefix="/dashboard", tags=["dashboard"])
+
+
+@router.get(
+    "/",
+    status_code=status.HTTP_200_OK,
+    response_model=DashboardResponse,
+)
+async def get_dashboard(
+        _: Request,
+        date: datetime.date | None = Query(default=None, description="Defaults to today"),
+        session: AsyncSession = Depends(get_read_session),
+):
+    if date is None:
+        date = datetime.datetime.now(ZoneInfo(get_settings().CLINIC_TIMEZONE)).date()
+    dashboard = await svc_get_dashboard(session, date)
+    return dashboard
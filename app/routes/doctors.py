@@ -1,18 +1,30 @@
 import uuid
 
-from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request
+from fastapi import APIRouter, Body, Depends, Header, HTTPException, Query, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
 
-from app.db.connection import get_session
+from app.db.connection import get_read_session, get_session
 from app.schemas import (
+    BatchResponse,
     DoctorCreateRequest,
     DoctorResponse,
     DoctorUpdateRequest,
     VisitResponse,
     VisitSearchRequest,
 )
-from app.utils.doctor import create_new_doctor, find_doctor_by_substr, get_doctor_by_id, update_doctor
+from app.utils.doctor import (
+    create_new_doctor,
+    find_doctor_by_substr,
+    find_doctor_fields_by_substr,
+    get_doctor_by_id,
+    get_doctors_by_ids,
+    update_doctor,
+)
+from app.utils.common import batch_ids, order_by_ids, sparse_fields
+from app.utils.idempotency import svc_run_idempotent
 from app.utils.visit import svc_get_visits_by_filter
 
 router = APIRouter(prefix="/doctors", tags=["doctor"])
@@ -25,10 +37,17 @@ router = APIRouter(prefix="/doctors", tags=["doctor"])
 )
 async def find_doctors(
         _: Request,
-        session: AsyncSession = Depends(get_session),
+        session: AsyncSession = Depends(get_read_session),
         search_substr: str = Query(default="", title="Search substr"),
+        speciality_id: uuid.UUID | None = Query(default=None, description="See /specialities"),
+        fields: list[str] | None = Depends(sparse_fields(DoctorResponse)),
 ):
-    doctors = await find_doctor_by_substr(session, search_substr)
+    if fields is not None:
+        doctors = await find_doctor_fields_by_substr(
+            session, search_substr, fields, speciality_id
+        )
+        return JSONResponse(jsonable_encoder(doctors))
+    doctors = await find_doctor_by_substr(session, search_substr, speciality_id)
     return doctors
 
 
@@ -43,10 +62,34 @@ async def find_doctors(
 async def create_doctor(
         _: Request,
         potential_doctor: DoctorCreateRequest = Body(...),
-        session: AsyncSession = Depends(get_session)
+        session: AsyncSession = Depends(get_session),
+        idempotency_key: str | None = Header(default=None, alias="Idempotency-Key", max_length=255),
 ):
-    doctor = await create_new_doctor(session, potential_doctor)
-    return doctor
+    return await svc_run_idempotent(
+        session,
+        idempotency_key,
+        "doctors:create",
+        potential_doctor,
+        lambda: create_new_doctor(session, potential_doctor),
+        DoctorResponse,
+    )
+
+
+@router.get(
+    "/batch",
+    response_model=BatchResponse[DoctorResponse],
+    status_code=status.HTTP_200_OK,
+    responses={
+        status.HTTP_422_UNPROCESSABLE_ENTITY: {"description": "Invalid ids or too many of them"},
+    }
+)
+async def get_doctors_batch(
+        _: Request,
+        doctor_ids: list[uuid.UUID] = Depends(batch_ids),
+        session: AsyncSession = Depends(get_read_session),
+):
+    doctors = await get_doctors_by_ids(session, doctor_ids)
+    return order_by_ids(doctor_ids, doctors)
 
 
 @router.get(
@@ -60,7 +103,7 @@ async def create_doctor(
 async def get_doctor(
         _: Request,
         doctor_id: uuid.UUID,
-        session: AsyncSession = Depends(get_session)
+        session: AsyncSession = Depends(get_read_session)
 ):
     doctor = await get_doctor_by_id(session, doctor_id)
     if doctor is None:
@@ -98,7 +141,7 @@ async def patch_doctor(
 async def get_visits(
         _: Request,
         doctor_id: uuid.UUID,
-        session: AsyncSession = Depends(get_session),
+        session: AsyncSession = Depends(get_read_session),
 ):
     search = VisitSearchRequest(doctor_id=doctor_id)
     visits = await svc_get_visits_by_filter(session, search)
@@ -0,0 +1,115 @@
+import uuid
+from collections.abc import AsyncIterator
+
+from fastapi import APIRouter, Body, Depends, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette import status
+
+from app.db.connection import SessionManager, get_session
+from app.db.enums import JobStatusEnum
+from app.schemas import JobCreateRequest, JobResponse
+from app.services.jobs import get_job_kinds
+from app.utils.job import dal_create_job, dal_get_job_by_id, dal_get_job_result_chunk
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+
+@router.get(
+    "/kinds",
+    response_model=list[str],
+    status_code=status.HTTP_200_OK,
+)
+async def list_job_kinds():
+    return get_job_kinds()
+
+
+@router.post(
+    "/",
+    status_code=status.HTTP_202_ACCEPTED,
+    response_model=JobResponse,
+    responses={
+        status.HTTP_422_UNPROCESSABLE_ENTITY: {"description": "Unknown job kind"},
+    }
+)
+async def create_job(
+        request: Request,
+        potential_job: JobCreateRequest = Body(...),
+        session: AsyncSession = Depends(get_session),
+):
+    if potential_job.kind not in get_job_kinds():
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Unknown job kind: {potential_job.kind}",
+        )
+    job = await dal_create_job(session, potential_job)
+
+    runner = getattr(request.app.state, "job_runner", None)
+    if runner is not None:
+        runner.wake()
+    return job
+
+
+@router.get(
+    "/{job_id}",
+    status_code=status.HTTP_200_OK,
+    response_model=JobResponse,
+    responses={
+        status.HTTP_404_NOT_FOUND: {"description": "Job not found"},
+    }
+)
+async def get_job(
+        _: Request,
+        job_id: uuid.UUID,
+        session: AsyncSession = Depends(get_session),
+):
+    job = await dal_get_job_by_id(session, job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    return job
+
+
+@router.get(
+    "/{job_id}/result",
+    status_code=status.HTTP_200_OK,
+    responses={
+        status.HTTP_404_NOT_FOUND: {"description": "Job not found or it has no result"},
+        status.HTTP_409_CONFLICT: {"description": "Job is not finished yet"},
+    }
+)
+async def get_job_result(
+        _: Request,
+        job_id: uuid.UUID,
+        session: AsyncSession = Depends(get_session),
+):
+    job = await dal_get_job_by_id(session, job_id, with_result=True)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    if job.status != JobStatusEnum.DONE:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"Job is {job.status.value}")
+    if job.result is None and not job.result_chunked:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job has no result")
+
+    headers = {}
+    if job.result_filename:
+        headers["Content-Disposition"] = f'attachment; filename="{job.result_filename}"'
+    if job.result_chunked:
+        return StreamingResponse(
+            _result_chunks(job.id), media_type=job.result_content_type, headers=headers
+        )
+    return Response(content=job.result, media_type=job.result_content_type, headers=headers)
+
+
+async def _result_chunks(job_id: uuid.UUID) -> AsyncIterator[bytes]:
+    """
+    Chunks of a result one by one, each read in its own session: the response outlives
+    the session of the request.
+    """
+    seq = 0
+    while True:
+        async with SessionManager().get_session_maker()() as session:
+            data = await dal_get_job_result_chunk(session, job_id, seq)
+        if data is None:
+            return
+        yield data
+        seq += 1
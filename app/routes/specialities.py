@@ -0,0 +1,25 @@
+from fastapi import APIRouter, Depends, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette import status
+
+from app.db.connection import get_read_session
+from app.schemas import SpecialityResponse
+from app.utils.speciality import dal_get_specialities
+
+router = APIRouter(prefix="/specialities", tags=["speciality"])
+
+
+@router.get(
+    "/",
+    status_code=status.HTTP_200_OK,
+    response_model=list[SpecialityResponse],
+)
+async def get_specialities(
+        _: Request,
+        session: AsyncSession = Depends(get_read_session),
+):
+    """
+    Specialities with their doctor counts, ids filter /doctors/ and /visits/ by speciality_id.
+    """
+    specialities = await dal_get_specialities(session)
+    return specialities
@@ -0,0 +1,37 @@
+from fastapi import APIRouter, Depends, Query, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette import status
+
+from app.db.connection import get_session
+from app.schemas import SyncEntityEnum, SyncResponse
+from app.utils.sync import svc_get_changes
+
+router = APIRouter(prefix="/sync", tags=["sync"])
+
+
+@router.get(
+    "/",
+    status_code=status.HTTP_200_OK,
+    response_model=SyncResponse,
+    responses={
+        status.HTTP_400_BAD_REQUEST: {"description": "Malformed sync token"},
+        status.HTTP_410_GONE: {"description": "Sync token has expired, start over"},
+    }
+)
+async def get_changes(
+        _: Request,
+        since: str | None = Query(
+            default=None, max_length=1000, description="Token of the previous response"
+        ),
+        include: list[SyncEntityEnum] = Query(
+            default=list(SyncEntityEnum),
+            description="Entities to sync, only read without a token (a token keeps its own)",
+        ),
+        # the primary: a replica's clock is ahead of the data it has replayed
+        session: AsyncSession = Depends(get_session),
+):
+    """
+    Clients, doctors and visits created, updated or deleted since the token.
+    """
+    changes = await svc_get_changes(session, since, include)
+    return changes
@@ -1,20 +1,33 @@
+import contextlib
+import datetime
 import uuid
 
-from fastapi import APIRouter, Body, HTTPException, Request
+from fastapi import APIRouter, Body, Header, HTTPException, Query, Request
+from fastapi.encoders import jsonable_encoder
 from fastapi.params import Depends
+from fastapi.responses import JSONResponse, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
 
-from app.db.connection import get_session
+from app.db.connection import get_read_session, get_session
 from app.schemas import VisitCreateRequest, VisitResponse, VisitSearchRequest, VisitUpdateRequest, \
-    PageVisitResponse
+    PageVisitResponse, CountModeEnum, BatchResponse, VisitSeriesCreateRequest, VisitSeriesResponse, \
+    VisitSeriesCancelResponse
 from app.utils.visit import (
     create_new_visit,
     delete_visit_by_id,
     get_visit_by_id,
+    get_visits_by_ids,
+    svc_cancel_visit_series,
+    svc_create_visit_series,
     svc_get_visits_by_filter,
+    svc_stream_visit_changes,
+    svc_update_visit_series,
     update_visit,
 )
+from app.services.change_feed import ChangeFilter
+from app.utils.common import batch_ids, order_by_ids, sparse_fields
+from app.utils.idempotency import svc_run_idempotent
 
 router = APIRouter(prefix="/visits", tags=["visits"])
 
@@ -28,9 +41,13 @@ async def get_visits(
         search: VisitSearchRequest = Depends(),
         limit: int = 10,
         offset: int = 0,
-        session: AsyncSession = Depends(get_session),
+        fields: list[str] | None = Depends(sparse_fields(VisitResponse)),
+        count_mode: CountModeEnum = CountModeEnum.EXACT,
+        session: AsyncSession = Depends(get_read_session),
 ):
-    visits = await svc_get_visits_by_filter(session, search, limit, offset)
+    visits = await svc_get_visits_by_filter(session, search, limit, offset, fields, count_mode)
+    if fields is not None:
+        return JSONResponse(jsonable_encoder(visits))
     return visits
 
 
@@ -45,10 +62,127 @@ async def get_visits(
 async def create_visit(
         _: Request,
         potential_visit: VisitCreateRequest = Body(...),
-        session: AsyncSession = Depends(get_session)
+        session: AsyncSession = Depends(get_session),
+        idempotency_key: str | None = Header(default=None, alias="Idempotency-Key", max_length=255),
 ):
-    visit = await create_new_visit(session, potential_visit)
-    return visit
+    return await svc_run_idempotent(
+        session,
+        idempotency_key,
+        "visits:create",
+        potential_visit,
+        lambda: create_new_visit(session, potential_visit),
+        VisitResponse,
+    )
+
+
+@router.post(
+    "/series",
+    status_code=status.HTTP_201_CREATED,
+    response_model=VisitSeriesResponse,
+    responses={
+        status.HTTP_409_CONFLICT: {"description": "Occurrences overlap existing visits"},
+        status.HTTP_422_UNPROCESSABLE_ENTITY: {"description": "Validation error"},
+    }
+)
+async def create_visit_series(
+        _: Request,
+        series_request: VisitSeriesCreateRequest = Body(...),
+        session: AsyncSession = Depends(get_session),
+        idempotency_key: str | None = Header(default=None, alias="Idempotency-Key", max_length=255),
+):
+    return await svc_run_idempotent(
+        session,
+        idempotency_key,
+        "visits:series",
+        series_request,
+        lambda: svc_create_visit_series(session, series_request),
+        VisitSeriesResponse,
+    )
+
+
+@router.patch(
+    "/series/{series_id}",
+    status_code=status.HTTP_200_OK,
+    response_model=list[VisitResponse],
+    responses={
+        status.HTTP_404_NOT_FOUND: {"description": "No occurrences from this index"},
+        status.HTTP_409_CONFLICT: {"description": "Occurrences would overlap existing visits"},
+    }
+)
+async def patch_visit_series(
+        _: Request,
+        series_id: uuid.UUID,
+        from_index: int = Query(default=0, ge=0, description="This and following occurrences"),
+        update_request: VisitUpdateRequest = Body(...),
+        session: AsyncSession = Depends(get_session),
+):
+    return await svc_update_visit_series(session, series_id, from_index, update_request)
+
+
+@router.delete(
+    "/series/{series_id}",
+    status_code=status.HTTP_200_OK,
+    response_model=VisitSeriesCancelResponse,
+    responses={
+        status.HTTP_404_NOT_FOUND: {"description": "No occurrences from this index"},
+    }
+)
+async def cancel_visit_series(
+        _: Request,
+        series_id: uuid.UUID,
+        from_index: int = Query(default=0, ge=0, description="This and following occurrences"),
+        session: AsyncSession = Depends(get_session),
+):
+    return await svc_cancel_visit_series(session, series_id, from_index)
+
+
+@router.get(
+    "/changes",
+    status_code=status.HTTP_200_OK,
+    response_class=StreamingResponse,
+    responses={
+        status.HTTP_503_SERVICE_UNAVAILABLE: {"description": "Change feed is disabled"},
+    }
+)
+async def stream_visit_changes(
+        request: Request,
+        doctor_id: uuid.UUID | None = None,
+        cabinet: str | None = None,
+        date: datetime.date | None = None,
+        since: datetime.datetime | None = None,
+        last_event_id: str | None = Header(default=None, alias="Last-Event-ID"),
+):
+    feed = getattr(request.app.state, "change_feed", None)
+    if feed is None:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+    if last_event_id:
+        with contextlib.suppress(ValueError):
+            since = datetime.datetime.fromisoformat(last_event_id)
+
+    change_filter = ChangeFilter(doctor_id=doctor_id, cabinet=cabinet, day=date)
+    return StreamingResponse(
+        svc_stream_visit_changes(feed, change_filter, since, request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get(
+    "/batch",
+    response_model=BatchResponse[VisitResponse],
+    status_code=status.HTTP_200_OK,
+    responses={
+        status.HTTP_422_UNPROCESSABLE_ENTITY: {"description": "Invalid ids or too many of them"},
+    }
+)
+async def get_visits_batch(
+        _: Request,
+        visit_ids: list[uuid.UUID] = Depends(batch_ids),
+        session: AsyncSession = Depends(get_read_session),
+):
+    visits = await get_visits_by_ids(session, visit_ids)
+    return order_by_ids(visit_ids, visits)
 
 
 @router.get(
@@ -62,7 +196,7 @@ async def create_visit(
 async def get_visit(
         _: Request,
         visit_id: uuid.UUID,
-        session: AsyncSession = Depends(get_session),
+        session: AsyncSession = Depends(get_read_session),
 ):
     visit = await get_visit_by_id(session, visit_id)
     if not visit:
@@ -93,10 +227,14 @@ async def patch_visit(
 @router.delete(
     "/{visit_id}",
     status_code=status.HTTP_204_NO_CONTENT,
+    responses={
+        status.HTTP_404_NOT_FOUND: {"description": "Visit not found"},
+    }
 )
 async def delete_visit(
         _: Request,
         visit_id: uuid.UUID,
         session: AsyncSession = Depends(get_session)
 ):
-    await delete_visit_by_id(session, visit_id)
+    if not await delete_visit_by_id(session, visit_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
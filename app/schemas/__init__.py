@@ -1,12 +1,41 @@
 from .client import ClientCreateRequest, ClientResponse, ClientUpdateRequest
+from .client_duplicate import ClientDuplicateResponse, ClientMergeRequest, ClientMergeResponse
 from .doctor import DoctorCreateRequest, DoctorResponse, DoctorUpdateRequest
 from .visit import VisitCreateRequest, VisitResponse, VisitSearchRequest, VisitUpdateRequest
-from .page import PageResponse, PageVisitResponse
+from .visit_series import (
+    RecurrenceFrequencyEnum,
+    VisitConflict,
+    VisitRecurrenceRule,
+    VisitSeriesCancelResponse,
+    VisitSeriesCreateRequest,
+    VisitSeriesResponse,
+)
+from .speciality import SpecialityResponse
+from .dashboard import DashboardGroup, DashboardResponse
+from .job import JobCreateRequest, JobResponse
+from .analytics import (
+    AnalyticsRequest,
+    AnalyticsResponse,
+    DoctorUtilization,
+    DoctorUtilizationResponse,
+    LoadHeatmapResponse,
+    ProcedureStats,
+    ProcedureStatsResponse,
+    RevenueStatsResponse,
+)
+from .admin import SlowQueryFingerprint, SlowQueryReport, SlowQuerySample
+from .audit import AuditEntryResponse
+from .batch import BatchResponse
+from .page import CountModeEnum, PageResponse, PageVisitResponse, PartialPageVisitResponse
+from .sync import SyncDeleted, SyncEntityEnum, SyncResponse
 
 __all__ = [
     "ClientCreateRequest",
     "ClientResponse",
     "ClientUpdateRequest",
+    "ClientDuplicateResponse",
+    "ClientMergeRequest",
+    "ClientMergeResponse",
 
     "DoctorCreateRequest",
     "DoctorResponse",
@@ -17,6 +46,44 @@ __all__ = [
     "VisitResponse",
     "VisitUpdateRequest",
 
+    "RecurrenceFrequencyEnum",
+    "VisitConflict",
+    "VisitRecurrenceRule",
+    "VisitSeriesCancelResponse",
+    "VisitSeriesCreateRequest",
+    "VisitSeriesResponse",
+
+    "SpecialityResponse",
+
+    "DashboardGroup",
+    "DashboardResponse",
+
+    "JobCreateRequest",
+    "JobResponse",
+
+    "AnalyticsRequest",
+    "AnalyticsResponse",
+    "DoctorUtilization",
+    "DoctorUtilizationResponse",
+    "LoadHeatmapResponse",
+    "ProcedureStats",
+    "ProcedureStatsResponse",
+    "RevenueStatsResponse",
+
+    "SlowQueryFingerprint",
+    "SlowQueryReport",
+    "SlowQuerySample",
+
+    "AuditEntryResponse",
+
+    "BatchResponse",
+
+    "CountModeEnum",
     "PageResponse",
     "PageVisitResponse",
+    "PartialPageVisitResponse",
+
+    "SyncDeleted",
+    "SyncEntityEnum",
+    "SyncResponse",
 ]
\ No newline at end of file
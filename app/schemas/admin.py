@@ -0,0 +1,31 @@
+import datetime
+from typing import Any
+
+from pydantic import BaseModel
+
+
+class SlowQuerySample(BaseModel):
+    fingerprint: str
+    statement: str
+    parameters: Any = None
+    route: str | None = None
+    duration_ms: float
+    dt_captured: datetime.datetime
+
+
+class SlowQueryFingerprint(BaseModel):
+    fingerprint: str
+    statement: str
+    count: int
+    total_ms: float
+    mean_ms: float
+    max_ms: float
+    routes: dict[str, int]
+    plan: Any = None
+    dt_last_seen: datetime.datetime | None = None
+
+
+class SlowQueryReport(BaseModel):
+    threshold_ms: float
+    recent: list[SlowQuerySample]
+    fingerprints: list[SlowQueryFingerprint]
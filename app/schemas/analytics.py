@@ -0,0 +1,67 @@
+import datetime
+import uuid
+
+from pydantic import BaseModel
+
+from app.db.enums import VisitStatusEnum
+
+
+class AnalyticsRequest(BaseModel):
+    # visits starting in [start_date, end_date), the last 30 days by default;
+    # times without an offset are in CLINIC_TIMEZONE
+    start_date: datetime.datetime | None = None
+    end_date: datetime.datetime | None = None
+
+    status: VisitStatusEnum | None = None
+
+
+class AnalyticsResponse(BaseModel):
+    start_date: datetime.datetime
+    end_date: datetime.datetime
+    # changes committed up to this moment are included
+    data_as_of: datetime.datetime
+
+    visits: int
+
+
+class RevenueStatsResponse(AnalyticsResponse):
+    # visits with a cost
+    priced_visits: int
+    cost_total: float
+    cost_mean: float | None = None
+    paid_total: float
+    # "p50" -> cost, over visits with a cost
+    percentiles: dict[str, float]
+
+
+class ProcedureStats(BaseModel):
+    procedure: str | None = None
+    visits: int
+    cost_total: float
+    cost_mean: float | None = None
+
+
+class ProcedureStatsResponse(AnalyticsResponse):
+    procedures: list[ProcedureStats]
+
+
+class LoadHeatmapResponse(AnalyticsResponse):
+    timezone: str
+    # [day of week, Monday first][hour of the clinic's day] by visit start
+    visit_counts: list[list[int]]
+    booked_hours: list[list[float]]
+
+
+class DoctorUtilization(BaseModel):
+    doctor_id: uuid.UUID
+    doctor_name: str | None = None
+    visits: int
+    booked_hours: float
+    # booked hours / (working days in the range * ANALYTICS_WORKDAY_HOURS)
+    utilization: float | None = None
+    paid_total: float
+
+
+class DoctorUtilizationResponse(AnalyticsResponse):
+    available_hours: float
+    doctors: list[DoctorUtilization]
@@ -0,0 +1,15 @@
+import uuid
+from typing import Any
+
+from app.db.enums import AuditActionEnum
+from app.schemas.base import BaseResponse
+
+
+class AuditEntryResponse(BaseResponse):
+    entity: str
+    entity_id: uuid.UUID
+    action: AuditActionEnum
+    actor: str | None = None
+    route: str | None = None
+    # {"field": [before, after]}
+    changes: dict[str, list[Any]]
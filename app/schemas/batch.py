@@ -0,0 +1,14 @@
+import uuid
+from typing import Generic, TypeVar
+
+from pydantic import BaseModel
+
+T = TypeVar("T")
+
+
+class BatchResponse(BaseModel, Generic[T]):
+    """
+    Entities in the order of the requested ids, ids without an entity in ``missing``.
+    """
+    items: list[T]
+    missing: list[uuid.UUID]
@@ -1,14 +1,24 @@
 from datetime import date
 
+from pydantic import computed_field
+
 from app.schemas.human import HumanCreateRequest, HumanResponse, HumanUpdateRequest
+from app.schemas.visit_stats import VisitStatsResponse
+from app.utils.common import phone_digits
 
 
 class ClientCreateRequest(HumanCreateRequest):
     phone_number: str
     date_of_birth: date | None = None
 
+    # stored for the phone search, not part of the request body
+    @computed_field
+    @property
+    def phone_digits(self) -> str | None:
+        return phone_digits(self.phone_number)
+
 
-class ClientResponse(HumanResponse):
+class ClientResponse(HumanResponse, VisitStatsResponse):
     phone_number: str
     date_of_birth: date | None = None
 
@@ -16,3 +26,9 @@ class ClientResponse(HumanResponse):
 class ClientUpdateRequest(HumanUpdateRequest):
     phone_number: str | None = None
     date_of_birth: date | None = None
+
+    # stored for the phone search, not part of the request body
+    @computed_field
+    @property
+    def phone_digits(self) -> str | None:
+        return None if self.phone_number is None else phone_digits(self.phone_number)
@@ -0,0 +1,25 @@
+import uuid
+from typing import Any
+
+from pydantic import BaseModel
+
+from app.schemas.base import BaseResponse
+from app.schemas.client import ClientResponse
+
+
+class ClientDuplicateResponse(BaseResponse):
+    client: ClientResponse
+    duplicate: ClientResponse
+
+    score: float
+    reasons: dict[str, Any]
+
+
+class ClientMergeRequest(BaseModel):
+    # merged into the client of the path and deleted
+    duplicate_id: uuid.UUID
+
+
+class ClientMergeResponse(BaseModel):
+    client: ClientResponse
+    visits_moved: int
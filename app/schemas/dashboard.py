@@ -0,0 +1,26 @@
+import datetime
+
+from pydantic import BaseModel
+
+from app.schemas.visit import VisitResponse
+
+
+class DashboardGroup(BaseModel):
+    key: str | None = None
+    label: str | None = None
+
+    count: int = 0
+    cost_total: float = 0
+    paid_total: float = 0
+
+
+class DashboardResponse(BaseModel):
+    date: datetime.date
+    generated_at: datetime.datetime
+
+    total: DashboardGroup
+    by_status: list[DashboardGroup]
+    by_doctor: list[DashboardGroup]
+    by_cabinet: list[DashboardGroup]
+
+    upcoming: list[VisitResponse]
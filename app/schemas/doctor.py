@@ -1,11 +1,12 @@
 from app.schemas.human import HumanCreateRequest, HumanResponse, HumanUpdateRequest
+from app.schemas.visit_stats import VisitStatsResponse
 
 
 class DoctorCreateRequest(HumanCreateRequest):
     speciality: str
 
 
-class DoctorResponse(HumanResponse):
+class DoctorResponse(HumanResponse, VisitStatsResponse):
     speciality: str
 
 
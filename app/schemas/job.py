@@ -0,0 +1,25 @@
+from datetime import datetime
+
+from pydantic import Field
+
+from app.db.enums import JobStatusEnum
+from app.schemas.base import BaseCreateRequest, BaseResponse
+
+
+class JobCreateRequest(BaseCreateRequest):
+    kind: str
+    params: dict = Field(default_factory=dict)
+
+
+class JobResponse(BaseResponse):
+    kind: str
+    params: dict
+    status: JobStatusEnum
+
+    progress: float
+    message: str | None = None
+    error: str | None = None
+    has_result: bool = False
+
+    dt_started: datetime | None = None
+    dt_finished: datetime | None = None
@@ -1,4 +1,5 @@
-from typing import Generic, TypeVar
+from enum import Enum
+from typing import Any, Generic, TypeVar
 
 from pydantic import BaseModel
 
@@ -7,6 +8,14 @@ from app.schemas import VisitResponse
 T = TypeVar("T")
 
 
+class CountModeEnum(str, Enum):
+    EXACT = "exact"
+    # counts up to VISIT_COUNT_CAP, total_capped tells that there are more
+    CAPPED = "capped"
+    # planner row estimate, exact when the estimate is below VISIT_COUNT_CAP
+    ESTIMATE = "estimate"
+
+
 class PageResponse(BaseModel, Generic[T]):
     total: int
     limit: int
@@ -16,3 +25,14 @@ class PageResponse(BaseModel, Generic[T]):
 
 class PageVisitResponse(PageResponse[VisitResponse]):
     total_cost: float = 0
+    count_mode: CountModeEnum = CountModeEnum.EXACT
+    total_capped: bool = False
+
+
+class PartialPageVisitResponse(PageResponse[dict[str, Any]]):
+    """
+    Page of visits reduced to the fields requested with ``fields=``.
+    """
+    total_cost: float = 0
+    count_mode: CountModeEnum = CountModeEnum.EXACT
+    total_capped: bool = False
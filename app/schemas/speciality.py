@@ -0,0 +1,10 @@
+import uuid
+
+from pydantic import BaseModel
+
+
+class SpecialityResponse(BaseModel):
+    id: uuid.UUID
+    name: str
+
+    doctor_count: int
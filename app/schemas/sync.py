@@ -0,0 +1,31 @@
+import uuid
+from enum import Enum
+
+from pydantic import BaseModel
+
+from app.schemas import ClientResponse, DoctorResponse, VisitResponse
+
+
+class SyncEntityEnum(str, Enum):
+    CLIENTS = "clients"
+    DOCTORS = "doctors"
+    VISITS = "visits"
+
+
+class SyncDeleted(BaseModel):
+    clients: list[uuid.UUID] = []
+    doctors: list[uuid.UUID] = []
+    visits: list[uuid.UUID] = []
+
+
+class SyncResponse(BaseModel):
+    """
+    Entities created or updated and ids deleted since the token. Pass ``token`` as ``since``
+    of the next request, right away while ``has_more`` is true.
+    """
+    clients: list[ClientResponse] = []
+    doctors: list[DoctorResponse] = []
+    visits: list[VisitResponse] = []
+    deleted: SyncDeleted
+    token: str
+    has_more: bool
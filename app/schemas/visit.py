@@ -1,11 +1,14 @@
 import datetime
 import uuid
 
-from pydantic import BaseModel
+from pydantic import BaseModel, model_validator
 
 from app.db.enums import VisitStatusEnum
 from app.schemas.base import BaseCreateRequest, BaseResponse
 
+# longest visit accepted, it bounds the start_date range scan of conflict checks
+MAX_VISIT_DURATION = datetime.timedelta(days=1)
+
 
 class VisitCreateRequest(BaseCreateRequest):
     client_id: uuid.UUID
@@ -18,6 +21,11 @@ class VisitCreateRequest(BaseCreateRequest):
     procedure: str | None = ""
     cost: float | None = 0
 
+    @model_validator(mode="after")
+    def check_duration(self):
+        _check_duration(self.start_date, self.end_date)
+        return self
+
 
 class VisitResponse(BaseResponse):
     client_id: uuid.UUID
@@ -35,6 +43,9 @@ class VisitResponse(BaseResponse):
     client_phone_number: str
     doctor_name: str
 
+    series_id: uuid.UUID | None = None
+    series_index: int | None = None
+
 
 class VisitSearchRequest(BaseModel):
     client_id: uuid.UUID | None = None
@@ -46,6 +57,10 @@ class VisitSearchRequest(BaseModel):
     cabinet: str | None = None
     procedure: str | None = None
     status: VisitStatusEnum | None = None
+    # visits of doctors with the speciality, see /specialities
+    speciality_id: uuid.UUID | None = None
+
+    q: str | None = None
 
 
 class VisitUpdateRequest(BaseModel):
@@ -59,3 +74,13 @@ class VisitUpdateRequest(BaseModel):
     cabinet: str | None = None
     procedure: str | None = None
     status: VisitStatusEnum | None = None
+
+    @model_validator(mode="after")
+    def check_duration(self):
+        _check_duration(self.start_date, self.end_date)
+        return self
+
+
+def _check_duration(start: datetime.datetime | None, end: datetime.datetime | None) -> None:
+    if start is not None and end is not None and end - start > MAX_VISIT_DURATION:
+        raise ValueError(f"A visit may last at most {MAX_VISIT_DURATION}")
@@ -0,0 +1,65 @@
+import datetime
+import uuid
+from enum import Enum
+
+from pydantic import BaseModel, Field, model_validator
+
+from app.schemas.base import BaseCreateRequest
+from app.schemas.visit import VisitCreateRequest, VisitResponse
+
+
+class RecurrenceFrequencyEnum(str, Enum):
+    DAILY = "daily"
+    WEEKLY = "weekly"
+    MONTHLY = "monthly"
+
+
+class VisitRecurrenceRule(BaseModel):
+    frequency: RecurrenceFrequencyEnum = RecurrenceFrequencyEnum.WEEKLY
+    interval: int = Field(default=1, ge=1, le=52)
+
+    # the series ends after count occurrences or on the until date, whichever comes first
+    count: int | None = Field(default=None, ge=1)
+    until: datetime.date | None = None
+
+    # weekly rules only, 0 is Monday; defaults to the weekday of the template
+    weekdays: list[int] | None = None
+
+    @model_validator(mode="after")
+    def check_bounds(self):
+        if self.count is None and self.until is None:
+            raise ValueError("count or until is required")
+        if self.weekdays is not None:
+            if self.frequency != RecurrenceFrequencyEnum.WEEKLY:
+                raise ValueError("weekdays are allowed for weekly rules only")
+            if not self.weekdays or not all(0 <= day <= 6 for day in self.weekdays):
+                raise ValueError("weekdays must be numbers from 0 (Monday) to 6 (Sunday)")
+        return self
+
+
+class VisitSeriesCreateRequest(BaseCreateRequest):
+    template: VisitCreateRequest
+    rule: VisitRecurrenceRule
+    # create the free occurrences instead of rejecting the whole series
+    skip_conflicts: bool = False
+
+
+class VisitConflict(BaseModel):
+    series_index: int
+    start_date: datetime.datetime
+    end_date: datetime.datetime
+
+    visit_id: uuid.UUID
+    reason: str
+
+
+class VisitSeriesResponse(BaseModel):
+    series_id: uuid.UUID
+    items: list[VisitResponse]
+    skipped: list[VisitConflict] = []
+
+
+class VisitSeriesCancelResponse(BaseModel):
+    deleted: list[uuid.UUID]
+    # paid occurrences are never deleted
+    kept_paid: list[uuid.UUID]
@@ -0,0 +1,15 @@
+from datetime import datetime
+
+from pydantic import BaseModel
+
+
+class VisitStatsResponse(BaseModel):
+    """
+    Denormalized, refreshed with every visit write. Their changes do not touch dt_updated,
+    so /sync returns them as of the last change of the client or doctor itself.
+    """
+
+    visit_count: int = 0
+    paid_total: float = 0
+    last_visit_at: datetime | None = None
+    next_visit_at: datetime | None = None
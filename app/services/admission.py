@@ -0,0 +1,328 @@
+import asyncio
+import contextlib
+import math
+import re
+import time
+from collections import deque
+from dataclasses import dataclass
+from enum import IntEnum
+from urllib.parse import parse_qs
+
+from starlette import status
+from starlette.responses import JSONResponse
+
+from app.config import DefaultSettings
+from app.utils.common import TTLCache, client_address, remote_user
+
+
+class PriorityClass(IntEnum):
+    """
+    Lower value is served first when requests wait for a free slot.
+    """
+
+    WRITE = 0
+    READ = 1
+    SEARCH = 2
+    REPORT = 3
+
+
+# (methods, path without PATH_PREFIX_API, class), the first match wins;
+# class None means the request is not admission controlled
+ROUTE_CLASSES: tuple[tuple[frozenset[str], re.Pattern, PriorityClass | None], ...] = (
+    # streams hold no connection while they wait for events
+    (frozenset({"GET"}), re.compile(r"^/visits/changes/?$"), None),
+    (frozenset({"GET", "DELETE"}), re.compile(r"^/admin(/|$)"), None),
+    (frozenset({"GET"}), re.compile(r"^/jobs/[^/]+/result/?$"), PriorityClass.REPORT),
+    (frozenset({"GET"}), re.compile(r"^/analytics/"), PriorityClass.REPORT),
+    # bulk reads of every change or of the whole audit log
+    (frozenset({"GET"}), re.compile(r"^/(sync|audit)/?$"), PriorityClass.REPORT),
+    (frozenset({"GET"}), re.compile(r"^/(clients|doctors|dashboard)/?$"), PriorityClass.SEARCH),
+)
+# GET /visits/ is a search when narrowed to a client, a doctor or a date range,
+# a report otherwise
+VISIT_LIST = re.compile(r"^/visits/?$")
+SELECTIVE_VISIT_FILTERS = (
+    frozenset({"client_id"}),
+    frozenset({"doctor_id"}),
+    frozenset({"start_date", "end_date"}),
+)
+SAFE_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+MAX_RATE_LIMITED_CALLERS = 10_000
+
+
+@dataclass
+class ClassPolicy:
+    concurrency: int
+    queue_size: int
+    max_wait: float
+    # tokens taken from the caller's bucket per request
+    cost: float = 1
+
+
+@dataclass
+class ClassMetrics:
+    in_flight: int = 0
+    admitted: int = 0
+    shed_queue_full: int = 0
+    shed_timeout: int = 0
+    rate_limited: int = 0
+    wait_seconds_total: float = 0
+    wait_seconds_max: float = 0
+
+
+class Overloaded(Exception):
+    def __init__(self, reason: str, retry_after: float) -> None:
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    Limits requests running at once to the connection pool size. Every class has its own
+    concurrency limit and a bounded queue, a freed slot goes to the most important waiter.
+    A request which cannot start before its class deadline is shed.
+    """
+
+    def __init__(self, capacity: int, policies: dict[PriorityClass, ClassPolicy]) -> None:
+        self.capacity = capacity
+        self.policies = policies
+        self.in_use = 0
+        self.metrics = {priority: ClassMetrics() for priority in PriorityClass}
+        self._waiters: dict[PriorityClass, deque[asyncio.Future]] = {
+            priority: deque() for priority in PriorityClass
+        }
+
+    @classmethod
+    def from_settings(cls, settings: DefaultSettings) -> "AdmissionController":
+        capacity = settings.ADMISSION_CAPACITY or settings.DB_POOL_SIZE
+        queue_size = settings.ADMISSION_QUEUE_SIZE
+        max_wait = settings.ADMISSION_MAX_WAIT_SECONDS
+        # reads never take the slots reserved for writes
+        reads = max(capacity - settings.ADMISSION_WRITE_RESERVE, 1)
+        return cls(capacity, {
+            PriorityClass.WRITE: ClassPolicy(capacity, queue_size, max_wait * 2),
+            PriorityClass.READ: ClassPolicy(reads, queue_size, max_wait),
+            PriorityClass.SEARCH: ClassPolicy(
+                min(settings.ADMISSION_SEARCH_CONCURRENCY, reads), queue_size, max_wait
+            ),
+            PriorityClass.REPORT: ClassPolicy(
+                min(settings.ADMISSION_REPORT_CONCURRENCY, reads), queue_size, max_wait,
+                cost=settings.RATE_LIMIT_REPORT_COST,
+            ),
+        })
+
+    def queue_depth(self, priority: PriorityClass) -> int:
+        return len(self._waiters[priority])
+
+    async def acquire(self, priority: PriorityClass) -> None:
+        policy = self.policies[priority]
+        metrics = self.metrics[priority]
+        waiters = self._waiters[priority]
+        # newcomers do not overtake requests of their class which already wait
+        if not waiters and self._can_start(priority):
+            self._start(priority)
+            return
+        if len(waiters) >= policy.queue_size:
+            metrics.shed_queue_full += 1
+            raise Overloaded("queue_full", policy.max_wait)
+
+        future = asyncio.get_running_loop().create_future()
+        waiters.append(future)
+        started = time.monotonic()
+        try:
+            async with asyncio.timeout(policy.max_wait):
+                await future
+        except (TimeoutError, asyncio.CancelledError) as e:
+            if future.done() and not future.cancelled():
+                # the slot was handed over while the deadline expired
+                self.release(priority)
+            else:
+                future.cancel()
+                with contextlib.suppress(ValueError):
+                    waiters.remove(future)
+            if isinstance(e, TimeoutError):
+                metrics.shed_timeout += 1
+                raise Overloaded("timeout", policy.max_wait) from e
+            raise
+        waited = time.monotonic() - started
+        metrics.wait_seconds_total += waited
+        metrics.wait_seconds_max = max(metrics.wait_seconds_max, waited)
+
+    def release(self, priority: PriorityClass) -> None:
+        self.in_use -= 1
+        self.metrics[priority].in_flight -= 1
+        self._dispatch()
+
+    def render_metrics(self) -> str:
+        """
+        Prometheus text exposition of the admission state.
+        """
+        lines = [
+            "# TYPE medcenter_admission_capacity gauge",
+            f"medcenter_admission_capacity {self.capacity}",
+            "# TYPE medcenter_admission_in_use gauge",
+            f"medcenter_admission_in_use {self.in_use}",
+        ]
+        series = (
+            ("in_flight", "gauge", lambda p, m: m.in_flight),
+            ("queue_depth", "gauge", lambda p, m: self.queue_depth(p)),
+            ("admitted_total", "counter", lambda p, m: m.admitted),
+            ("wait_seconds_sum", "counter", lambda p, m: round(m.wait_seconds_total, 6)),
+            ("wait_seconds_max", "gauge", lambda p, m: round(m.wait_seconds_max, 6)),
+        )
+        for name, kind, value in series:
+            lines.append(f"# TYPE medcenter_admission_{name} {kind}")
+            for priority, metrics in self.metrics.items():
+                lines.append(
+                    f'medcenter_admission_{name}{{class="{priority.name.lower()}"}} '
+                    f"{value(priority, metrics)}"
+                )
+        lines.append("# TYPE medcenter_admission_shed_total counter")
+        for priority, metrics in self.metrics.items():
+            for reason, value in (
+                    ("queue_full", metrics.shed_queue_full),
+                    ("timeout", metrics.shed_timeout),
+                    ("rate_limited", metrics.rate_limited),
+            ):
+                lines.append(
+                    f'medcenter_admission_shed_total{{class="{priority.name.lower()}",'
+                    f'reason="{reason}"}} {value}'
+                )
+        return "\n".join(lines) + "\n"
+
+    def _can_start(self, priority: PriorityClass) -> bool:
+        return (
+            self.in_use < self.capacity
+            and self.metrics[priority].in_flight < self.policies[priority].concurrency
+        )
+
+    def _start(self, priority: PriorityClass) -> None:
+        self.in_use += 1
+        self.metrics[priority].in_flight += 1
+        self.metrics[priority].admitted += 1
+
+    def _dispatch(self) -> None:
+        for priority in PriorityClass:
+            waiters = self._waiters[priority]
+            while waiters and self._can_start(priority):
+                future = waiters.popleft()
+                if not future.done():
+                    self._start(priority)
+                    future.set_result(None)
+            if self.in_use >= self.capacity:
+                return
+
+
+class RateLimiter:
+    """
+    Token bucket per caller. A bucket left alone until it refills is forgotten.
+    """
+
+    def __init__(self, rate: float, burst: float) -> None:
+        self.rate = rate
+        self.burst = burst
+        # (tokens, monotonic time of the last update)
+        self._buckets: TTLCache[str, tuple[float, float]] = TTLCache(
+            MAX_RATE_LIMITED_CALLERS, burst / rate
+        )
+
+    @classmethod
+    def from_settings(cls, settings: DefaultSettings) -> "RateLimiter | None":
+        if settings.RATE_LIMIT_PER_SECOND <= 0:
+            return None
+        return cls(settings.RATE_LIMIT_PER_SECOND, settings.RATE_LIMIT_BURST)
+
+    def take(self, caller: str, cost: float) -> float:
+        """
+        Seconds to wait before the request would be allowed, 0 when it is allowed now.
+        """
+        now = time.monotonic()
+        tokens, updated = self._buckets.get(caller) or (self.burst, now)
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        if tokens < cost:
+            self._buckets.set(caller, (tokens, now))
+            return (cost - tokens) / self.rate
+        self._buckets.set(caller, (tokens - cost, now))
+        return 0
+
+
+class AdmissionMiddleware:
+    """
+    Rate limits callers and admits requests through the AdmissionController
+    before they reach routing and take a database connection.
+    """
+
+    def __init__(
+            self,
+            app,
+            controller: AdmissionController,
+            rate_limiter: RateLimiter | None,
+            prefix: str,
+    ) -> None:
+        self.app = app
+        self.controller = controller
+        self.rate_limiter = rate_limiter
+        self.prefix = prefix.rstrip("/")
+
+    async def __call__(self, scope, receive, send) -> None:
+        priority = self._classify(scope) if scope["type"] == "http" else None
+        if priority is None:
+            await self.app(scope, receive, send)
+            return
+
+        policy = self.controller.policies[priority]
+        if self.rate_limiter is not None:
+            retry_after = self.rate_limiter.take(_caller(scope), policy.cost)
+            if retry_after:
+                self.controller.metrics[priority].rate_limited += 1
+                await _reject(
+                    status.HTTP_429_TOO_MANY_REQUESTS, "Too many requests", retry_after
+                )(scope, receive, send)
+                return
+
+        try:
+            await self.controller.acquire(priority)
+        except Overloaded as e:
+            await _reject(
+                status.HTTP_503_SERVICE_UNAVAILABLE, "Server is overloaded", e.retry_after
+            )(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(priority)
+
+    def _classify(self, scope) -> PriorityClass | None:
+        path: str = scope["path"]
+        if not path.startswith(self.prefix):
+            return None
+        return classify(scope["method"], path[len(self.prefix):], scope.get("query_string", b""))
+
+
+def classify(method: str, path: str, query_string: bytes = b"") -> PriorityClass | None:
+    if method == "GET" and VISIT_LIST.match(path):
+        filters = parse_qs(query_string.decode("latin-1")).keys()
+        if any(selective <= filters for selective in SELECTIVE_VISIT_FILTERS):
+            return PriorityClass.SEARCH
+        return PriorityClass.REPORT
+    for methods, pattern, priority in ROUTE_CLASSES:
+        if method in methods and pattern.match(path):
+            return priority
+    return PriorityClass.READ if method in SAFE_METHODS else PriorityClass.WRITE
+
+
+def _caller(scope) -> str:
+    """
+    The user authenticated by the proxy or the forwarded client address. Not X-Client-Id:
+    a caller could dodge its limit with a new one per request.
+    """
+    return remote_user(scope) or client_address(scope) or ""
+
+
+def _reject(status_code: int, detail: str, retry_after: float) -> JSONResponse:
+    return JSONResponse(
+        status_code=status_code,
+        content={"detail": detail},
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
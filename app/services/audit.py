@@ -0,0 +1,200 @@
+import asyncio
+import contextlib
+import datetime
+import json
+import logging
+import uuid
+from collections import deque
+from typing import Any
+
+import asyncpg
+from fastapi.encoders import jsonable_encoder
+
+from app.config import DefaultSettings, get_settings
+from app.db.connection.slow_queries import current_scope, route_name
+from app.db.enums import AuditActionEnum
+from app.utils.common import client_address, remote_user
+
+logger = logging.getLogger(__name__)
+
+TABLE = "audit_log"
+COPY_COLUMNS = ("dt_created", "entity", "entity_id", "action", "actor", "route", "changes")
+# maintained by the database itself (ids, timestamps, search vector, visit statistics)
+EXCLUDED_FIELDS = frozenset({
+    "id", "dt_created", "dt_updated", "search_vector",
+    "visit_count", "paid_total", "last_visit_at", "next_visit_at",
+})
+RETRY_DELAY_SECONDS = 5
+
+
+class AuditWriter:
+    """
+    Write-behind audit log. Changes are recorded after their commit into an in-memory
+    buffer and written with COPY on a separate connection, when AUDIT_BATCH_SIZE entries
+    are waiting or every AUDIT_FLUSH_INTERVAL_SECONDS. stop() writes everything left.
+
+    Entries of a process killed before a flush are lost: that is the price of not adding
+    a round trip to every write. While the database is unavailable the buffer keeps up
+    to AUDIT_MAX_BUFFER entries, the oldest are dropped beyond that.
+    """
+
+    def __init__(self, settings: DefaultSettings) -> None:
+        self.enabled = settings.AUDIT_ENABLED
+        self.dsn = settings.database_uri_sync
+        self.batch_size = settings.AUDIT_BATCH_SIZE
+        self.flush_interval = settings.AUDIT_FLUSH_INTERVAL_SECONDS
+        self.max_buffer = settings.AUDIT_MAX_BUFFER
+        self.written = 0
+        self.dropped = 0
+        self._buffer: deque[tuple[Any, ...]] = deque()
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._connection: asyncpg.Connection | None = None
+        self._stopping = False
+        self._task: asyncio.Task | None = None
+
+    def record(
+            self,
+            entity: str,
+            entity_id: uuid.UUID,
+            action: AuditActionEnum,
+            before: dict[str, Any] | None = None,
+            after: dict[str, Any] | None = None,
+    ) -> None:
+        """
+        Buffers the difference between the states, an update which changed nothing is skipped.
+        """
+        if not self.enabled:
+            return
+        changes = diff_states(before or {}, after or {})
+        if action is AuditActionEnum.UPDATE and not changes:
+            return
+        scope = current_scope.get()
+        self._buffer.append((
+            datetime.datetime.now(datetime.UTC),
+            entity,
+            entity_id,
+            action.value,
+            _actor(scope),
+            route_name(scope),
+            json.dumps(changes),
+        ))
+        if len(self._buffer) > self.max_buffer:
+            self._buffer.popleft()
+            self.dropped += 1
+        if len(self._buffer) >= self.batch_size:
+            self._wakeup.set()
+
+    @property
+    def pending(self) -> int:
+        return len(self._buffer)
+
+    def render_metrics(self) -> str:
+        return (
+            "# TYPE medcenter_audit_pending gauge\n"
+            f"medcenter_audit_pending {len(self._buffer)}\n"
+            "# TYPE medcenter_audit_written_total counter\n"
+            f"medcenter_audit_written_total {self.written}\n"
+        )
+
+    async def start(self) -> None:
+        if self.enabled:
+            self._stopping = False
+            self._task = asyncio.create_task(self._flush_forever(), name="audit-writer")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            # no cancellation: a COPY in progress is finished, then the rest is written
+            self._stopping = True
+            self._wakeup.set()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        try:
+            await self.flush()
+        except Exception:
+            logger.exception("Could not write %d audit entries on shutdown", len(self._buffer))
+        finally:
+            await self._disconnect()
+
+    async def flush(self) -> None:
+        """
+        Writes all buffered entries, a failed batch is put back in front of the buffer.
+        """
+        async with self._flush_lock:
+            while self._buffer:
+                batch = [self._buffer.popleft() for _ in range(min(len(self._buffer), self.batch_size))]
+                try:
+                    if self._connection is None or self._connection.is_closed():
+                        self._connection = await asyncpg.connect(self.dsn)
+                    await self._connection.copy_records_to_table(
+                        TABLE, records=batch, columns=COPY_COLUMNS
+                    )
+                except BaseException:
+                    self._buffer.extendleft(reversed(batch))
+                    raise
+                self.written += len(batch)
+
+    async def _flush_forever(self) -> None:
+        while not self._stopping:
+            with contextlib.suppress(TimeoutError):
+                async with asyncio.timeout(self.flush_interval):
+                    await self._wakeup.wait()
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Could not write audit entries, %d are waiting", len(self._buffer))
+                await self._disconnect()
+                await asyncio.sleep(RETRY_DELAY_SECONDS)
+            if self.dropped:
+                logger.error("Audit buffer is full, %d entries were dropped", self.dropped)
+                self.dropped = 0
+
+    async def _disconnect(self) -> None:
+        if self._connection is not None:
+            with contextlib.suppress(Exception):
+                await self._connection.close()
+            self._connection = None
+
+
+def audit_state(entity: Any) -> dict[str, Any]:
+    """
+    Audited column values of a loaded ORM object.
+    """
+    return {
+        attribute.key: getattr(entity, attribute.key)
+        for attribute in entity.__mapper__.column_attrs
+        if attribute.key not in EXCLUDED_FIELDS
+    }
+
+
+def audited_columns(model: Any) -> list[Any]:
+    return [
+        column for column in model.__table__.columns
+        if column.name not in EXCLUDED_FIELDS and column.computed is None
+    ]
+
+
+def diff_states(before: dict[str, Any], after: dict[str, Any]) -> dict[str, list[Any]]:
+    """
+    ``{"field": [before, after]}`` of the fields which differ, JSON-compatible.
+    """
+    before, after = jsonable_encoder(before), jsonable_encoder(after)
+    return {
+        field: [before.get(field), after.get(field)]
+        for field in sorted(before.keys() | after.keys())
+        if before.get(field) != after.get(field)
+    }
+
+
+def _actor(scope: dict | None) -> str | None:
+    """
+    The user authenticated by nginx or the forwarded client address of the request,
+    None for jobs (their route is the kind).
+    """
+    if scope is None:
+        return None
+    return remote_user(scope) or client_address(scope)
+
+
+audit_writer = AuditWriter(get_settings())
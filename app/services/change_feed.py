@@ -0,0 +1,160 @@
+import asyncio
+import json
+import logging
+import uuid
+from datetime import UTC, date, datetime
+from typing import Any
+from zoneinfo import ZoneInfo
+
+import asyncpg
+
+from app.config import DefaultSettings, get_settings
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "medcenter_changes"
+
+
+class ChangeFilter:
+    """
+    Subscriber filter. A visit event matches when the visit matches before or after the change,
+    ``day`` is a day in CLINIC_TIMEZONE.
+    """
+
+    def __init__(
+            self,
+            tables: frozenset[str] = frozenset({"visit"}),
+            doctor_id: uuid.UUID | None = None,
+            cabinet: str | None = None,
+            day: date | None = None,
+    ) -> None:
+        self.tables = tables
+        self.doctor_id = doctor_id
+        self.cabinet = cabinet
+        self.day = day
+        self.timezone = ZoneInfo(get_settings().CLINIC_TIMEZONE)
+
+    def matches(self, event: dict[str, Any]) -> bool:
+        if event.get("table") not in self.tables:
+            return False
+        if event["table"] != "visit":
+            return True
+        return self._matches_state(event, "") or self._matches_state(event, "old_")
+
+    def _matches_state(self, event: dict[str, Any], prefix: str) -> bool:
+        if prefix and f"{prefix}doctor_id" not in event:
+            return False
+        if self.doctor_id and event.get(f"{prefix}doctor_id") != str(self.doctor_id):
+            return False
+        if self.cabinet and event.get(f"{prefix}cabinet") != self.cabinet:
+            return False
+        if self.day:
+            start_date = event.get(f"{prefix}start_date")
+            if not start_date or self._local_date(start_date) != self.day:
+                return False
+        return True
+
+    def _local_date(self, value: str) -> date:
+        moment = datetime.fromisoformat(value)
+        if moment.tzinfo is None:
+            moment = moment.replace(tzinfo=UTC)
+        return moment.astimezone(self.timezone).date()
+
+
+class Subscription:
+    def __init__(self, change_filter: ChangeFilter, queue_size: int) -> None:
+        self.filter = change_filter
+        self.queue: asyncio.Queue[dict[str, Any] | None] = asyncio.Queue(queue_size)
+        self.overflowed = False
+
+    def push(self, event: dict[str, Any]) -> None:
+        if self.overflowed or not self.filter.matches(event):
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # a slow consumer is disconnected and resumes from its last event id
+            self.close()
+
+    def close(self) -> None:
+        """
+        Ends the stream: the consumer receives None after the events already queued.
+        """
+        self.overflowed = True
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(None)
+
+
+class ChangeFeed:
+    """
+    One LISTEN connection per process fanned out to any number of subscribers.
+    """
+
+    RECONNECT_MAX_DELAY_SECONDS = 30
+
+    def __init__(self, settings: DefaultSettings) -> None:
+        self.dsn = settings.database_uri_sync
+        self.queue_size = settings.CHANGE_FEED_QUEUE_SIZE
+        self._subscriptions: set[Subscription] = set()
+        self._connection: asyncpg.Connection | None = None
+        self._lost = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    async def start(self) -> None:
+        self._task = asyncio.create_task(self._listen_forever(), name="change-feed")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        for subscription in self._subscriptions:
+            subscription.close()
+        self._subscriptions.clear()
+
+    def subscribe(self, change_filter: ChangeFilter) -> Subscription:
+        subscription = Subscription(change_filter, self.queue_size)
+        self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self._subscriptions.discard(subscription)
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscriptions)
+
+    async def _listen_forever(self) -> None:
+        delay = 1
+        while True:
+            try:
+                self._connection = await asyncpg.connect(self.dsn)
+                self._lost.clear()
+                self._connection.add_termination_listener(lambda _: self._lost.set())
+                await self._connection.add_listener(CHANNEL, self._on_notification)
+                delay = 1
+                await self._lost.wait()
+                logger.warning("Change feed connection lost, reconnecting")
+                self._disconnect_subscribers()
+            except asyncio.CancelledError:
+                if self._connection is not None:
+                    await self._connection.close()
+                raise
+            except Exception:
+                logger.exception("Change feed connection failed")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.RECONNECT_MAX_DELAY_SECONDS)
+
+    def _disconnect_subscribers(self) -> None:
+        # events may have been missed, subscribers have to resume by their last event id
+        for subscription in tuple(self._subscriptions):
+            subscription.close()
+
+    def _on_notification(self, _connection, _pid, _channel, payload: str) -> None:
+        try:
+            event = json.loads(payload)
+        except ValueError:
+            logger.warning("Malformed change notification: %s", payload)
+            return
+        for subscription in tuple(self._subscriptions):
+            subscription.push(event)
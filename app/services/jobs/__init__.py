@@ -0,0 +1,10 @@
+from . import handlers  # noqa: F401  registers built-in jobs
+from .runner import JobContext, JobResult, JobRunner, get_job_kinds, register_job
+
+__all__ = [
+    "JobContext",
+    "JobResult",
+    "JobRunner",
+    "get_job_kinds",
+    "register_job",
+]
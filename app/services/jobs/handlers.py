@@ -0,0 +1,113 @@
+import csv
+import io
+import json
+from enum import Enum
+from pathlib import Path
+
+from app.config import get_settings
+from app.schemas import VisitSearchRequest
+from app.utils.dedup import svc_find_client_duplicates
+from app.utils.export import svc_export_visits_parquet
+from app.utils.stats import dal_rebuild_visit_stats
+from app.utils.visit import dal_count_visits_by_filter, dal_stream_visits_by_filter
+
+from .runner import JobContext, JobResult, register_job
+
+VISIT_EXPORT_COLUMNS = (
+    "id",
+    "start_date",
+    "end_date",
+    "status",
+    "client_name",
+    "client_phone_number",
+    "doctor_name",
+    "cabinet",
+    "procedure",
+    "cost",
+)
+
+
+@register_job("rebuild_visit_stats")
+async def rebuild_visit_stats(context: JobContext) -> None:
+    await dal_rebuild_visit_stats(context.session)
+
+
+@register_job("dedup_clients")
+async def dedup_clients(context: JobContext) -> JobResult:
+    """
+    Suggests duplicate clients, see GET /clients/duplicates. The result is a summary.
+    """
+
+    async def progress(processed: int, total: int) -> None:
+        await context.report_progress(
+            processed / total if total else 1, f"{processed}/{total} keys"
+        )
+
+    summary = await svc_find_client_duplicates(context.session, progress)
+    return JobResult(
+        content=json.dumps(summary).encode(),
+        content_type="application/json",
+        filename="dedup_clients.json",
+    )
+
+
+@register_job("export_visits_csv")
+async def export_visits_csv(context: JobContext) -> JobResult:
+    """
+    Exports visits matching VisitSearchRequest given in params to CSV. The result is stored
+    batch by batch in chunks, memory does not grow with the number of visits.
+    """
+    search = VisitSearchRequest.model_validate(context.params)
+    total = await dal_count_visits_by_filter(context.session, search)
+
+    result = await context.result_writer()
+    await result.write(_csv_lines([VISIT_EXPORT_COLUMNS]).encode("utf-8-sig"))
+    exported = 0
+    async for visits in dal_stream_visits_by_filter(context.session, search):
+        rows = [
+            [_csv_value(getattr(visit, column)) for column in VISIT_EXPORT_COLUMNS]
+            for visit in visits
+        ]
+        await result.write(_csv_lines(rows).encode("utf-8"))
+        exported += len(visits)
+        await context.report_progress(exported / total if total else 1, f"{exported}/{total}")
+    await result.close()
+
+    return JobResult(
+        content_type="text/csv; charset=utf-8",
+        chunked=True,
+        filename="visits.csv",
+    )
+
+
+@register_job("export_visits_parquet")
+async def export_visits_parquet(context: JobContext) -> JobResult:
+    """
+    Writes the Parquet export to EXPORT_DIR, params: {"full": true} exports every month again.
+    The result is the summary of exported, removed and unchanged months.
+    """
+
+    async def progress(exported: int, total: int) -> None:
+        await context.report_progress(exported / total if total else 1, f"{exported}/{total}")
+
+    summary = await svc_export_visits_parquet(
+        context.session,
+        Path(get_settings().EXPORT_DIR),
+        full=bool(context.params.get("full", False)),
+        progress=progress,
+    )
+    return JobResult(
+        content=json.dumps(summary).encode(),
+        content_type="application/json",
+        filename="export_visits_parquet.json",
+    )
+
+
+def _csv_lines(rows) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue()
+
+
+def _csv_value(value):
+    return value.value if isinstance(value, Enum) else value
@@ -0,0 +1,253 @@
+import asyncio
+import contextlib
+import logging
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from typing import Any
+
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.config import DefaultSettings, get_settings
+from app.db.connection import slow_query_recorder
+from app.db.connection.slow_queries import current_scope
+from app.db.models import Job
+from app.utils.job import (
+    dal_add_job_result_chunk,
+    dal_claim_next_job,
+    dal_delete_finished_jobs,
+    dal_delete_job_result_chunks,
+    dal_fail_job,
+    dal_finish_job,
+    dal_requeue_job,
+    dal_touch_job,
+    dal_update_job_progress,
+)
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class JobResult:
+    """
+    Result of a job: ``content`` stored in the job row or, with ``chunked``, what the
+    handler wrote with JobContext.result_writer (results of any size).
+    """
+
+    content_type: str
+    content: bytes | None = None
+    chunked: bool = False
+    filename: str | None = None
+
+
+class JobContext:
+    """
+    Everything a job handler gets: its own session, parameters and a progress reporter.
+    """
+
+    PROGRESS_INTERVAL_SECONDS = 1.0
+
+    def __init__(self, job: Job, session: AsyncSession, session_maker: sessionmaker) -> None:
+        self.job = job
+        self.session = session
+        self.params: dict[str, Any] = job.params or {}
+        self._session_maker = session_maker
+        self._reported_at = float("-inf")
+
+    async def report_progress(self, progress: float, message: str | None = None) -> None:
+        """
+        Stores progress (0..1), at most once per second. Uses a separate session
+        so the handler's transaction is not committed.
+        """
+        if time.monotonic() - self._reported_at < self.PROGRESS_INTERVAL_SECONDS:
+            return
+        self._reported_at = time.monotonic()
+        async with self._session_maker() as session:
+            await dal_update_job_progress(session, self.job.id, min(max(progress, 0), 1), message)
+
+    async def result_writer(self) -> "JobResultWriter":
+        """
+        Writer of a chunked result, chunks left by an earlier attempt are deleted.
+        """
+        async with self._session_maker() as session:
+            await dal_delete_job_result_chunks(session, self.job.id)
+        return JobResultWriter(self.job, self._session_maker)
+
+
+class JobResultWriter:
+    """
+    Stores a result in JOB_RESULT_CHUNK_BYTES chunks as it is written, in separate
+    sessions like progress, so memory does not grow with the result.
+    """
+
+    def __init__(self, job: Job, session_maker: sessionmaker) -> None:
+        self.job = job
+        self.chunk_bytes = get_settings().JOB_RESULT_CHUNK_BYTES
+        self._session_maker = session_maker
+        self._buffer = bytearray()
+        self._seq = 0
+
+    async def write(self, data: bytes) -> None:
+        self._buffer += data
+        while len(self._buffer) >= self.chunk_bytes:
+            await self._store(bytes(self._buffer[:self.chunk_bytes]))
+            del self._buffer[:self.chunk_bytes]
+
+    async def close(self) -> None:
+        if self._buffer:
+            await self._store(bytes(self._buffer))
+            self._buffer.clear()
+
+    async def _store(self, data: bytes) -> None:
+        async with self._session_maker() as session:
+            await dal_add_job_result_chunk(session, self.job.id, self._seq, data)
+        self._seq += 1
+
+
+JobHandler = Callable[[JobContext], Awaitable[JobResult | None]]
+
+_handlers: dict[str, JobHandler] = {}
+
+
+def register_job(kind: str) -> Callable[[JobHandler], JobHandler]:
+    def decorator(handler: JobHandler) -> JobHandler:
+        _handlers[kind] = handler
+        return handler
+
+    return decorator
+
+
+def get_job_kinds() -> list[str]:
+    return sorted(_handlers)
+
+
+class JobRunner:
+    """
+    In-process worker pool for jobs stored in the job table.
+
+    Jobs use a dedicated engine with JOB_CONCURRENCY * 3 connections (handler, progress
+    and heartbeat sessions), so they can never exhaust the pool used by requests.
+
+    A running job refreshes its heartbeat every JOB_STALE_SECONDS / 3 whatever its handler
+    does, so only jobs of a stopped worker are claimed again, at most JOB_MAX_ATTEMPTS times.
+    Jobs finished more than JOB_RETENTION_DAYS ago are deleted with their results.
+    """
+
+    CLEANUP_INTERVAL_SECONDS = 60 * 60
+
+    def __init__(self, settings: DefaultSettings) -> None:
+        self.concurrency = settings.JOB_CONCURRENCY
+        self.poll_seconds = settings.JOB_POLL_SECONDS
+        self.stale_seconds = settings.JOB_STALE_SECONDS
+        self.max_attempts = settings.JOB_MAX_ATTEMPTS
+        self.retention_days = settings.JOB_RETENTION_DAYS
+        self.engine = create_async_engine(
+            settings.database_uri,
+            pool_size=self.concurrency * 3,
+            max_overflow=0,
+            **settings.engine_options,
+        )
+        self.session_maker = sessionmaker(self.engine, class_=AsyncSession, expire_on_commit=False)
+        slow_query_recorder.attach(self.engine)
+        self._wakeup = asyncio.Event()
+        self._workers: list[asyncio.Task] = []
+
+    async def start(self) -> None:
+        self._workers = [
+            *(
+                asyncio.create_task(self._worker(), name=f"job-worker-{number}")
+                for number in range(self.concurrency)
+            ),
+            asyncio.create_task(self._cleanup_forever(), name="job-cleanup"),
+        ]
+
+    async def stop(self) -> None:
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        await self.engine.dispose()
+
+    def wake(self) -> None:
+        self._wakeup.set()
+
+    async def _worker(self) -> None:
+        while True:
+            try:
+                async with self.session_maker() as session:
+                    job = await dal_claim_next_job(
+                        session, self.stale_seconds, self.max_attempts
+                    )
+            except Exception:
+                logger.exception("Failed to claim a job")
+                job = None
+
+            if job is None:
+                self._wakeup.clear()
+                with contextlib.suppress(TimeoutError):
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_seconds)
+                continue
+
+            # slow queries of the job are attributed to "JOB <kind>"
+            token = current_scope.set({"method": "JOB", "path": job.kind})
+            try:
+                await self._run(job)
+            finally:
+                current_scope.reset(token)
+
+    async def _run(self, job: Job) -> None:
+        handler = _handlers.get(job.kind)
+        if handler is None:
+            async with self.session_maker() as session:
+                await dal_fail_job(session, job.id, f"Unknown job kind: {job.kind}")
+            return
+
+        heartbeat = asyncio.create_task(self._heartbeat(job), name=f"job-heartbeat-{job.id}")
+        try:
+            async with self.session_maker() as session:
+                result = await handler(JobContext(job, session, self.session_maker))
+        except asyncio.CancelledError:
+            async with self.session_maker() as session:
+                await asyncio.shield(dal_requeue_job(session, job.id))
+            raise
+        except Exception as e:
+            logger.exception("Job %s (%s) failed", job.id, job.kind)
+            async with self.session_maker() as session:
+                await dal_fail_job(session, job.id, repr(e))
+            return
+        finally:
+            heartbeat.cancel()
+
+        async with self.session_maker() as session:
+            if result is None:
+                await dal_finish_job(session, job.id)
+            else:
+                await dal_finish_job(
+                    session,
+                    job.id,
+                    result.content,
+                    result.content_type,
+                    result.filename,
+                    result.chunked,
+                )
+
+    async def _cleanup_forever(self) -> None:
+        while True:
+            try:
+                async with self.session_maker() as session:
+                    deleted = await dal_delete_finished_jobs(session, self.retention_days)
+                if deleted:
+                    logger.info("Deleted %d finished jobs", deleted)
+            except Exception:
+                logger.exception("Failed to delete finished jobs")
+            await asyncio.sleep(self.CLEANUP_INTERVAL_SECONDS)
+
+    async def _heartbeat(self, job: Job) -> None:
+        while True:
+            await asyncio.sleep(self.stale_seconds / 3)
+            try:
+                async with self.session_maker() as session:
+                    await dal_touch_job(session, job.id)
+            except Exception:
+                logger.exception("Failed to refresh the heartbeat of job %s", job.id)
@@ -0,0 +1,285 @@
+import asyncio
+import datetime
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from collections.abc import Awaitable, Callable, Hashable, Iterable, Sequence, Sized
+from typing import Any, TypeVar
+from zoneinfo import ZoneInfo
+
+from app.config import DefaultSettings, get_settings
+from app.utils.common import TTLCache
+
+logger = logging.getLogger(__name__)
+
+V = TypeVar("V")
+
+# rows not bumped for longer than the entry TTL are deleted after this many bumps
+PURGE_EVERY_BUMPS = 1000
+SQLITE_BUSY_TIMEOUT_MS = 1000
+# a visit page filtered by a longer date range depends on all visits
+MAX_DATE_SCOPES = 33
+ONE_DAY = datetime.timedelta(days=1)
+
+# scopes: "visits" (any visit), "names" (client and doctor attributes shown in visit rows),
+# "clients" and "doctors" (any client or doctor, their visit statistics included),
+# "client:<id>", "doctor:<id>" and "date:<YYYY-MM-DD>" (a day in CLINIC_TIMEZONE)
+VISITS = "visits"
+NAMES = "names"
+CLIENTS = "clients"
+DOCTORS = "doctors"
+
+
+class GenerationStore:
+    """
+    Generation of every scope in a SQLite file, WAL mode lets the workers of a host read it
+    while one of them writes. A bump stores a new random value rather than an increment:
+    a recreated file can never bring back a value some worker saw before. A missing scope
+    has generation 0.
+
+    Calls block up to SQLITE_BUSY_TIMEOUT_MS on a locked file, ResultCache makes them in
+    worker threads; the connection is shared by the threads under a lock.
+    """
+
+    def __init__(self, path: str, retention_seconds: float) -> None:
+        self.path = path
+        self.retention_seconds = retention_seconds
+        self._connection: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+        self._bumps = 0
+
+    def read(self, scopes: Iterable[str]) -> dict[str, tuple[int, float]]:
+        """
+        ``{scope: (generation, bumped_at)}`` of the scopes bumped at least once.
+        """
+        scopes = list(scopes)
+        with self._lock:
+            rows = self._connect().execute(
+                f"SELECT scope, value, bumped_at FROM generation WHERE scope IN "
+                f"({', '.join('?' * len(scopes))})",
+                scopes,
+            ).fetchall()
+        return {scope: (value, bumped_at) for scope, value, bumped_at in rows}
+
+    def bump(self, scopes: Iterable[str]) -> None:
+        now = time.time()
+        with self._lock, self._connect() as connection:
+            connection.executemany(
+                "INSERT INTO generation (scope, value, bumped_at) VALUES (?, random(), ?) "
+                "ON CONFLICT (scope) DO UPDATE "
+                "SET value = random(), bumped_at = excluded.bumped_at",
+                [(scope, now) for scope in scopes],
+            )
+            self._bumps += 1
+            if self._bumps % PURGE_EVERY_BUMPS == 0:
+                # a deleted scope reads as 0, entries of it are older than the TTL anyway
+                connection.execute(
+                    "DELETE FROM generation WHERE bumped_at < ?", (now - self.retention_seconds,)
+                )
+
+    def close(self) -> None:
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            # autocommit outside of "with connection" blocks, reads never hold a transaction
+            connection = sqlite3.connect(
+                self.path, isolation_level=None, check_same_thread=False
+            )
+            connection.execute(f"PRAGMA busy_timeout = {SQLITE_BUSY_TIMEOUT_MS}")
+            connection.execute("PRAGMA journal_mode = WAL")
+            # a committed bump survives a crash of the worker, losing it on power loss is fine
+            connection.execute("PRAGMA synchronous = NORMAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS generation ("
+                "scope TEXT PRIMARY KEY, value INTEGER NOT NULL, bumped_at REAL NOT NULL"
+                ") WITHOUT ROWID"
+            )
+            self._connection = connection
+        return self._connection
+
+
+class ResultCache:
+    """
+    Results of reads kept per worker with the generations of the scopes they depend on.
+    A write bumps the scopes it changes after its commit, an entry is used only while all
+    its generations are unchanged, so a change made through any worker of the host is seen
+    by the next read, whatever the TTL.
+
+    An entry is not stored when one of its scopes was bumped after the computation started
+    (it may have missed the write), nor, with replicas, within DB_REPLICA_MAX_LAG_SECONDS
+    of a bump (a replica may not have it yet), nor when it has more than
+    RESULT_CACHE_MAX_ROWS rows. Memory is bounded by entries and rows, not bytes: at most
+    RESULT_CACHE_SIZE entries of RESULT_CACHE_MAX_ROWS rows each per worker. When the
+    generation file cannot be used, results are computed without the cache.
+
+    Writes made outside the application (psql, migrations) bump nothing, entries
+    computed before them live until RESULT_CACHE_TTL_SECONDS.
+    """
+
+    def __init__(self, settings: DefaultSettings) -> None:
+        self.enabled = settings.RESULT_CACHE_ENABLED
+        self.max_rows = settings.RESULT_CACHE_MAX_ROWS
+        self.settle_seconds = (
+            settings.DB_REPLICA_MAX_LAG_SECONDS if settings.DB_REPLICA_HOSTS else 0
+        )
+        self.timezone = ZoneInfo(settings.CLINIC_TIMEZONE)
+        self.generations = GenerationStore(
+            settings.RESULT_CACHE_GENERATIONS_PATH, settings.RESULT_CACHE_TTL_SECONDS
+        )
+        self.hits = 0
+        self.misses = 0
+        self.stored = 0
+        self.errors = 0
+        self._entries: TTLCache[Hashable, tuple[dict[str, int], Any]] = TTLCache(
+            maxsize=settings.RESULT_CACHE_SIZE, ttl=settings.RESULT_CACHE_TTL_SECONDS
+        )
+
+    async def get_or_compute(
+            self,
+            key: Hashable,
+            scopes: Sequence[str],
+            compute: Callable[[], Awaitable[V]],
+            result_scopes: Callable[[V], Iterable[str]] | None = None,
+    ) -> V:
+        """
+        The cached result of ``key`` or ``compute()``. ``result_scopes`` adds scopes known
+        only from the result, like the ids of the clients found.
+        """
+        if not self.enabled:
+            return await compute()
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            generations, value = entry
+            current = await self._read(generations)
+            if current is not None and all(
+                    current.get(scope, (0, 0))[0] == generation
+                    for scope, generation in generations.items()
+            ):
+                self.hits += 1
+                return value
+
+        self.misses += 1
+        started = time.time()
+        value = await compute()
+        all_scopes = {*scopes, *(result_scopes(value) if result_scopes is not None else ())}
+        if _rows(value) > self.max_rows:
+            return value
+        current = await self._read(all_scopes)
+        if current is not None and all(
+                bumped_at < started - self.settle_seconds for _, bumped_at in current.values()
+        ):
+            self._entries.set(
+                key, ({scope: current.get(scope, (0, 0))[0] for scope in all_scopes}, value)
+            )
+            self.stored += 1
+        return value
+
+    async def invalidate(self, *scopes: str) -> None:
+        """
+        Bumps the scopes, called after the commit of the change.
+        """
+        if not self.enabled or not scopes:
+            return
+        try:
+            await asyncio.to_thread(self.generations.bump, scopes)
+        except sqlite3.Error:
+            # other workers keep their entries until the TTL, this one at least drops its own
+            logger.exception("Could not bump result cache generations %s", scopes)
+            self.errors += 1
+            self._entries.clear()
+            self.generations.close()
+
+    async def visits_changed(self, *states: dict[str, Any] | None) -> None:
+        """
+        Bumps the scopes of visits in the given states (audit states before and after a
+        change: client_id, doctor_id and start_date).
+        """
+        scopes = {VISITS}
+        for state in filter(None, states):
+            if state.get("client_id") is not None:
+                scopes.add(client_scope(state["client_id"]))
+            if state.get("doctor_id") is not None:
+                scopes.add(doctor_scope(state["doctor_id"]))
+            if state.get("start_date") is not None:
+                scopes.add(self.date_scope(state["start_date"]))
+        await self.invalidate(*scopes)
+
+    async def clients_changed(self, *client_ids: uuid.UUID) -> None:
+        await self.invalidate(CLIENTS, NAMES, *map(client_scope, client_ids))
+
+    async def doctors_changed(self, *doctor_ids: uuid.UUID) -> None:
+        await self.invalidate(DOCTORS, NAMES, *map(doctor_scope, doctor_ids))
+
+    def date_scope(self, value: datetime.datetime) -> str:
+        return f"date:{self._local_date(value).isoformat()}"
+
+    def date_range_scopes(
+            self,
+            start: datetime.datetime,
+            end: datetime.datetime,
+            max_days: int = MAX_DATE_SCOPES,
+    ) -> list[str] | None:
+        """
+        Scopes of the days between start and end and one more on each side (naive values
+        are compared by the database in its own time zone), None for longer ranges.
+        """
+        first = self._local_date(start) - ONE_DAY
+        last = self._local_date(end) + ONE_DAY
+        days = (last - first).days + 1
+        if days > max_days or days < 1:
+            return None
+        return [f"date:{first + ONE_DAY * day}" for day in range(days)]
+
+    def render_metrics(self) -> str:
+        return (
+            "# TYPE medcenter_result_cache_hits_total counter\n"
+            f"medcenter_result_cache_hits_total {self.hits}\n"
+            "# TYPE medcenter_result_cache_misses_total counter\n"
+            f"medcenter_result_cache_misses_total {self.misses}\n"
+            "# TYPE medcenter_result_cache_stored_total counter\n"
+            f"medcenter_result_cache_stored_total {self.stored}\n"
+            "# TYPE medcenter_result_cache_errors_total counter\n"
+            f"medcenter_result_cache_errors_total {self.errors}\n"
+            "# TYPE medcenter_result_cache_entries gauge\n"
+            f"medcenter_result_cache_entries {len(self._entries)}\n"
+        )
+
+    def _local_date(self, value: datetime.datetime) -> datetime.date:
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=datetime.UTC)
+        return value.astimezone(self.timezone).date()
+
+    async def _read(self, scopes: Iterable[str]) -> dict[str, tuple[int, float]] | None:
+        try:
+            return await asyncio.to_thread(self.generations.read, scopes)
+        except sqlite3.Error:
+            logger.exception("Could not read result cache generations")
+            self.errors += 1
+            self.generations.close()
+            return None
+
+
+def _rows(value: Any) -> int:
+    """
+    Rows of a result: items of a page, elements of a sequence, 1 for anything else.
+    """
+    items = getattr(value, "items", value)
+    return len(items) if isinstance(items, Sized) else 1
+
+
+def client_scope(client_id: uuid.UUID) -> str:
+    return f"client:{client_id}"
+
+
+def doctor_scope(doctor_id: uuid.UUID) -> str:
+    return f"doctor:{doctor_id}"
+
+
+result_cache = ResultCache(get_settings())
@@ -0,0 +1,13 @@
+from .service import (
+    svc_get_doctor_utilization,
+    svc_get_load_heatmap,
+    svc_get_procedure_stats,
+    svc_get_revenue_stats,
+)
+
+__all__ = [
+    "svc_get_doctor_utilization",
+    "svc_get_load_heatmap",
+    "svc_get_procedure_stats",
+    "svc_get_revenue_stats",
+]
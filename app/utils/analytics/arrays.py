@@ -0,0 +1,145 @@
+import datetime
+import uuid
+from collections.abc import Hashable, Iterable, Sequence
+from typing import Any
+
+from app.db.enums import VisitStatusEnum
+
+try:
+    import numpy as np
+except ImportError:  # the analytics extra is not installed
+    np = None
+
+STATUSES = list(VisitStatusEnum)
+STATUS_CODES = {value: code for code, value in enumerate(STATUSES)}
+COLUMNS = ("start", "local_start", "duration", "doctor", "cabinet", "procedure", "status", "cost")
+# deleted rows are dropped from the arrays once there are this many and at least 10%
+COMPACT_MIN_DELETED = 1000
+
+
+class Categories:
+    """
+    Append-only dictionary encoding: a value gets the next code the first time it is seen.
+    """
+
+    def __init__(self) -> None:
+        self.values: list[Hashable] = []
+        self.codes: dict[Hashable, int] = {}
+
+    def encode(self, values: Iterable[Hashable], count: int) -> "np.ndarray":
+        return np.fromiter((self._code(value) for value in values), np.int32, count)
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def _code(self, value: Hashable) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+
+class VisitArrays:
+    """
+    Visit columns as NumPy arrays, one element per visit:
+
+    - start, local_start: epoch seconds of start_date, UTC and clinic wall clock
+    - duration: seconds from start_date to end_date
+    - doctor, cabinet, procedure: codes of the Categories with the same names
+    - status: index in STATUSES
+    - cost: NaN for visits without cost
+    - alive: False for deleted visits until the next compaction
+
+    apply() returns new arrays, so statistics computed on a snapshot are consistent.
+    """
+
+    def __init__(self, horizon: datetime.datetime) -> None:
+        self.horizon = horizon
+        self.ids: list[uuid.UUID] = []
+        self.positions: dict[uuid.UUID, int] = {}
+        self.doctors = Categories()
+        self.cabinets = Categories()
+        self.procedures = Categories()
+        self.doctor_names: dict[uuid.UUID, str] = {}
+        self.start = np.empty(0, np.int64)
+        self.local_start = np.empty(0, np.int64)
+        self.duration = np.empty(0, np.int64)
+        self.doctor = np.empty(0, np.int32)
+        self.cabinet = np.empty(0, np.int32)
+        self.procedure = np.empty(0, np.int32)
+        self.status = np.empty(0, np.int8)
+        self.cost = np.empty(0, np.float64)
+        self.alive = np.empty(0, np.bool_)
+
+    def apply(
+            self,
+            rows: Sequence[Any],
+            deleted: Iterable[uuid.UUID],
+            horizon: datetime.datetime,
+    ) -> "VisitArrays":
+        """
+        Arrays with the changed rows of dal_get_visit_columns written over or appended
+        and the deleted visits masked out.
+        """
+        arrays = VisitArrays.__new__(VisitArrays)
+        arrays.__dict__.update(self.__dict__)
+        arrays.horizon = horizon
+
+        updated_positions, updated_rows, new_rows = [], [], []
+        for row in rows:
+            position = self.positions.get(row.id)
+            if position is None:
+                # ids and positions are only read while refreshing, under the cache lock
+                self.positions[row.id] = len(self.ids)
+                self.ids.append(row.id)
+                new_rows.append(row)
+            else:
+                updated_positions.append(position)
+                updated_rows.append(row)
+
+        new_columns = arrays._columns(new_rows)
+        for name in COLUMNS:
+            setattr(arrays, name, np.concatenate([getattr(self, name), new_columns[name]]))
+        arrays.alive = np.concatenate([self.alive, np.ones(len(new_rows), np.bool_)])
+
+        if updated_rows:
+            positions = np.array(updated_positions, np.int64)
+            for name, values in arrays._columns(updated_rows).items():
+                getattr(arrays, name)[positions] = values
+
+        deleted_positions = [
+            self.positions[visit_id] for visit_id in deleted if visit_id in self.positions
+        ]
+        arrays.alive[deleted_positions] = False
+
+        dead = len(arrays.alive) - int(np.count_nonzero(arrays.alive))
+        if dead >= max(COMPACT_MIN_DELETED, len(arrays.alive) // 10):
+            arrays._compact()
+        return arrays
+
+    def __len__(self) -> int:
+        return int(np.count_nonzero(self.alive))
+
+    def _columns(self, rows: Sequence[Any]) -> dict[str, "np.ndarray"]:
+        count = len(rows)
+        return {
+            "start": np.fromiter((row.start for row in rows), np.int64, count),
+            "local_start": np.fromiter((row.local_start for row in rows), np.int64, count),
+            "duration": np.fromiter((row.duration for row in rows), np.int64, count),
+            "doctor": self.doctors.encode((row.doctor_id for row in rows), count),
+            "cabinet": self.cabinets.encode((row.cabinet for row in rows), count),
+            "procedure": self.procedures.encode((row.procedure for row in rows), count),
+            "status": np.fromiter((STATUS_CODES[row.status] for row in rows), np.int8, count),
+            "cost": np.fromiter(
+                (np.nan if row.cost is None else row.cost for row in rows), np.float64, count
+            ),
+        }
+
+    def _compact(self) -> None:
+        keep = np.flatnonzero(self.alive)
+        for name in COLUMNS:
+            setattr(self, name, getattr(self, name)[keep])
+        self.alive = np.ones(len(keep), np.bool_)
+        self.ids = [self.ids[position] for position in keep.tolist()]
+        self.positions = {visit_id: position for position, visit_id in enumerate(self.ids)}
@@ -0,0 +1,63 @@
+import datetime
+import uuid
+from collections.abc import Sequence
+from typing import Any
+
+from sqlalchemy import BigInteger, Row, bindparam, cast, extract, func, select, tuple_
+from sqlalchemy.dialects.postgresql import TIMESTAMP, UUID
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import Doctor, Visit
+
+
+async def dal_get_visit_columns(
+        session: AsyncSession,
+        after: tuple[datetime.datetime, uuid.UUID],
+        horizon: datetime.datetime,
+        timezone: str,
+) -> Sequence[Row[Any]]:
+    """
+    The columns analytics works on, of visits updated after the cursor and not after the
+    horizon, in one fetch. Times are epoch seconds, local_start is the wall clock
+    of ``timezone`` counted as if it were UTC.
+    """
+    rows = await session.execute(
+        VISIT_COLUMNS_STMT,
+        {"after_dt": after[0], "after_id": after[1], "horizon": horizon, "timezone": timezone},
+    )
+    return rows.all()
+
+
+async def dal_get_doctor_names(session: AsyncSession) -> dict[uuid.UUID, str]:
+    rows = await session.execute(select(Doctor.id, Doctor.full_name))
+    return {row.id: row.full_name for row in rows}
+
+
+# --- HELPERS ---
+
+def _epoch(expression: Any) -> Any:
+    return cast(extract("epoch", expression), BigInteger)
+
+
+VISIT_COLUMNS_STMT = (
+    select(
+        Visit.id,
+        Visit.dt_updated,
+        _epoch(Visit.start_date).label("start"),
+        _epoch(func.timezone(bindparam("timezone"), Visit.start_date)).label("local_start"),
+        _epoch(Visit.end_date - Visit.start_date).label("duration"),
+        Visit.doctor_id,
+        Visit.cabinet,
+        Visit.procedure,
+        Visit.status,
+        Visit.cost,
+    )
+    .where(
+        tuple_(Visit.dt_updated, Visit.id) > tuple_(
+            bindparam("after_dt", type_=TIMESTAMP(timezone=True)),
+            bindparam("after_id", type_=UUID(as_uuid=True)),
+        ),
+        Visit.dt_updated <= bindparam("horizon", type_=TIMESTAMP(timezone=True)),
+    )
+    .order_by(Visit.dt_updated, Visit.id)
+)
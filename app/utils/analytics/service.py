@@ -0,0 +1,276 @@
+import asyncio
+import datetime
+import time
+import uuid
+from zoneinfo import ZoneInfo
+
+from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette import status
+
+from app.config import get_settings
+from app.db.enums import VisitStatusEnum
+from app.schemas import (
+    AnalyticsRequest,
+    DoctorUtilization,
+    DoctorUtilizationResponse,
+    LoadHeatmapResponse,
+    ProcedureStats,
+    ProcedureStatsResponse,
+    RevenueStatsResponse,
+)
+from app.utils.sync import dal_get_sync_horizon, dal_get_tombstones
+
+from .arrays import STATUS_CODES, VisitArrays, np
+from .database import dal_get_doctor_names, dal_get_visit_columns
+
+DEFAULT_RANGE_DAYS = 30
+PERCENTILES = (10, 25, 50, 75, 90, 99)
+HOURS_PER_WEEK = 7 * 24
+# 1970-01-01, epoch second 0, was a Thursday: hour 72 of a week starting on Monday
+EPOCH_HOUR_OF_WEEK = 3 * 24
+TOMBSTONE_PAGE_SIZE = 10_000
+START = (datetime.datetime.min.replace(tzinfo=datetime.UTC), uuid.UUID(int=0))
+
+
+class VisitArrayCache:
+    """
+    Visit arrays of this process. Loaded in one fetch on first use, afterwards refreshed
+    at most every ANALYTICS_REFRESH_SECONDS with the visits changed and deleted since.
+    """
+
+    def __init__(self) -> None:
+        self.arrays: VisitArrays | None = None
+        self._refreshed_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def get(self, session: AsyncSession) -> VisitArrays:
+        refresh_seconds = get_settings().ANALYTICS_REFRESH_SECONDS
+        if self.arrays is None or time.monotonic() - self._refreshed_at >= refresh_seconds:
+            async with self._lock:
+                if self.arrays is None or time.monotonic() - self._refreshed_at >= refresh_seconds:
+                    self.arrays = await self._refresh(session, self.arrays)
+                    self._refreshed_at = time.monotonic()
+        return self.arrays
+
+    @staticmethod
+    async def _refresh(session: AsyncSession, arrays: VisitArrays | None) -> VisitArrays:
+        settings = get_settings()
+        horizon = await dal_get_sync_horizon(session, settings.SYNC_SAFETY_LAG_SECONDS)
+        retention = datetime.timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS)
+        deleted = []
+        # deletes older than the tombstones kept cannot be replayed, load everything again
+        if arrays is None or arrays.horizon < horizon - retention:
+            arrays = VisitArrays(START[0])
+        else:
+            deleted = await _deleted_visits(session, (arrays.horizon, START[1]), horizon)
+
+        rows = await dal_get_visit_columns(
+            session, (arrays.horizon, START[1]), horizon, settings.CLINIC_TIMEZONE
+        )
+        doctor_names = await dal_get_doctor_names(session)
+
+        arrays = await asyncio.to_thread(arrays.apply, rows, deleted, horizon)
+        arrays.doctor_names = doctor_names
+        return arrays
+
+
+async def svc_get_revenue_stats(
+        session: AsyncSession,
+        request: AnalyticsRequest,
+) -> RevenueStatsResponse:
+    """
+    Cost percentiles, totals and mean of visits starting in [start_date, end_date).
+    """
+    start_date, end_date = _resolve_range(request)
+    arrays = await _get_arrays(session)
+    selected = _select(arrays, start_date, end_date, request.status)
+    costs = arrays.cost[selected]
+    costs = costs[~np.isnan(costs)]
+    paid = selected & (arrays.status == STATUS_CODES[VisitStatusEnum.PAID])
+
+    return RevenueStatsResponse(
+        start_date=start_date,
+        end_date=end_date,
+        data_as_of=arrays.horizon,
+        visits=int(np.count_nonzero(selected)),
+        priced_visits=costs.size,
+        cost_total=float(costs.sum()),
+        cost_mean=float(costs.mean()) if costs.size else None,
+        paid_total=float(np.nansum(arrays.cost[paid])),
+        percentiles=dict(zip(
+            (f"p{q}" for q in PERCENTILES), np.percentile(costs, PERCENTILES).tolist(), strict=True
+        )) if costs.size else {},
+    )
+
+
+async def svc_get_procedure_stats(
+        session: AsyncSession,
+        request: AnalyticsRequest,
+) -> ProcedureStatsResponse:
+    """
+    Visits, cost total and average cost per procedure, highest total first.
+    """
+    start_date, end_date = _resolve_range(request)
+    arrays = await _get_arrays(session)
+    selected = _select(arrays, start_date, end_date, request.status)
+    procedures, costs = arrays.procedure[selected], arrays.cost[selected]
+    priced = ~np.isnan(costs)
+    size = len(arrays.procedures)
+
+    visits = np.bincount(procedures, minlength=size)
+    priced_visits = np.bincount(procedures[priced], minlength=size)
+    totals = np.bincount(procedures[priced], weights=costs[priced], minlength=size)
+
+    stats = [
+        ProcedureStats(
+            procedure=arrays.procedures.values[code],
+            visits=int(visits[code]),
+            cost_total=float(totals[code]),
+            cost_mean=float(totals[code] / priced_visits[code]) if priced_visits[code] else None,
+        )
+        for code in np.flatnonzero(visits).tolist()
+    ]
+    return ProcedureStatsResponse(
+        start_date=start_date,
+        end_date=end_date,
+        data_as_of=arrays.horizon,
+        visits=procedures.size,
+        procedures=sorted(stats, key=lambda item: (-item.cost_total, -item.visits)),
+    )
+
+
+async def svc_get_load_heatmap(
+        session: AsyncSession,
+        request: AnalyticsRequest,
+) -> LoadHeatmapResponse:
+    """
+    Visits and booked hours by weekday and hour of their start, in CLINIC_TIMEZONE.
+    """
+    start_date, end_date = _resolve_range(request)
+    arrays = await _get_arrays(session)
+    selected = _select(arrays, start_date, end_date, request.status)
+    hour_of_week = (arrays.local_start[selected] // 3600 + EPOCH_HOUR_OF_WEEK) % HOURS_PER_WEEK
+    counts = np.bincount(hour_of_week, minlength=HOURS_PER_WEEK)
+    hours = np.bincount(
+        hour_of_week, weights=arrays.duration[selected] / 3600, minlength=HOURS_PER_WEEK
+    )
+
+    return LoadHeatmapResponse(
+        start_date=start_date,
+        end_date=end_date,
+        data_as_of=arrays.horizon,
+        visits=hour_of_week.size,
+        timezone=get_settings().CLINIC_TIMEZONE,
+        visit_counts=counts.reshape(7, 24).tolist(),
+        booked_hours=np.round(hours, 2).reshape(7, 24).tolist(),
+    )
+
+
+async def svc_get_doctor_utilization(
+        session: AsyncSession,
+        request: AnalyticsRequest,
+) -> DoctorUtilizationResponse:
+    """
+    Booked hours of every doctor with visits in the range against the working hours
+    of its weekdays, busiest first.
+    """
+    settings = get_settings()
+    start_date, end_date = _resolve_range(request)
+    arrays = await _get_arrays(session)
+    selected = _select(arrays, start_date, end_date, request.status)
+    doctors = arrays.doctor[selected]
+    size = len(arrays.doctors)
+
+    visits = np.bincount(doctors, minlength=size)
+    booked = np.bincount(doctors, weights=arrays.duration[selected] / 3600, minlength=size)
+    paid = selected & (arrays.status == STATUS_CODES[VisitStatusEnum.PAID])
+    paid &= ~np.isnan(arrays.cost)
+    paid_totals = np.bincount(arrays.doctor[paid], weights=arrays.cost[paid], minlength=size)
+
+    tz = ZoneInfo(settings.CLINIC_TIMEZONE)
+    workdays = int(np.busday_count(
+        start_date.astimezone(tz).date(), end_date.astimezone(tz).date()
+    ))
+    available = workdays * settings.ANALYTICS_WORKDAY_HOURS
+
+    stats = []
+    for code in np.flatnonzero(visits).tolist():
+        doctor_id: uuid.UUID = arrays.doctors.values[code]
+        stats.append(DoctorUtilization(
+            doctor_id=doctor_id,
+            doctor_name=arrays.doctor_names.get(doctor_id),
+            visits=int(visits[code]),
+            booked_hours=round(float(booked[code]), 2),
+            utilization=round(float(booked[code]) / available, 4) if available else None,
+            paid_total=float(paid_totals[code]),
+        ))
+    return DoctorUtilizationResponse(
+        start_date=start_date,
+        end_date=end_date,
+        data_as_of=arrays.horizon,
+        visits=doctors.size,
+        available_hours=available,
+        doctors=sorted(stats, key=lambda item: -item.booked_hours),
+    )
+
+
+# --- HELPERS ---
+
+_cache = VisitArrayCache()
+
+
+async def _get_arrays(session: AsyncSession) -> VisitArrays:
+    if np is None:
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail="Analytics needs numpy: poetry install --extras analytics",
+        )
+    return await _cache.get(session)
+
+
+def _resolve_range(request: AnalyticsRequest) -> tuple[datetime.datetime, datetime.datetime]:
+    tz = ZoneInfo(get_settings().CLINIC_TIMEZONE)
+    end_date = request.end_date or datetime.datetime.now(tz)
+    start_date = request.start_date or end_date - datetime.timedelta(days=DEFAULT_RANGE_DAYS)
+    start_date, end_date = (
+        value.replace(tzinfo=tz) if value.tzinfo is None else value
+        for value in (start_date, end_date)
+    )
+    if end_date <= start_date:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="end_date must be after start_date"
+        )
+    return start_date, end_date
+
+
+def _select(
+        arrays: VisitArrays,
+        start_date: datetime.datetime,
+        end_date: datetime.datetime,
+        visit_status: VisitStatusEnum | None,
+) -> "np.ndarray":
+    """
+    Mask of the live visits starting in [start_date, end_date), with the status if given.
+    """
+    selected = arrays.alive & (arrays.start >= int(start_date.timestamp()))
+    selected &= arrays.start < int(end_date.timestamp())
+    if visit_status is not None:
+        selected &= arrays.status == STATUS_CODES[visit_status]
+    return selected
+
+
+async def _deleted_visits(
+        session: AsyncSession,
+        after: tuple[datetime.datetime, uuid.UUID],
+        horizon: datetime.datetime,
+) -> list[uuid.UUID]:
+    deleted = []
+    while True:
+        tombstones = await dal_get_tombstones(
+            session, ["visit"], after, horizon, TOMBSTONE_PAGE_SIZE
+        )
+        deleted.extend(tombstone.record_id for tombstone in tombstones)
+        if len(tombstones) < TOMBSTONE_PAGE_SIZE:
+            return deleted
+        after = (tombstones[-1].dt_created, tombstones[-1].id)
@@ -0,0 +1,8 @@
+from .database import previous_row, previous_state
+from .service import svc_get_audit_entries
+
+__all__ = [
+    "previous_row",
+    "previous_state",
+    "svc_get_audit_entries",
+]
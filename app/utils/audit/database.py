@@ -0,0 +1,68 @@
+import datetime
+import uuid
+from typing import Any
+
+from sqlalchemy import Label, Row, Select, Sequence, Subquery, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import AuditLogEntry
+from app.services.audit import audited_columns
+
+PREVIOUS_PREFIX = "previous_"
+
+
+async def dal_get_audit_entries(
+        session: AsyncSession,
+        entity_id: uuid.UUID | None = None,
+        entity: str | None = None,
+        start_date: datetime.datetime | None = None,
+        end_date: datetime.datetime | None = None,
+        limit: int = 100,
+        offset: int = 0,
+) -> Sequence[AuditLogEntry]:
+    """
+    Newest first. Served by (entity_id, dt_created) with an entity id, by dt_created otherwise.
+    """
+    stmt: Select[Any] = select(AuditLogEntry)
+    if entity_id is not None:
+        stmt = stmt.where(AuditLogEntry.entity_id == entity_id)
+    if entity is not None:
+        stmt = stmt.where(AuditLogEntry.entity == entity)
+    if start_date is not None:
+        stmt = stmt.where(AuditLogEntry.dt_created >= start_date)
+    if end_date is not None:
+        stmt = stmt.where(AuditLogEntry.dt_created < end_date)
+    entries = await session.scalars(
+        stmt.order_by(AuditLogEntry.dt_created.desc()).limit(limit).offset(offset)
+    )
+    return entries.all()
+
+
+def previous_row(model: Any, entity_id: uuid.UUID) -> tuple[Subquery, list[Label]]:
+    """
+    The row before an ``UPDATE ... FROM previous WHERE id = previous.id`` of the same
+    statement, so the audit gets the old values without an extra query. The row is locked
+    FOR NO KEY UPDATE, like the update itself, so visits referencing it are not blocked;
+    the values are exactly the ones the update replaces. Add the labels to RETURNING
+    and read them with previous_state().
+    """
+    previous = (
+        select(model.id, *audited_columns(model))
+        .where(model.id == entity_id)
+        .with_for_update(key_share=True)
+        .subquery("previous")
+    )
+    labels = [
+        column.label(f"{PREVIOUS_PREFIX}{column.name}")
+        for column in previous.c
+        if column.name != "id"
+    ]
+    return previous, labels
+
+
+def previous_state(row: Row) -> dict[str, Any]:
+    return {
+        key.removeprefix(PREVIOUS_PREFIX): value
+        for key, value in row._mapping.items()
+        if isinstance(key, str) and key.startswith(PREVIOUS_PREFIX)
+    }
@@ -0,0 +1,34 @@
+import datetime
+import logging
+import uuid
+from collections.abc import Sequence
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import AuditLogEntry
+from app.services.audit import audit_writer
+
+from .database import dal_get_audit_entries
+
+logger = logging.getLogger(__name__)
+
+
+async def svc_get_audit_entries(
+        session: AsyncSession,
+        entity_id: uuid.UUID | None,
+        entity: str | None,
+        start_date: datetime.datetime | None,
+        end_date: datetime.datetime | None,
+        limit: int,
+        offset: int,
+) -> Sequence[AuditLogEntry]:
+    """
+    Writes this process' buffered entries first, so a change is visible right after it.
+    """
+    try:
+        await audit_writer.flush()
+    except Exception:
+        logger.warning("Could not flush audit entries, %d are waiting", audit_writer.pending)
+    return await dal_get_audit_entries(
+        session, entity_id, entity, start_date, end_date, limit, offset
+    )
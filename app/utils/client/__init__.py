@@ -1,8 +1,17 @@
-from .database import create_new_client, find_client_by_substr, get_client_by_id, update_client
+from .database import (
+    create_new_client,
+    find_client_by_substr,
+    find_client_fields_by_substr,
+    get_client_by_id,
+    get_clients_by_ids,
+    update_client,
+)
 
 __all__ = [
     "get_client_by_id",
+    "get_clients_by_ids",
     "create_new_client",
     "update_client",
     "find_client_by_substr",
+    "find_client_fields_by_substr",
 ]
\ No newline at end of file
@@ -1,11 +1,21 @@
 import uuid
+from functools import lru_cache
+from typing import Any
 
-from sqlalchemy import Sequence, exc, func, or_, select, update
+from sqlalchemy import Select, Sequence, any_, bindparam, exc, func, or_, select, update
+from sqlalchemy.dialects.postgresql import ARRAY, UUID
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.db.enums import AuditActionEnum
 from app.db.models import Client
 from app.schemas import ClientCreateRequest
 from app.schemas.client import ClientUpdateRequest
+from app.services.audit import audit_state, audit_writer
+from app.services.result_cache import CLIENTS, VISITS, client_scope, result_cache
+from app.utils.audit import previous_row, previous_state
+from app.utils.common import SingleFlight, phone_search_digits, phone_search_prefixes
+
+MIN_PHONE_SEARCH_DIGITS = 3
 
 
 async def get_client_by_id(
@@ -19,6 +29,17 @@ async def get_client_by_id(
     return client
 
 
+async def get_clients_by_ids(
+        session: AsyncSession,
+        client_ids: list[uuid.UUID],
+) -> Sequence[Client]:
+    """
+    One ``id = ANY(:ids)`` query, rows come in no particular order.
+    """
+    clients = await session.scalars(CLIENTS_BY_IDS_STMT, {"ids": client_ids})
+    return clients.all()
+
+
 async def create_new_client(
         session: AsyncSession,
         potential_client: ClientCreateRequest
@@ -29,6 +50,8 @@ async def create_new_client(
     try:
         await session.commit()
         await session.refresh(client)
+        await result_cache.clients_changed(client.id)
+        audit_writer.record("client", client.id, AuditActionEnum.CREATE, after=audit_state(client))
         return client, "Successful registration!"
     except exc.IntegrityError:
         await session.rollback()
@@ -41,13 +64,21 @@ async def update_client(
         update_request: ClientUpdateRequest,
 ) -> Client | None:
     values = update_request.model_dump(exclude_none=True)
-    client = await session.scalar(
+    previous, previous_columns = previous_row(Client, client_id)
+    row = (await session.execute(
         update(Client)
-        .where(Client.id == client_id)
+        .where(Client.id == previous.c.id)
         .values(**values)
-        .returning(Client)
-    )
+        .returning(Client, *previous_columns)
+    )).first()
     await session.commit()
+    if row is None:
+        return None
+    client = row[0]
+    await result_cache.clients_changed(client.id)
+    audit_writer.record(
+        "client", client.id, AuditActionEnum.UPDATE, previous_state(row), audit_state(client)
+    )
     return client
 
 
@@ -55,16 +86,99 @@ async def find_client_by_substr(
         session: AsyncSession,
         client_substr: str
 ) -> Sequence[Client] | None:
-    clients = await session.scalars(
-        select(Client)
-        .where(
-            or_(
-                func.lower(Client.full_name).ilike(f"%{client_substr.lower()}%"),
-                Client.phone_number.ilike(f"%{client_substr}%")
-            )
+    """
+    Clients by phone digits or name substring, concurrent identical searches share one query.
+    Results are cached until a client is added or changed or a visit of a found one changes.
+    """
+    phone_search, params = _substr_params(client_substr)
+    stmt = _substr_stmt(None, phone_search)
+
+    async def find() -> Sequence[Client]:
+        return (await session.scalars(stmt, params)).all()
+
+    key = (stmt, tuple(sorted(params.items())))
+    return await result_cache.get_or_compute(
+        ("client_searches", key),
+        [CLIENTS],
+        lambda: _searches.do(key, find),
+        lambda clients: [client_scope(client.id) for client in clients],
+    )
+
+
+async def find_client_fields_by_substr(
+        session: AsyncSession,
+        client_substr: str,
+        fields: list[str],
+) -> list[dict[str, Any]]:
+    """
+    Same search as find_client_by_substr, selecting only the requested columns.
+    """
+    phone_search, params = _substr_params(client_substr)
+    stmt = _substr_stmt(tuple(fields), phone_search)
+
+    async def find() -> list[dict[str, Any]]:
+        return [row._asdict() for row in await session.execute(stmt, params)]
+
+    key = (stmt, tuple(sorted(params.items())))
+    if "id" in fields:
+        scopes, result_scopes = [CLIENTS], lambda rows: [client_scope(row["id"]) for row in rows]
+    else:
+        # without ids, visit statistics of the rows found depend on any visit
+        scopes, result_scopes = [CLIENTS, VISITS], None
+    return await result_cache.get_or_compute(
+        ("client_searches", key), scopes, lambda: _searches.do(key, find), result_scopes
+    )
+
+
+# --- HELPERS ---
+
+# keyed on the cached statement and its parameters
+_searches: SingleFlight[tuple, Any] = SingleFlight("client_searches")
+
+CLIENTS_BY_IDS_STMT = select(Client).where(
+    Client.id == any_(bindparam("ids", type_=ARRAY(UUID(as_uuid=True))))
+)
+
+
+# a typed number has at most two canonical beginnings, see phone_search_prefixes
+PHONE_PREFIX_PARAMS = ("phone_prefix_1", "phone_prefix_2")
+
+
+def _substr_params(client_substr: str) -> tuple[bool, dict[str, str]]:
+    """
+    Chooses between the phone and the name search and binds the LIKE patterns.
+    """
+    digits = phone_search_digits(client_substr)
+    if digits is None or len(digits) < MIN_PHONE_SEARCH_DIGITS:
+        return False, {"name_pattern": f"%{client_substr.lower()}%"}
+
+    prefixes = sorted(phone_search_prefixes(digits))
+    prefixes += prefixes[-1:] * (len(PHONE_PREFIX_PARAMS) - len(prefixes))
+    params = {
+        name: f"{prefix}%" for name, prefix in zip(PHONE_PREFIX_PARAMS, prefixes, strict=True)
+    }
+    params["phone_suffix_pattern"] = f"{digits[::-1]}%"
+    return True, params
+
+
+@lru_cache(maxsize=64)
+def _substr_stmt(fields: tuple[str, ...] | None, phone_search: bool) -> Select[Any]:
+    if fields is None:
+        stmt = select(Client)
+    else:
+        stmt = select(*(getattr(Client, field) for field in fields))
+
+    if phone_search:
+        # index seeks: prefix of the number or its last digits
+        condition = or_(
+            *(Client.phone_digits.like(bindparam(name)) for name in PHONE_PREFIX_PARAMS),
+            func.reverse(Client.phone_digits).like(bindparam("phone_suffix_pattern")),
         )
+    else:
+        condition = func.lower(Client.full_name).ilike(bindparam("name_pattern"))
+    return (
+        stmt
+        .where(condition)
         .order_by(Client.name.asc())
         .limit(20)
     )
-    return clients.all()
-
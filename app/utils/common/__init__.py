@@ -1,7 +1,27 @@
+from .batch import batch_ids, order_by_ids
+from .caller import caller_key, client_address, remote_user
+from .fields import sparse_fields
 from .hostname import get_hostname
+from .phone import normalize_phone_prefix, phone_digits, phone_search_digits, phone_search_prefixes
+from .single_flight import SingleFlight, render_single_flight_metrics, skip_coalescing
 from .split_full_name import split_full_name
+from .ttl_cache import TTLCache
 
 __all__ = [
+    "batch_ids",
+    "caller_key",
+    "client_address",
     "get_hostname",
-    "split_full_name"
+    "normalize_phone_prefix",
+    "order_by_ids",
+    "phone_digits",
+    "phone_search_digits",
+    "phone_search_prefixes",
+    "remote_user",
+    "render_single_flight_metrics",
+    "sparse_fields",
+    "SingleFlight",
+    "skip_coalescing",
+    "split_full_name",
+    "TTLCache",
 ]
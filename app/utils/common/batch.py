@@ -0,0 +1,48 @@
+import uuid
+from collections.abc import Iterable, Sequence
+from typing import Any, TypeVar
+
+from fastapi import HTTPException, Query
+from starlette import status
+
+from app.config import get_settings
+
+T = TypeVar("T")
+
+
+def batch_ids(
+        ids: list[str] = Query(
+            ...,
+            description="Comma separated or repeated ids, the response keeps their order",
+        ),
+) -> list[uuid.UUID]:
+    """
+    Dependency parsing ``ids=a,b&ids=c`` into unique ids limited by BATCH_MAX_IDS.
+    """
+    raw = [value.strip() for values in ids for value in values.split(",") if value.strip()]
+    try:
+        parsed = list(dict.fromkeys(uuid.UUID(value) for value in raw))
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="ids must be UUIDs",
+        ) from None
+    max_ids = get_settings().BATCH_MAX_IDS
+    if not parsed or len(parsed) > max_ids:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Between 1 and {max_ids} ids are allowed",
+        )
+    return parsed
+
+
+def order_by_ids(ids: Sequence[uuid.UUID], rows: Iterable[T]) -> dict[str, Any]:
+    """
+    Arranges rows fetched with ``id = ANY(ids)`` in the requested order
+    and lists the ids which were not found.
+    """
+    by_id = {row.id: row for row in rows}
+    return {
+        "items": [by_id[row_id] for row_id in ids if row_id in by_id],
+        "missing": [row_id for row_id in ids if row_id not in by_id],
+    }
@@ -0,0 +1,76 @@
+import ipaddress
+from functools import lru_cache
+
+from app.config import get_settings
+
+Network = ipaddress.IPv4Network | ipaddress.IPv6Network
+
+
+def client_address(scope: dict) -> str | None:
+    """
+    Address of the client of an ASGI request. When the peer is one of TRUSTED_PROXIES
+    (nginx, the vite dev server) it is the nearest X-Forwarded-For address which is not
+    a trusted proxy itself, then X-Real-IP.
+    """
+    client = scope.get("client")
+    peer = client[0] if client else None
+    networks = _trusted_networks(get_settings().TRUSTED_PROXIES)
+    if peer is None or not _is_trusted(peer, networks):
+        return peer
+
+    forwarded = [
+        address.strip()
+        for address in _header(scope, b"x-forwarded-for").split(",")
+        if address.strip()
+    ]
+    for address in reversed(forwarded):
+        if not _is_trusted(address, networks):
+            return address
+    if forwarded:
+        # every hop is trusted, the first one is where the request came from
+        return forwarded[0]
+    return _header(scope, b"x-real-ip") or peer
+
+
+def caller_key(scope: dict) -> str | None:
+    """
+    Key of a caller for rate limiting and read-your-writes stickiness: X-Client-Id,
+    which the SPA sends per browser tab, or the client address.
+    """
+    return _header(scope, b"x-client-id") or client_address(scope)
+
+
+def remote_user(scope: dict) -> str | None:
+    """
+    User authenticated by the proxy in front (X-Remote-User), only taken from TRUSTED_PROXIES.
+    """
+    client = scope.get("client")
+    if not client or not _is_trusted(client[0], _trusted_networks(get_settings().TRUSTED_PROXIES)):
+        return None
+    return _header(scope, b"x-remote-user") or None
+
+
+def _header(scope: dict, name: bytes) -> str:
+    """
+    Values of a header joined with commas, "" when it is missing.
+    """
+    return ",".join(
+        value.decode("latin-1") for key, value in scope.get("headers", ()) if key == name
+    )
+
+
+def _is_trusted(address: str, networks: tuple[Network, ...]) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in networks)
+
+
+@lru_cache(maxsize=4)
+def _trusted_networks(trusted_proxies: str) -> tuple[Network, ...]:
+    return tuple(
+        ipaddress.ip_network(network.strip(), strict=False)
+        for network in trusted_proxies.split(",")
+        if network.strip()
+    )
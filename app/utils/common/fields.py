@@ -0,0 +1,34 @@
+from collections.abc import Callable
+
+from fastapi import HTTPException, Query
+from pydantic import BaseModel
+from starlette import status
+
+
+def sparse_fields(model: type[BaseModel]) -> Callable[[str | None], list[str] | None]:
+    """
+    Dependency parsing the ``fields=a,b,c`` query parameter against fields of the response model.
+    Returns None when the parameter is absent, the id is always included.
+    """
+    allowed = tuple(model.model_fields)
+
+    def dependency(
+            fields: str | None = Query(
+                default=None,
+                description=f"Comma separated subset of: {', '.join(allowed)}",
+            ),
+    ) -> list[str] | None:
+        if not fields:
+            return None
+        requested = list(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+        unknown = [name for name in requested if name not in allowed]
+        if unknown:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=f"Unknown fields: {', '.join(unknown)}",
+            )
+        if "id" in allowed and "id" not in requested:
+            requested.insert(0, "id")
+        return requested
+
+    return dependency
@@ -0,0 +1,47 @@
+import re
+
+NON_DIGITS = re.compile(r"\D")
+PHONE_SEARCH = re.compile(r"^[\d\s+()\-]+$")
+
+
+def phone_digits(phone_number: str) -> str | None:
+    """
+    Canonical E.164 digits (without "+") of a phone number typed in any format, None when
+    it has no digits. Russian numbers written with a leading 8 or without a country code
+    get the 7 prefix, digits of other numbers are kept as they are.
+    """
+    return normalize_phone_prefix(NON_DIGITS.sub("", phone_number)) or None
+
+
+def normalize_phone_prefix(digits: str) -> str:
+    """
+    Applies the Russian country code rules to the digits of a complete number.
+    """
+    if len(digits) == 11 and digits.startswith("8"):
+        return "7" + digits[1:]
+    if len(digits) == 10 and digits.startswith("9"):
+        return "7" + digits
+    return digits
+
+
+def phone_search_digits(search_substr: str) -> str | None:
+    """
+    Digits of a search string which looks like a (part of a) phone number.
+    """
+    if not PHONE_SEARCH.match(search_substr):
+        return None
+    digits = NON_DIGITS.sub("", search_substr)
+    return digits or None
+
+
+def phone_search_prefixes(digits: str) -> set[str]:
+    """
+    Possible beginnings of canonical numbers for typed digits, at most two: a Russian number
+    typed as "8999…" or "999…" also means "7999…", "+7999…" is canonical already.
+    """
+    prefixes = {digits}
+    if digits.startswith("8"):
+        prefixes.add("7" + digits[1:])
+    elif digits.startswith("9"):
+        prefixes.add("7" + digits)
+    return prefixes
@@ -0,0 +1,99 @@
+import asyncio
+import contextvars
+from collections.abc import Awaitable, Callable, Hashable
+from typing import ClassVar, Generic, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+# set for a request whose caller has just written (see get_read_session): a call running
+# since before its write may not see it, such a request never joins one
+skip_coalescing: contextvars.ContextVar[bool] = contextvars.ContextVar(
+    "skip_coalescing", default=False
+)
+
+
+class SingleFlight(Generic[K, V]):
+    """
+    Coalesces concurrent calls with the same key: the first caller runs the function,
+    callers arriving while it runs wait for it and get the same result or exception.
+    Nothing is kept after the call finishes, but a joined call may have started before
+    the caller's own write; callers with ``skip_coalescing`` set run the function alone.
+
+    Results are shared between requests and must not be modified by callers. If the caller
+    running the function is cancelled (its client went away), a waiting caller runs it again.
+    """
+
+    instances: ClassVar[list["SingleFlight"]] = []
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.calls = 0
+        self.coalesced = 0
+        self._in_flight: dict[K, asyncio.Future[V]] = {}
+        SingleFlight.instances.append(self)
+
+    async def do(self, key: K, function: Callable[[], Awaitable[V]]) -> V:
+        if skip_coalescing.get() and key in self._in_flight:
+            self.calls += 1
+            return await function()
+
+        while (future := self._in_flight.get(key)) is not None:
+            self.coalesced += 1
+            try:
+                # shielded, so a waiter's cancellation does not cancel the shared future
+                return await asyncio.shield(future)
+            except _LeaderCancelled:
+                self.coalesced -= 1
+
+        self.calls += 1
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            result = await function()
+        except asyncio.CancelledError:
+            future.set_exception(_LeaderCancelled())
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._in_flight[key]
+            # marks the exception as retrieved when nobody was waiting
+            if future.done() and not future.cancelled():
+                future.exception()
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._in_flight)
+
+
+def render_single_flight_metrics() -> str:
+    """
+    Prometheus text exposition of calls made and calls coalesced per SingleFlight.
+    """
+    lines = [
+        "# TYPE medcenter_single_flight_calls_total counter",
+        *(
+            f'medcenter_single_flight_calls_total{{name="{flight.name}"}} {flight.calls}'
+            for flight in SingleFlight.instances
+        ),
+        "# TYPE medcenter_single_flight_coalesced_total counter",
+        *(
+            f'medcenter_single_flight_coalesced_total{{name="{flight.name}"}} {flight.coalesced}'
+            for flight in SingleFlight.instances
+        ),
+        "# TYPE medcenter_single_flight_in_flight gauge",
+        *(
+            f'medcenter_single_flight_in_flight{{name="{flight.name}"}} {flight.in_flight}'
+            for flight in SingleFlight.instances
+        ),
+    ]
+    return "\n".join(lines) + "\n"
+
+
+class _LeaderCancelled(Exception):
+    pass
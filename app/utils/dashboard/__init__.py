@@ -0,0 +1,5 @@
+from .service import svc_get_dashboard
+
+__all__ = [
+    "svc_get_dashboard",
+]
@@ -0,0 +1,65 @@
+import datetime
+from typing import Any
+
+from sqlalchemy import Row, Sequence, func, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.enums import VisitStatusEnum
+from app.db.models import Doctor, Visit
+
+# values of GROUPING(status, doctor_id, cabinet) for each grouping set
+GROUPED_BY_STATUS = 0b011
+GROUPED_BY_DOCTOR = 0b101
+GROUPED_BY_CABINET = 0b110
+
+
+async def dal_get_visit_aggregates(
+        session: AsyncSession,
+        start: datetime.datetime,
+        end: datetime.datetime,
+) -> Sequence[Row[Any]]:
+    """
+    Counts and sums of visits in [start, end) by status, by doctor and by cabinet in one scan.
+    """
+    rows = await session.execute(
+        select(
+            func.grouping(Visit.status, Visit.doctor_id, Visit.cabinet).label("grouping"),
+            Visit.status,
+            Visit.doctor_id,
+            Doctor.full_name.label("doctor_name"),
+            Visit.cabinet,
+            func.count().label("count"),
+            func.coalesce(func.sum(Visit.cost), 0).label("cost_total"),
+            func.coalesce(
+                func.sum(Visit.cost).filter(Visit.status == VisitStatusEnum.PAID), 0
+            ).label("paid_total"),
+        )
+        .join(Doctor, Doctor.id == Visit.doctor_id)
+        .where(Visit.start_date >= start, Visit.start_date < end)
+        .group_by(
+            func.grouping_sets(
+                tuple_(Visit.status),
+                tuple_(Visit.doctor_id, Doctor.full_name),
+                tuple_(Visit.cabinet),
+            )
+        )
+    )
+    return rows.all()
+
+
+async def dal_get_upcoming_visits(
+        session: AsyncSession,
+        start: datetime.datetime,
+        end: datetime.datetime,
+        limit: int,
+) -> Sequence[Visit]:
+    visits = await session.scalars(
+        select(Visit)
+        .where(
+            Visit.start_date >= func.greatest(start, func.now()),
+            Visit.start_date < end,
+        )
+        .order_by(Visit.start_date.asc())
+        .limit(limit)
+    )
+    return visits.all()
@@ -0,0 +1,78 @@
+import asyncio
+import datetime
+from zoneinfo import ZoneInfo
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_settings
+from app.schemas import DashboardGroup, DashboardResponse, VisitResponse
+from app.utils.common import TTLCache
+
+from .database import (
+    GROUPED_BY_CABINET,
+    GROUPED_BY_DOCTOR,
+    GROUPED_BY_STATUS,
+    dal_get_upcoming_visits,
+    dal_get_visit_aggregates,
+)
+
+_cache: TTLCache[datetime.date, DashboardResponse] = TTLCache(
+    maxsize=64, ttl=get_settings().DASHBOARD_CACHE_SECONDS
+)
+_locks: dict[datetime.date, asyncio.Lock] = {}
+
+
+async def svc_get_dashboard(
+        session: AsyncSession,
+        day: datetime.date,
+) -> DashboardResponse:
+    """
+    Dashboard for the day, cached for a few seconds and shared by all concurrent requests.
+    """
+    dashboard = _cache.get(day)
+    if dashboard is not None:
+        return dashboard
+
+    lock = _locks.setdefault(day, asyncio.Lock())
+    async with lock:
+        dashboard = _cache.get(day)
+        if dashboard is None:
+            dashboard = await _build_dashboard(session, day)
+            _cache.set(day, dashboard)
+    if not lock.locked():
+        _locks.pop(day, None)
+    return dashboard
+
+
+# --- HELPERS ---
+
+async def _build_dashboard(session: AsyncSession, day: datetime.date) -> DashboardResponse:
+    settings = get_settings()
+    start = datetime.datetime.combine(day, datetime.time.min, ZoneInfo(settings.CLINIC_TIMEZONE))
+    end = start + datetime.timedelta(days=1)
+
+    by_status, by_doctor, by_cabinet = [], [], []
+    for row in await dal_get_visit_aggregates(session, start, end):
+        totals = {"count": row.count, "cost_total": row.cost_total, "paid_total": row.paid_total}
+        if row.grouping == GROUPED_BY_STATUS:
+            by_status.append(DashboardGroup(key=row.status.value, label=row.status.value, **totals))
+        elif row.grouping == GROUPED_BY_DOCTOR:
+            by_doctor.append(DashboardGroup(key=str(row.doctor_id), label=row.doctor_name, **totals))
+        elif row.grouping == GROUPED_BY_CABINET:
+            by_cabinet.append(DashboardGroup(key=row.cabinet, label=row.cabinet, **totals))
+
+    upcoming = await dal_get_upcoming_visits(session, start, end, settings.DASHBOARD_UPCOMING_LIMIT)
+
+    return DashboardResponse(
+        date=day,
+        generated_at=datetime.datetime.now(datetime.UTC),
+        total=DashboardGroup(
+            count=sum(group.count for group in by_status),
+            cost_total=sum(group.cost_total for group in by_status),
+            paid_total=sum(group.paid_total for group in by_status),
+        ),
+        by_status=by_status,
+        by_doctor=sorted(by_doctor, key=lambda group: group.label or ""),
+        by_cabinet=sorted(by_cabinet, key=lambda group: group.key or ""),
+        upcoming=[VisitResponse.model_validate(visit) for visit in upcoming],
+    )
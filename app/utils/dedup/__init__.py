@@ -0,0 +1,9 @@
+from .database import dal_dismiss_duplicate, dal_get_duplicates
+from .service import svc_find_client_duplicates, svc_merge_clients
+
+__all__ = [
+    "dal_dismiss_duplicate",
+    "dal_get_duplicates",
+    "svc_find_client_duplicates",
+    "svc_merge_clients",
+]
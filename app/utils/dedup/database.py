@@ -0,0 +1,220 @@
+import uuid
+from collections.abc import AsyncIterator, Sequence
+from typing import Any
+
+from sqlalchemy import Row, delete, func, select, text, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import Client, ClientDuplicate, Visit
+
+
+async def dal_build_blocking_keys(
+        session: AsyncSession,
+        phone_suffix_digits: int,
+) -> int:
+    """
+    Fills a temporary table, dropped on commit, with the blocking keys of every client:
+    normalized surname + birth date, the last digits of the phone and one key per
+    trigram of the surname + first letter of the name. Returns the number of keys.
+    """
+    await session.execute(CREATE_KEYS_STMT)
+    await session.execute(INSERT_KEYS_STMT, {"phone_suffix_digits": phone_suffix_digits})
+    await session.execute(INDEX_KEYS_STMT)
+    await session.execute(ANALYZE_KEYS_STMT)
+    return await session.scalar(COUNT_KEYS_STMT)
+
+
+async def dal_stream_blocks(
+        session: AsyncSession,
+        max_block_size: int,
+        batch_size: int,
+) -> AsyncIterator[Sequence[Row[Any]]]:
+    """
+    (key, client columns) of the blocks with 2..max_block_size clients, ordered by key,
+    so one block is complete once the key changes. Bigger blocks say nothing and are skipped.
+    """
+    result = await session.stream(
+        BLOCKS_STMT,
+        {"max_block_size": max_block_size},
+        execution_options={"yield_per": batch_size},
+    )
+    async for partition in result.partitions():
+        yield partition
+
+
+async def dal_delete_suggested_duplicates(session: AsyncSession) -> None:
+    """
+    Suggestions of the previous run, dismissed pairs are kept so they are not suggested again.
+    """
+    await session.execute(delete(ClientDuplicate).where(ClientDuplicate.dismissed.is_(False)))
+
+
+async def dal_insert_duplicates(
+        session: AsyncSession,
+        duplicates: Sequence[dict[str, Any]],
+) -> None:
+    await session.execute(
+        insert(ClientDuplicate).on_conflict_do_nothing(
+            index_elements=[ClientDuplicate.client_id, ClientDuplicate.duplicate_id]
+        ),
+        duplicates,
+    )
+
+
+async def dal_count_duplicates(session: AsyncSession) -> int:
+    return await session.scalar(
+        select(func.count())
+        .select_from(ClientDuplicate)
+        .where(ClientDuplicate.dismissed.is_(False))
+    )
+
+
+async def dal_get_duplicates(
+        session: AsyncSession,
+        min_score: float,
+        limit: int,
+        offset: int,
+) -> Sequence[ClientDuplicate]:
+    duplicates = await session.scalars(
+        select(ClientDuplicate)
+        .where(ClientDuplicate.dismissed.is_(False), ClientDuplicate.score >= min_score)
+        .order_by(ClientDuplicate.score.desc(), ClientDuplicate.id)
+        .limit(limit)
+        .offset(offset)
+    )
+    return duplicates.all()
+
+
+async def dal_dismiss_duplicate(
+        session: AsyncSession,
+        duplicate_pair_id: uuid.UUID,
+) -> bool:
+    dismissed = await session.scalar(
+        update(ClientDuplicate)
+        .where(ClientDuplicate.id == duplicate_pair_id)
+        .values(dismissed=True)
+        .returning(ClientDuplicate.id)
+    )
+    await session.commit()
+    return dismissed is not None
+
+
+async def dal_lock_clients(
+        session: AsyncSession,
+        client_ids: Sequence[uuid.UUID],
+) -> dict[uuid.UUID, Client]:
+    """
+    Locks the clients in id order, so two merges of overlapping pairs cannot deadlock.
+    """
+    clients = await session.scalars(
+        select(Client)
+        .where(Client.id.in_(client_ids))
+        .order_by(Client.id)
+        .with_for_update()
+        .execution_options(populate_existing=True)
+    )
+    return {client.id: client for client in clients}
+
+
+async def dal_move_visits(
+        session: AsyncSession,
+        from_client_id: uuid.UUID,
+        to_client_id: uuid.UUID,
+) -> list[uuid.UUID]:
+    """
+    Repoints all visits of a client in one statement, returns the ids of the moved visits.
+    """
+    visit_ids = await session.scalars(
+        update(Visit)
+        .where(Visit.client_id == from_client_id)
+        .values(client_id=to_client_id)
+        .returning(Visit.id)
+        .execution_options(synchronize_session=False)
+    )
+    return list(visit_ids)
+
+
+async def dal_merge_client_fields(
+        session: AsyncSession,
+        client_id: uuid.UUID,
+        from_client: Client,
+) -> None:
+    """
+    Fills fields the kept client lacks from the merged one.
+    """
+    await session.execute(
+        update(Client)
+        .where(Client.id == client_id)
+        .values(
+            patronymic=func.coalesce(Client.patronymic, from_client.patronymic),
+            date_of_birth=func.coalesce(Client.date_of_birth, from_client.date_of_birth),
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def dal_delete_client(
+        session: AsyncSession,
+        client_id: uuid.UUID,
+) -> None:
+    await session.execute(
+        delete(Client)
+        .where(Client.id == client_id)
+        .execution_options(synchronize_session=False)
+    )
+
+
+# --- HELPERS ---
+
+KEYS_TABLE = "client_blocking_key"
+
+
+def _normalized(column: str) -> str:
+    # lower case, ё as е, letters only
+    return f"regexp_replace(translate(lower({column}), 'ё', 'е'), '[^[:alpha:]]', '', 'g')"
+
+
+CREATE_KEYS_STMT = text(
+    f"CREATE TEMPORARY TABLE {KEYS_TABLE} (key TEXT NOT NULL, client_id UUID NOT NULL) "
+    "ON COMMIT DROP"
+)
+
+INSERT_KEYS_STMT = text(f"""
+    INSERT INTO {KEYS_TABLE} (key, client_id)
+    SELECT keys.key, normalized.id
+    FROM (
+        SELECT id,
+               {_normalized("surname")} AS surname,
+               left({_normalized("name")}, 1) AS initial,
+               date_of_birth,
+               right(phone_digits, :phone_suffix_digits) AS phone_suffix
+        FROM client
+    ) AS normalized
+    CROSS JOIN LATERAL (
+        SELECT 'sd:' || normalized.surname || ':' || normalized.date_of_birth
+        WHERE normalized.surname <> '' AND normalized.date_of_birth IS NOT NULL
+        UNION ALL
+        SELECT 'ph:' || normalized.phone_suffix
+        WHERE length(normalized.phone_suffix) = :phone_suffix_digits
+        UNION ALL
+        SELECT DISTINCT 'tg:' || substr(normalized.surname, i, 3) || ':' || normalized.initial
+        FROM generate_series(1, length(normalized.surname) - 2) AS i
+    ) AS keys(key)
+""")
+
+INDEX_KEYS_STMT = text(f"CREATE INDEX ON {KEYS_TABLE} (key)")
+ANALYZE_KEYS_STMT = text(f"ANALYZE {KEYS_TABLE}")
+COUNT_KEYS_STMT = text(f"SELECT count(*) FROM {KEYS_TABLE}")
+
+BLOCKS_STMT = text(f"""
+    SELECT blocked.key, client.id, client.full_name, client.date_of_birth, client.phone_digits
+    FROM {KEYS_TABLE} AS blocked
+    JOIN (
+        SELECT key FROM {KEYS_TABLE}
+        GROUP BY key
+        HAVING count(*) BETWEEN 2 AND :max_block_size
+    ) AS blocks USING (key)
+    JOIN client ON client.id = blocked.client_id
+    ORDER BY blocked.key, client.id
+""")
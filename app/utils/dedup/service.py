@@ -0,0 +1,191 @@
+import datetime
+import itertools
+import re
+import uuid
+from collections.abc import Awaitable, Callable, Sequence
+from difflib import SequenceMatcher
+from typing import Any
+
+from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette import status
+
+from app.config import get_settings
+from app.db.enums import AuditActionEnum
+from app.schemas import ClientMergeResponse, ClientResponse
+from app.services.audit import audit_state, audit_writer
+from app.services.result_cache import result_cache
+from app.utils.stats import dal_refresh_visit_stats
+
+from .database import (
+    dal_build_blocking_keys,
+    dal_count_duplicates,
+    dal_delete_client,
+    dal_delete_suggested_duplicates,
+    dal_insert_duplicates,
+    dal_lock_clients,
+    dal_merge_client_fields,
+    dal_move_visits,
+    dal_stream_blocks,
+)
+
+# weights of the similarities in the score, they add up to 1
+NAME_WEIGHT = 0.5
+DATE_OF_BIRTH_WEIGHT = 0.25
+PHONE_WEIGHT = 0.25
+INSERT_BATCH_SIZE = 1000
+STREAM_BATCH_SIZE = 10_000
+
+# (keys processed, keys in total)
+ProgressCallback = Callable[[int, int], Awaitable[None]]
+
+
+async def svc_find_client_duplicates(
+        session: AsyncSession,
+        progress: ProgressCallback | None = None,
+) -> dict[str, Any]:
+    """
+    Replaces the suggested duplicates with pairs of clients sharing a blocking key and
+    scoring at least DEDUP_MIN_SCORE. Only pairs inside a block are compared, memory holds
+    one block and one insert batch, everything is committed at the end.
+    """
+    settings = get_settings()
+    await dal_delete_suggested_duplicates(session)
+    total = await dal_build_blocking_keys(session, settings.DEDUP_PHONE_SUFFIX_DIGITS)
+
+    processed = compared = 0
+    pending: dict[tuple[uuid.UUID, uuid.UUID], dict[str, Any]] = {}
+    block: list[Any] = []
+    async for rows in dal_stream_blocks(session, settings.DEDUP_MAX_BLOCK_SIZE, STREAM_BATCH_SIZE):
+        for row in rows:
+            if block and row.key != block[0].key:
+                compared += _score_block(block, settings.DEDUP_MIN_SCORE, pending)
+                block = []
+            block.append(row)
+        if len(pending) >= INSERT_BATCH_SIZE:
+            await _flush(session, pending)
+        processed += len(rows)
+        if progress is not None:
+            await progress(processed, total)
+    if block:
+        compared += _score_block(block, settings.DEDUP_MIN_SCORE, pending)
+    await _flush(session, pending)
+    suggested = await dal_count_duplicates(session)
+    await session.commit()
+
+    return {"keys": total, "pairs_compared": compared, "pairs_suggested": suggested}
+
+
+async def svc_merge_clients(
+        session: AsyncSession,
+        client_id: uuid.UUID,
+        duplicate_id: uuid.UUID,
+) -> ClientMergeResponse | None:
+    """
+    Moves the visits of the duplicate to the client in one UPDATE, fills the client's
+    missing patronymic and birth date from it and deletes the duplicate.
+    None if either client does not exist.
+    """
+    if client_id == duplicate_id:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="A client cannot be merged into itself"
+        )
+    clients = await dal_lock_clients(session, [client_id, duplicate_id])
+    if len(clients) != 2:
+        await session.rollback()
+        return None
+    client, duplicate = clients[client_id], clients[duplicate_id]
+    client_before, duplicate_before = audit_state(client), audit_state(duplicate)
+
+    visit_ids = await dal_move_visits(session, duplicate_id, client_id)
+    await dal_merge_client_fields(session, client_id, duplicate)
+    await dal_delete_client(session, duplicate_id)
+    await dal_refresh_visit_stats(session, client_ids=[client_id])
+    await session.commit()
+    await session.refresh(client)
+
+    # visits keep their days and doctors, their client and its name change
+    await result_cache.clients_changed(client_id, duplicate_id)
+    await result_cache.visits_changed()
+    audit_writer.record("client", duplicate_id, AuditActionEnum.DELETE, before=duplicate_before)
+    audit_writer.record(
+        "client", client_id, AuditActionEnum.UPDATE, client_before, audit_state(client)
+    )
+    for visit_id in visit_ids:
+        audit_writer.record(
+            "visit", visit_id, AuditActionEnum.UPDATE,
+            {"client_id": duplicate_id}, {"client_id": client_id},
+        )
+    return ClientMergeResponse(
+        client=ClientResponse.model_validate(client), visits_moved=len(visit_ids)
+    )
+
+
+# --- HELPERS ---
+
+NON_LETTERS = re.compile(r"[^\w ]|\d|_")
+
+
+def _score_block(
+        block: Sequence[Any],
+        min_score: float,
+        pending: dict[tuple[uuid.UUID, uuid.UUID], dict[str, Any]],
+) -> int:
+    """
+    Scores every pair of the block, pairs scoring min_score or more go to pending.
+    Returns the number of compared pairs.
+    """
+    names = {row.id: _normalize(row.full_name) for row in block}
+    compared = 0
+    for first, second in itertools.combinations(block, 2):
+        pair = (first.id, second.id)
+        if pair in pending:
+            continue
+        compared += 1
+        score, reasons = _score(first, second, names[first.id], names[second.id])
+        if score >= min_score:
+            reasons["block"] = first.key.split(":", 1)[0]
+            pending[pair] = {
+                "client_id": first.id,
+                "duplicate_id": second.id,
+                "score": score,
+                "reasons": reasons,
+            }
+    return compared
+
+
+def _score(first: Any, second: Any, first_name: str, second_name: str) -> tuple[float, dict]:
+    name = SequenceMatcher(None, first_name, second_name).ratio()
+    same_date_of_birth = _same(first.date_of_birth, second.date_of_birth)
+    suffix_digits = get_settings().DEDUP_PHONE_SUFFIX_DIGITS
+    same_phone = bool(first.phone_digits) and bool(second.phone_digits) and (
+        first.phone_digits[-suffix_digits:] == second.phone_digits[-suffix_digits:]
+    )
+    # an unknown birth date neither confirms nor contradicts
+    date_of_birth = 0.5 if same_date_of_birth is None else float(same_date_of_birth)
+    score = NAME_WEIGHT * name + DATE_OF_BIRTH_WEIGHT * date_of_birth + PHONE_WEIGHT * same_phone
+    return round(score, 4), {
+        "name_similarity": round(name, 4),
+        "same_date_of_birth": same_date_of_birth,
+        "same_phone_suffix": same_phone,
+    }
+
+
+def _same(first: datetime.date | None, second: datetime.date | None) -> bool | None:
+    if first is None or second is None:
+        return None
+    return first == second
+
+
+def _normalize(full_name: str) -> str:
+    return " ".join(NON_LETTERS.sub("", full_name.lower().replace("ё", "е")).split())
+
+
+async def _flush(
+        session: AsyncSession,
+        pending: dict[tuple[uuid.UUID, uuid.UUID], dict[str, Any]],
+) -> None:
+    # a pair met again in a later batch is skipped by ON CONFLICT
+    if pending:
+        await dal_insert_duplicates(session, list(pending.values()))
+        pending.clear()
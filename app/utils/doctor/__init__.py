@@ -1,8 +1,17 @@
-from .database import create_new_doctor, find_doctor_by_substr, get_doctor_by_id, update_doctor
+from .database import (
+    create_new_doctor,
+    find_doctor_by_substr,
+    find_doctor_fields_by_substr,
+    get_doctor_by_id,
+    get_doctors_by_ids,
+    update_doctor,
+)
 
 __all__ = [
     "get_doctor_by_id",
+    "get_doctors_by_ids",
     "create_new_doctor",
     "update_doctor",
     "find_doctor_by_substr",
+    "find_doctor_fields_by_substr",
 ]
\ No newline at end of file
@@ -1,11 +1,19 @@
 import uuid
+from functools import lru_cache
+from typing import Any
 
-from sqlalchemy import Sequence, func, or_, select, update
+from sqlalchemy import Select, Sequence, any_, bindparam, func, or_, select, update
+from sqlalchemy.dialects.postgresql import ARRAY, UUID
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.models import Doctor
+from app.db.enums import AuditActionEnum
+from app.db.models import Doctor, doctor_speciality
 from app.schemas import DoctorCreateRequest
 from app.schemas.doctor import DoctorUpdateRequest
+from app.services.audit import audit_state, audit_writer
+from app.services.result_cache import DOCTORS, VISITS, doctor_scope, result_cache
+from app.utils.audit import previous_row, previous_state
+from app.utils.common import SingleFlight
 
 
 async def get_doctor_by_id(
@@ -19,6 +27,17 @@ async def get_doctor_by_id(
     return doctor
 
 
+async def get_doctors_by_ids(
+        session: AsyncSession,
+        doctor_ids: list[uuid.UUID],
+) -> Sequence[Doctor]:
+    """
+    One ``id = ANY(:ids)`` query, rows come in no particular order.
+    """
+    doctors = await session.scalars(DOCTORS_BY_IDS_STMT, {"ids": doctor_ids})
+    return doctors.all()
+
+
 async def create_new_doctor(
         session: AsyncSession,
         potential_doctor: DoctorCreateRequest,
@@ -27,6 +46,8 @@ async def create_new_doctor(
     session.add(doctor)
     await session.commit()
     await session.refresh(doctor)
+    await result_cache.doctors_changed(doctor.id)
+    audit_writer.record("doctor", doctor.id, AuditActionEnum.CREATE, after=audit_state(doctor))
     return doctor
 
 
@@ -36,29 +57,121 @@ async def update_doctor(
         update_request: DoctorUpdateRequest,
 ) -> Doctor | None:
     values = update_request.model_dump(exclude_none=True)
-    doctor = await session.scalar(
+    previous, previous_columns = previous_row(Doctor, doctor_id)
+    row = (await session.execute(
         update(Doctor)
-        .where(Doctor.id == doctor_id)
+        .where(Doctor.id == previous.c.id)
         .values(**values)
-        .returning(Doctor)
-    )
+        .returning(Doctor, *previous_columns)
+    )).first()
     await session.commit()
+    if row is None:
+        return None
+    doctor = row[0]
+    await result_cache.doctors_changed(doctor.id)
+    audit_writer.record(
+        "doctor", doctor.id, AuditActionEnum.UPDATE, previous_state(row), audit_state(doctor)
+    )
     return doctor
 
 
 async def find_doctor_by_substr(
         session: AsyncSession,
-        doctor_substr: str
+        doctor_substr: str,
+        speciality_id: uuid.UUID | None = None,
 ) -> Sequence[Doctor] | None:
-    doctors = await session.scalars(
-        select(Doctor)
-        .where(
+    """
+    Doctors whose name or speciality contains the substring, of the speciality if given.
+    Concurrent identical searches share one query, results are cached until a doctor is
+    added or changed or a visit of a found one changes.
+    """
+    stmt = _substr_stmt(None, bool(doctor_substr), speciality_id is not None)
+    params = _substr_params(doctor_substr, speciality_id)
+
+    async def find() -> Sequence[Doctor]:
+        return (await session.scalars(stmt, params)).all()
+
+    key = (stmt, tuple(sorted(params.items())))
+    return await result_cache.get_or_compute(
+        ("doctor_searches", key),
+        [DOCTORS],
+        lambda: _searches.do(key, find),
+        lambda doctors: [doctor_scope(doctor.id) for doctor in doctors],
+    )
+
+
+async def find_doctor_fields_by_substr(
+        session: AsyncSession,
+        doctor_substr: str,
+        fields: list[str],
+        speciality_id: uuid.UUID | None = None,
+) -> list[dict[str, Any]]:
+    """
+    Same search as find_doctor_by_substr, selecting only the requested columns.
+    """
+    stmt = _substr_stmt(tuple(fields), bool(doctor_substr), speciality_id is not None)
+    params = _substr_params(doctor_substr, speciality_id)
+
+    async def find() -> list[dict[str, Any]]:
+        return [row._asdict() for row in await session.execute(stmt, params)]
+
+    key = (stmt, tuple(sorted(params.items())))
+    if "id" in fields:
+        scopes, result_scopes = [DOCTORS], lambda rows: [doctor_scope(row["id"]) for row in rows]
+    else:
+        # without ids, visit statistics of the rows found depend on any visit
+        scopes, result_scopes = [DOCTORS, VISITS], None
+    return await result_cache.get_or_compute(
+        ("doctor_searches", key), scopes, lambda: _searches.do(key, find), result_scopes
+    )
+
+
+# --- HELPERS ---
+
+# keyed on the cached statement and its parameters
+_searches: SingleFlight[tuple, Any] = SingleFlight("doctor_searches")
+
+DOCTORS_BY_IDS_STMT = select(Doctor).where(
+    Doctor.id == any_(bindparam("ids", type_=ARRAY(UUID(as_uuid=True))))
+)
+
+
+def _substr_params(doctor_substr: str, speciality_id: uuid.UUID | None) -> dict[str, Any]:
+    params: dict[str, Any] = {"pattern": f"%{doctor_substr.lower()}%"}
+    if speciality_id is not None:
+        params["speciality_id"] = speciality_id
+    return params
+
+
+@lru_cache(maxsize=64)
+def _substr_stmt(
+        fields: tuple[str, ...] | None,
+        by_substr: bool,
+        by_speciality: bool,
+) -> Select[Any]:
+    if fields is None:
+        stmt = select(Doctor)
+    else:
+        stmt = select(*(getattr(Doctor, field) for field in fields))
+    if by_substr:
+        pattern = bindparam("pattern")
+        stmt = stmt.where(
             or_(
-                func.lower(Doctor.full_name).ilike(f"%{doctor_substr.lower()}%"),
-                func.lower(Doctor.speciality).ilike(f"%{doctor_substr.lower()}%")
+                func.lower(Doctor.full_name).ilike(pattern),
+                func.lower(Doctor.speciality).ilike(pattern)
             )
         )
+    if by_speciality:
+        # ix__doctor_speciality__speciality_id_doctor_id, then the doctor primary key
+        stmt = stmt.join(
+            doctor_speciality, doctor_speciality.c.doctor_id == Doctor.id
+        ).where(
+            doctor_speciality.c.speciality_id == bindparam(
+                "speciality_id", type_=UUID(as_uuid=True)
+            )
+        )
+    return (
+        stmt
         .order_by(Doctor.name.asc())
         .limit(20)
     )
-    return doctors.all()
@@ -0,0 +1,5 @@
+from .service import svc_export_visits_parquet
+
+__all__ = [
+    "svc_export_visits_parquet",
+]
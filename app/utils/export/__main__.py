@@ -0,0 +1,30 @@
+"""
+Exports visits with client and doctor attributes to Parquet, partitioned by month.
+Months unchanged since the previous run into the same directory are skipped.
+
+Usage: python -m app.utils.export [--out DIR] [--full]
+"""
+import argparse
+import asyncio
+import json
+from pathlib import Path
+
+from app.config import get_settings
+from app.db.connection import SessionManager
+
+from .service import svc_export_visits_parquet
+
+
+async def main(out_dir: Path, full: bool) -> None:
+    session_maker = SessionManager().get_session_maker()
+    async with session_maker() as session:
+        summary = await svc_export_visits_parquet(session, out_dir, full)
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--out", type=Path, default=Path(get_settings().EXPORT_DIR))
+    parser.add_argument("--full", action="store_true", help="export every month again")
+    args = parser.parse_args()
+    asyncio.run(main(args.out, args.full))
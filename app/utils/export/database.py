@@ -0,0 +1,89 @@
+import datetime
+from collections.abc import AsyncIterator, Sequence
+from decimal import Decimal
+from typing import Any
+
+from sqlalchemy import Row, bindparam, func, select
+from sqlalchemy.dialects.postgresql import TIMESTAMP
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import Client, Doctor, Visit
+
+
+async def dal_get_visit_month_signatures(
+        session: AsyncSession,
+        timezone: str,
+) -> dict[datetime.datetime, tuple[int, Decimal]]:
+    """
+    (row count, checksum) of every month with visits, months start in ``timezone``.
+
+    The checksum sums a hash of every visit's id and dt_updated with the dt_updated of its
+    client and doctor, whose names are exported too. Any insert, update or delete of a visit
+    and any change of its client or doctor changes it, also when that change commits
+    after a later one (a latest dt_updated would not move then).
+    """
+    month = func.date_trunc("month", Visit.start_date, timezone).label("month")
+    row_hash = func.hashtextextended(
+        func.concat(Visit.id, Visit.dt_updated, Client.dt_updated, Doctor.dt_updated), 0
+    )
+    rows = await session.execute(
+        select(month, func.count(), func.sum(row_hash))
+        .join(Client, Client.id == Visit.client_id)
+        .join(Doctor, Doctor.id == Visit.doctor_id)
+        .group_by(month)
+    )
+    return {row[0]: (row[1], row[2]) for row in rows}
+
+
+async def dal_stream_visit_export_rows(
+        session: AsyncSession,
+        start: datetime.datetime,
+        end: datetime.datetime,
+        batch_size: int,
+) -> AsyncIterator[Sequence[Row[Any]]]:
+    """
+    Visits starting in [start, end) with client and doctor attributes, as plain rows
+    in batches from a server-side cursor.
+    """
+    result = await session.stream(
+        EXPORT_STMT,
+        {"start": start, "end": end},
+        execution_options={"yield_per": batch_size},
+    )
+    async for partition in result.partitions():
+        yield partition
+
+
+# --- HELPERS ---
+
+# column name -> expression, the order of the Parquet columns
+EXPORT_COLUMNS = {
+    "id": Visit.id,
+    "start_date": Visit.start_date,
+    "end_date": Visit.end_date,
+    "status": Visit.status,
+    "cabinet": Visit.cabinet,
+    "procedure": Visit.procedure,
+    "cost": Visit.cost,
+    "series_id": Visit.series_id,
+    "series_index": Visit.series_index,
+    "client_id": Visit.client_id,
+    "client_name": Client.full_name,
+    "client_date_of_birth": Client.date_of_birth,
+    "doctor_id": Visit.doctor_id,
+    "doctor_name": Doctor.full_name,
+    "doctor_speciality": Doctor.speciality,
+    "dt_created": Visit.dt_created,
+    "dt_updated": Visit.dt_updated,
+}
+
+EXPORT_STMT = (
+    select(*(expression.label(name) for name, expression in EXPORT_COLUMNS.items()))
+    .join(Client, Client.id == Visit.client_id)
+    .join(Doctor, Doctor.id == Visit.doctor_id)
+    .where(
+        Visit.start_date >= bindparam("start", type_=TIMESTAMP(timezone=True)),
+        Visit.start_date < bindparam("end", type_=TIMESTAMP(timezone=True)),
+    )
+    .order_by(Visit.start_date, Visit.id)
+)
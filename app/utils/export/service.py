@@ -0,0 +1,199 @@
+import asyncio
+import datetime
+import json
+import os
+import shutil
+import time
+from collections.abc import Awaitable, Callable
+from enum import Enum
+from pathlib import Path
+from typing import Any
+from zoneinfo import ZoneInfo
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_settings
+
+from .database import EXPORT_COLUMNS, dal_get_visit_month_signatures, dal_stream_visit_export_rows
+
+STATE_FILE = "_export_state.json"
+PARTITION_FILE = "visits.parquet"
+UUID_COLUMNS = frozenset({"id", "series_id", "client_id", "doctor_id"})
+
+# (rows exported so far, rows to export)
+ProgressCallback = Callable[[int, int], Awaitable[None]]
+
+_lock = asyncio.Lock()
+
+
+async def svc_export_visits_parquet(
+        session: AsyncSession,
+        out_dir: Path,
+        full: bool = False,
+        progress: ProgressCallback | None = None,
+) -> dict[str, Any]:
+    """
+    Writes visits joined with client and doctor attributes to
+    ``out_dir/month=YYYY-MM/visits.parquet``, months in CLINIC_TIMEZONE.
+
+    Only months whose (row count, checksum) differ from the previous run are
+    written again, unless ``full``. Months without visits anymore are removed.
+    Memory is bounded by EXPORT_BATCH_SIZE rows, a partition is replaced atomically.
+    """
+    pa, pq = _pyarrow()
+    settings = get_settings()
+    tz = ZoneInfo(settings.CLINIC_TIMEZONE)
+    started = time.monotonic()
+
+    async with _lock:
+        out_dir.mkdir(parents=True, exist_ok=True)
+        state = {} if full else _load_state(out_dir)
+        signatures = {
+            _month_key(month, tz): (month, [count, str(checksum)])
+            for month, (count, checksum) in (
+                await dal_get_visit_month_signatures(session, settings.CLINIC_TIMEZONE)
+            ).items()
+        }
+        changed = sorted(
+            key for key, (_, signature) in signatures.items() if state.get(key) != signature
+        )
+        removed = sorted(state.keys() - signatures.keys())
+        total = sum(signatures[key][1][0] for key in changed)
+
+        schema = _schema(pa)
+        exported = 0
+        for key in changed:
+            month, signature = signatures[key]
+            start = month.astimezone(tz)
+            end = _next_month(start)
+            exported += await _write_month(
+                pa, pq, schema, session, out_dir / f"month={key}", start, end,
+                exported, total, progress,
+            )
+            # saved after every month, an interrupted run continues where it stopped
+            state[key] = signature
+            _save_state(out_dir, state)
+
+        for key in removed:
+            shutil.rmtree(out_dir / f"month={key}", ignore_errors=True)
+            del state[key]
+        if removed or full:
+            _save_state(out_dir, state)
+
+    return {
+        "path": str(out_dir),
+        "months_exported": changed,
+        "months_removed": removed,
+        "months_unchanged": len(signatures) - len(changed),
+        "rows": exported,
+        "seconds": round(time.monotonic() - started, 3),
+    }
+
+
+# --- HELPERS ---
+
+async def _write_month(
+        pa: Any,
+        pq: Any,
+        schema: Any,
+        session: AsyncSession,
+        partition: Path,
+        start: datetime.datetime,
+        end: datetime.datetime,
+        exported: int,
+        total: int,
+        progress: ProgressCallback | None,
+) -> int:
+    settings = get_settings()
+    partition.mkdir(parents=True, exist_ok=True)
+    tmp_path = partition / f".{PARTITION_FILE}.tmp"
+    rows_written = 0
+    writer = pq.ParquetWriter(tmp_path, schema, compression=settings.EXPORT_PARQUET_COMPRESSION)
+    try:
+        async for rows in dal_stream_visit_export_rows(
+                session, start, end, settings.EXPORT_BATCH_SIZE
+        ):
+            # conversion and encoding off the event loop, pyarrow releases the GIL while writing
+            await asyncio.to_thread(_write_batch, pa, schema, writer, rows)
+            rows_written += len(rows)
+            if progress is not None:
+                await progress(exported + rows_written, total)
+    except BaseException:
+        writer.close()
+        tmp_path.unlink(missing_ok=True)
+        raise
+    writer.close()
+    os.replace(tmp_path, partition / PARTITION_FILE)
+    return rows_written
+
+
+def _write_batch(pa: Any, schema: Any, writer: Any, rows: list[Any]) -> None:
+    columns = list(zip(*rows, strict=True)) if rows else [() for _ in schema]
+    arrays = [
+        pa.array(_column_values(field.name, values), type=field.type)
+        for field, values in zip(schema, columns, strict=True)
+    ]
+    writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=schema))
+
+
+def _column_values(name: str, values: tuple[Any, ...]) -> list[Any]:
+    if name in UUID_COLUMNS:
+        return [None if value is None else str(value) for value in values]
+    return [value.value if isinstance(value, Enum) else value for value in values]
+
+
+def _schema(pa: Any) -> Any:
+    timestamp = pa.timestamp("us", tz="UTC")
+    types = {
+        "id": pa.string(),
+        "start_date": timestamp,
+        "end_date": timestamp,
+        "status": pa.string(),
+        "cabinet": pa.string(),
+        "procedure": pa.string(),
+        "cost": pa.float64(),
+        "series_id": pa.string(),
+        "series_index": pa.int32(),
+        "client_id": pa.string(),
+        "client_name": pa.string(),
+        "client_date_of_birth": pa.date32(),
+        "doctor_id": pa.string(),
+        "doctor_name": pa.string(),
+        "doctor_speciality": pa.string(),
+        "dt_created": timestamp,
+        "dt_updated": timestamp,
+    }
+    return pa.schema([(name, types[name]) for name in EXPORT_COLUMNS])
+
+
+def _month_key(month: datetime.datetime, tz: ZoneInfo) -> str:
+    return month.astimezone(tz).strftime("%Y-%m")
+
+
+def _next_month(start: datetime.datetime) -> datetime.datetime:
+    year, month = (start.year + 1, 1) if start.month == 12 else (start.year, start.month + 1)
+    return start.replace(year=year, month=month, day=1)
+
+
+def _load_state(out_dir: Path) -> dict[str, list[Any]]:
+    try:
+        return json.loads((out_dir / STATE_FILE).read_text())
+    except FileNotFoundError:
+        return {}
+
+
+def _save_state(out_dir: Path, state: dict[str, list[Any]]) -> None:
+    tmp_path = out_dir / f".{STATE_FILE}.tmp"
+    tmp_path.write_text(json.dumps(state, indent=2, sort_keys=True))
+    os.replace(tmp_path, out_dir / STATE_FILE)
+
+
+def _pyarrow() -> tuple[Any, Any]:
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise RuntimeError(
+            "Parquet export needs pyarrow: poetry install --extras analytics"
+        ) from e
+    return pa, pq
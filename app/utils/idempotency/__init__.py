@@ -0,0 +1,5 @@
+from .service import svc_run_idempotent
+
+__all__ = [
+    "svc_run_idempotent",
+]
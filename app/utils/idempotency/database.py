@@ -0,0 +1,87 @@
+from datetime import timedelta
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import IdempotencyKey
+
+
+async def dal_claim_idempotency_key(
+        session: AsyncSession,
+        key: str,
+        request_hash: str,
+        lease_seconds: float,
+) -> bool:
+    """
+    Reserves the key for the current request for ``lease_seconds``, the stored response
+    extends it. Expired keys are taken over, also claims of a request which never finished.
+    Returns False when another request already owns the key.
+    """
+    expires_at = func.now() + timedelta(seconds=lease_seconds)
+    stmt = insert(IdempotencyKey).values(key=key, request_hash=request_hash, expires_at=expires_at)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[IdempotencyKey.key],
+        set_={
+            "request_hash": stmt.excluded.request_hash,
+            "expires_at": stmt.excluded.expires_at,
+            "status_code": None,
+            "response_body": None,
+        },
+        where=IdempotencyKey.expires_at < func.now(),
+    )
+    claimed = await session.scalar(stmt.returning(IdempotencyKey.id))
+    await session.commit()
+    return claimed is not None
+
+
+async def dal_get_idempotency_key(
+        session: AsyncSession,
+        key: str,
+) -> IdempotencyKey | None:
+    record = await session.scalar(
+        select(IdempotencyKey)
+        .where(IdempotencyKey.key == key)
+        .execution_options(populate_existing=True)
+    )
+    return record
+
+
+async def dal_complete_idempotency_key(
+        session: AsyncSession,
+        key: str,
+        status_code: int,
+        response_body: dict,
+        ttl_seconds: int,
+) -> None:
+    await session.execute(
+        update(IdempotencyKey)
+        .where(IdempotencyKey.key == key)
+        .values(
+            status_code=status_code,
+            response_body=response_body,
+            expires_at=func.now() + timedelta(seconds=ttl_seconds),
+        )
+    )
+    await session.commit()
+
+
+async def dal_release_idempotency_key(
+        session: AsyncSession,
+        key: str,
+) -> None:
+    await session.execute(
+        delete(IdempotencyKey)
+        .where(IdempotencyKey.key == key, IdempotencyKey.status_code.is_(None))
+    )
+    await session.commit()
+
+
+async def dal_delete_expired_idempotency_keys(
+        session: AsyncSession,
+) -> None:
+    await session.execute(
+        delete(IdempotencyKey)
+        .where(IdempotencyKey.expires_at < func.now())
+    )
+    await session.commit()
@@ -0,0 +1,157 @@
+import asyncio
+import hashlib
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette import status
+
+from app.config import get_settings
+from app.utils.common import TTLCache
+
+from .database import (
+    dal_claim_idempotency_key,
+    dal_complete_idempotency_key,
+    dal_delete_expired_idempotency_keys,
+    dal_get_idempotency_key,
+    dal_release_idempotency_key,
+)
+
+# (request hash, status code, response body)
+StoredResponse = tuple[str, int, Any]
+
+_settings = get_settings()
+_responses: TTLCache[str, StoredResponse] = TTLCache(
+    _settings.IDEMPOTENCY_CACHE_SIZE, _settings.IDEMPOTENCY_TTL_SECONDS
+)
+_in_flight: dict[str, asyncio.Future[StoredResponse]] = {}
+_claims_until_cleanup = 1000
+
+
+async def svc_run_idempotent(
+        session: AsyncSession,
+        idempotency_key: str | None,
+        scope: str,
+        payload: BaseModel,
+        action: Callable[[], Awaitable[Any]],
+        response_model: type[BaseModel],
+        status_code: int = status.HTTP_201_CREATED,
+) -> Any:
+    """
+    Executes the write at most once per Idempotency-Key.
+
+    Replays return the stored response, concurrent duplicates in this process wait
+    for the first request, duplicates in other processes poll the stored row.
+    """
+    if idempotency_key is None:
+        return await action()
+
+    key = f"{scope}:{idempotency_key}"
+    request_hash = hashlib.sha256(payload.model_dump_json().encode()).hexdigest()
+
+    stored = _responses.get(key)
+    if stored is None and key in _in_flight:
+        stored = await asyncio.shield(_in_flight[key])
+    if stored is not None:
+        return _replay(stored, request_hash)
+
+    future = asyncio.get_running_loop().create_future()
+    _in_flight[key] = future
+    try:
+        stored, replayed = await _execute_once(
+            session, key, request_hash, action, response_model, status_code
+        )
+        future.set_result(stored)
+    except BaseException as e:
+        future.set_exception(e)
+        future.exception()  # mark as retrieved when nobody waits for it
+        raise
+    finally:
+        _in_flight.pop(key, None)
+
+    if replayed:
+        return _replay(stored, request_hash)
+    return JSONResponse(status_code=stored[1], content=stored[2])
+
+
+# --- HELPERS ---
+
+async def _execute_once(
+        session: AsyncSession,
+        key: str,
+        request_hash: str,
+        action: Callable[[], Awaitable[Any]],
+        response_model: type[BaseModel],
+        status_code: int,
+) -> tuple[StoredResponse, bool]:
+    settings = get_settings()
+    await _cleanup_expired(session)
+
+    if not await dal_claim_idempotency_key(
+            session, key, request_hash, settings.IDEMPOTENCY_LEASE_SECONDS
+    ):
+        return await _wait_for_owner(session, key), True
+
+    try:
+        result = await action()
+        body = jsonable_encoder(response_model.model_validate(result))
+    except HTTPException as e:
+        if e.status_code >= status.HTTP_500_INTERNAL_SERVER_ERROR:
+            await dal_release_idempotency_key(session, key)
+            raise
+        status_code, body = e.status_code, {"detail": e.detail}
+    except BaseException:
+        await session.rollback()
+        await dal_release_idempotency_key(session, key)
+        raise
+
+    await dal_complete_idempotency_key(
+        session, key, status_code, body, settings.IDEMPOTENCY_TTL_SECONDS
+    )
+    stored = (request_hash, status_code, body)
+    _responses.set(key, stored)
+    return stored, False
+
+
+async def _wait_for_owner(session: AsyncSession, key: str) -> StoredResponse:
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + get_settings().IDEMPOTENCY_WAIT_SECONDS
+    delay = 0.05
+    while True:
+        record = await dal_get_idempotency_key(session, key)
+        if record is not None and record.status_code is not None:
+            stored = (record.request_hash, record.status_code, record.response_body)
+            _responses.set(key, stored)
+            return stored
+        if loop.time() >= deadline:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="A request with this Idempotency-Key is still in progress",
+            )
+        await session.rollback()
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, 0.5)
+
+
+async def _cleanup_expired(session: AsyncSession) -> None:
+    global _claims_until_cleanup
+    _claims_until_cleanup -= 1
+    if _claims_until_cleanup <= 0:
+        _claims_until_cleanup = 1000
+        await dal_delete_expired_idempotency_keys(session)
+
+
+def _replay(stored: StoredResponse, request_hash: str) -> JSONResponse:
+    stored_hash, status_code, body = stored
+    if stored_hash != request_hash:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Idempotency-Key was already used with a different request body",
+        )
+    return JSONResponse(
+        status_code=status_code, content=body, headers={"Idempotent-Replayed": "true"}
+    )
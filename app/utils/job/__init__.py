@@ -0,0 +1,29 @@
+from .database import (
+    dal_add_job_result_chunk,
+    dal_claim_next_job,
+    dal_create_job,
+    dal_delete_finished_jobs,
+    dal_delete_job_result_chunks,
+    dal_fail_job,
+    dal_finish_job,
+    dal_get_job_by_id,
+    dal_get_job_result_chunk,
+    dal_requeue_job,
+    dal_touch_job,
+    dal_update_job_progress,
+)
+
+__all__ = [
+    "dal_create_job",
+    "dal_get_job_by_id",
+    "dal_claim_next_job",
+    "dal_update_job_progress",
+    "dal_touch_job",
+    "dal_finish_job",
+    "dal_fail_job",
+    "dal_requeue_job",
+    "dal_delete_finished_jobs",
+    "dal_add_job_result_chunk",
+    "dal_delete_job_result_chunks",
+    "dal_get_job_result_chunk",
+]
@@ -0,0 +1,213 @@
+import uuid
+from datetime import timedelta
+
+from sqlalchemy import delete, func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import undefer
+
+from app.db.enums import JobStatusEnum
+from app.db.models import Job, JobResultChunk
+from app.schemas.job import JobCreateRequest
+
+
+async def dal_create_job(
+        session: AsyncSession,
+        potential_job: JobCreateRequest,
+) -> Job:
+    job = Job(**potential_job.model_dump())
+    session.add(job)
+    await session.commit()
+    await session.refresh(job)
+    return job
+
+
+async def dal_get_job_by_id(
+        session: AsyncSession,
+        job_id: uuid.UUID,
+        with_result: bool = False,
+) -> Job | None:
+    stmt = select(Job).where(Job.id == job_id)
+    if with_result:
+        stmt = stmt.options(undefer(Job.result))
+    job = await session.scalar(stmt)
+    return job
+
+
+async def dal_claim_next_job(
+        session: AsyncSession,
+        stale_seconds: int,
+        max_attempts: int,
+) -> Job | None:
+    """
+    Takes the oldest queued job (or a running one whose worker stopped sending heartbeats).
+    SKIP LOCKED lets any number of workers claim concurrently without waiting on each other.
+    A stale job claimed ``max_attempts`` times already (it keeps killing its worker) fails.
+    """
+    stale = (Job.status == JobStatusEnum.RUNNING) & (
+        Job.dt_heartbeat < func.now() - timedelta(seconds=stale_seconds)
+    )
+    await session.execute(
+        update(Job)
+        .where(stale, Job.attempts >= max_attempts)
+        .values(
+            status=JobStatusEnum.FAILED,
+            error=f"The worker stopped {max_attempts} times while running the job",
+            dt_finished=func.now(),
+        )
+    )
+    candidate = (
+        select(Job.id)
+        .where(or_(Job.status == JobStatusEnum.QUEUED, stale))
+        .order_by(Job.dt_created)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+    job = await session.scalar(
+        update(Job)
+        .where(Job.id == candidate)
+        .values(
+            status=JobStatusEnum.RUNNING,
+            attempts=Job.attempts + 1,
+            progress=0,
+            error=None,
+            dt_started=func.now(),
+            dt_heartbeat=func.now(),
+        )
+        .returning(Job)
+    )
+    await session.commit()
+    return job
+
+
+async def dal_update_job_progress(
+        session: AsyncSession,
+        job_id: uuid.UUID,
+        progress: float,
+        message: str | None = None,
+) -> None:
+    values = {"progress": progress, "dt_heartbeat": func.now()}
+    if message is not None:
+        values["message"] = message
+    await session.execute(
+        update(Job)
+        .where(Job.id == job_id)
+        .values(**values)
+    )
+    await session.commit()
+
+
+async def dal_touch_job(
+        session: AsyncSession,
+        job_id: uuid.UUID,
+) -> None:
+    await session.execute(
+        update(Job)
+        .where(Job.id == job_id)
+        .values(dt_heartbeat=func.now())
+    )
+    await session.commit()
+
+
+async def dal_finish_job(
+        session: AsyncSession,
+        job_id: uuid.UUID,
+        result: bytes | None = None,
+        content_type: str | None = None,
+        filename: str | None = None,
+        chunked: bool = False,
+) -> None:
+    """
+    Marks the job done with its result: ``result`` bytes or, with ``chunked``,
+    the chunks written by dal_add_job_result_chunk.
+    """
+    await session.execute(
+        update(Job)
+        .where(Job.id == job_id)
+        .values(
+            status=JobStatusEnum.DONE,
+            progress=1,
+            result=result,
+            result_chunked=chunked,
+            result_content_type=content_type if result is not None or chunked else None,
+            result_filename=filename,
+            dt_finished=func.now(),
+        )
+    )
+    await session.commit()
+
+
+async def dal_fail_job(
+        session: AsyncSession,
+        job_id: uuid.UUID,
+        error: str,
+) -> None:
+    await session.execute(
+        update(Job)
+        .where(Job.id == job_id)
+        .values(status=JobStatusEnum.FAILED, error=error, dt_finished=func.now())
+    )
+    await session.commit()
+
+
+async def dal_requeue_job(
+        session: AsyncSession,
+        job_id: uuid.UUID,
+) -> None:
+    await session.execute(
+        update(Job)
+        .where(Job.id == job_id, Job.status == JobStatusEnum.RUNNING)
+        # a stopped worker is not a failed attempt
+        .values(status=JobStatusEnum.QUEUED, attempts=Job.attempts - 1, dt_heartbeat=None)
+    )
+    await session.commit()
+
+
+async def dal_delete_finished_jobs(
+        session: AsyncSession,
+        retention_days: int,
+) -> int:
+    """
+    Deletes jobs finished more than ``retention_days`` ago, their result chunks with them.
+    """
+    deleted = await session.scalars(
+        delete(Job)
+        .where(
+            Job.status.in_([JobStatusEnum.DONE, JobStatusEnum.FAILED]),
+            Job.dt_finished < func.now() - timedelta(days=retention_days),
+        )
+        .returning(Job.id)
+    )
+    count = len(deleted.all())
+    await session.commit()
+    return count
+
+
+async def dal_add_job_result_chunk(
+        session: AsyncSession,
+        job_id: uuid.UUID,
+        seq: int,
+        data: bytes,
+) -> None:
+    session.add(JobResultChunk(job_id=job_id, seq=seq, data=data))
+    await session.commit()
+
+
+async def dal_delete_job_result_chunks(
+        session: AsyncSession,
+        job_id: uuid.UUID,
+) -> None:
+    await session.execute(delete(JobResultChunk).where(JobResultChunk.job_id == job_id))
+    await session.commit()
+
+
+async def dal_get_job_result_chunk(
+        session: AsyncSession,
+        job_id: uuid.UUID,
+        seq: int,
+) -> bytes | None:
+    data = await session.scalar(
+        select(JobResultChunk.data)
+        .where(JobResultChunk.job_id == job_id, JobResultChunk.seq == seq)
+    )
+    return data
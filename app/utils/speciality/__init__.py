@@ -0,0 +1,5 @@
+from .database import dal_get_specialities
+
+__all__ = [
+    "dal_get_specialities",
+]
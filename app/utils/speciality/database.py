@@ -0,0 +1,29 @@
+from typing import Any
+
+from sqlalchemy import Row, Sequence, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import Speciality, doctor_speciality
+
+
+async def dal_get_specialities(session: AsyncSession) -> Sequence[Row[Any]]:
+    """
+    All specialities by name with the number of their doctors, counted from the
+    doctor_speciality index without touching doctor rows.
+    """
+    rows = await session.execute(SPECIALITIES_STMT)
+    return rows.all()
+
+
+# --- HELPERS ---
+
+SPECIALITIES_STMT = (
+    select(
+        Speciality.id,
+        Speciality.name,
+        func.count(doctor_speciality.c.doctor_id).label("doctor_count"),
+    )
+    .outerjoin(doctor_speciality, doctor_speciality.c.speciality_id == Speciality.id)
+    .group_by(Speciality.id)
+    .order_by(Speciality.name)
+)
@@ -0,0 +1,7 @@
+from .database import STATS_FIELDS, dal_rebuild_visit_stats, dal_refresh_visit_stats
+
+__all__ = [
+    "STATS_FIELDS",
+    "dal_refresh_visit_stats",
+    "dal_rebuild_visit_stats",
+]
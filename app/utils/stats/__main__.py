@@ -0,0 +1,20 @@
+"""
+Repair job: rebuilds denormalized visit statistics of all clients and doctors.
+
+Usage: python -m app.utils.stats
+"""
+import asyncio
+
+from app.db.connection import SessionManager
+
+from .database import dal_rebuild_visit_stats
+
+
+async def main() -> None:
+    session_maker = SessionManager().get_session_maker()
+    async with session_maker() as session:
+        await dal_rebuild_visit_stats(session)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
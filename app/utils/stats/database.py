@@ -0,0 +1,121 @@
+import uuid
+from collections.abc import Iterable
+
+from sqlalchemy import Select, Update, func, select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import InstrumentedAttribute, aliased
+
+from app.db.enums import VisitStatusEnum
+from app.db.models import Client, Doctor, Visit
+from app.services.result_cache import CLIENTS, DOCTORS, result_cache
+
+# visit columns which affect denormalized statistics
+STATS_FIELDS = frozenset({"client_id", "doctor_id", "start_date", "cost", "status"})
+
+
+async def dal_refresh_visit_stats(
+        session: AsyncSession,
+        client_ids: Iterable[uuid.UUID] = (),
+        doctor_ids: Iterable[uuid.UUID] = (),
+) -> None:
+    """
+    Recalculates statistics of the given clients and doctors inside the current transaction.
+
+    The owners are locked first: under READ COMMITTED the aggregate of the following
+    UPDATE then sees every visit committed by a concurrent writer of the same owner,
+    instead of a snapshot from before its lock wait. Locks are taken in id order,
+    clients before doctors, so concurrent refreshes cannot deadlock.
+    """
+    client_ids = {client_id for client_id in client_ids if client_id}
+    doctor_ids = {doctor_id for doctor_id in doctor_ids if doctor_id}
+    if client_ids:
+        await session.execute(_lock_owners_stmt(Client, client_ids))
+        await session.execute(_stats_update_stmt(Client, Visit.client_id, client_ids))
+    if doctor_ids:
+        await session.execute(_lock_owners_stmt(Doctor, doctor_ids))
+        await session.execute(_stats_update_stmt(Doctor, Visit.doctor_id, doctor_ids))
+
+
+async def dal_rebuild_visit_stats(
+        session: AsyncSession,
+) -> None:
+    """
+    Recalculates statistics of all clients and doctors in one statement per table,
+    all owners are locked first like in dal_refresh_visit_stats.
+    """
+    await session.execute(_lock_owners_stmt(Client))
+    await session.execute(_stats_update_stmt(Client, Visit.client_id))
+    await session.execute(_lock_owners_stmt(Doctor))
+    await session.execute(_stats_update_stmt(Doctor, Visit.doctor_id))
+    await session.commit()
+    await result_cache.invalidate(CLIENTS, DOCTORS)
+
+
+# --- HELPERS ---
+
+STATS_COLUMNS = ("visit_count", "paid_total", "last_visit_at", "next_visit_at")
+
+
+def _lock_owners_stmt(
+        model: type[Client] | type[Doctor],
+        owner_ids: set[uuid.UUID] | None = None,
+) -> Select:
+    # NO KEY UPDATE: visit foreign keys hold KEY SHARE locks on the same rows
+    stmt = select(model.id).order_by(model.id).with_for_update(key_share=True)
+    if owner_ids is not None:
+        stmt = stmt.where(model.id.in_(owner_ids))
+    return stmt
+
+
+def _stats_update_stmt(
+        model: type[Client] | type[Doctor],
+        owner_column: InstrumentedAttribute,
+        owner_ids: set[uuid.UUID] | None = None,
+) -> Update:
+    aggregated = (
+        select(
+            owner_column.label("owner_id"),
+            func.count(Visit.id).label("visit_count"),
+            func.sum(Visit.cost).filter(Visit.status == VisitStatusEnum.PAID).label("paid_total"),
+            func.max(Visit.start_date).filter(Visit.start_date <= func.now()).label("last_visit_at"),
+            func.min(Visit.start_date).filter(Visit.start_date > func.now()).label("next_visit_at"),
+        )
+        .group_by(owner_column)
+    )
+    owner = aliased(model)
+    source = select(owner.id.label("id")).select_from(owner)
+    if owner_ids is not None:
+        aggregated = aggregated.where(owner_column.in_(owner_ids))
+        source = source.where(owner.id.in_(owner_ids))
+
+    aggregated = aggregated.subquery()
+    source = (
+        source
+        .add_columns(
+            aggregated.c.visit_count,
+            aggregated.c.paid_total,
+            aggregated.c.last_visit_at,
+            aggregated.c.next_visit_at,
+        )
+        .outerjoin(aggregated, aggregated.c.owner_id == owner.id)
+        .subquery()
+    )
+
+    values = {
+        "visit_count": func.coalesce(source.c.visit_count, 0),
+        "paid_total": func.coalesce(source.c.paid_total, 0),
+        "last_visit_at": source.c.last_visit_at,
+        "next_visit_at": source.c.next_visit_at,
+    }
+    return (
+        update(model)
+        .where(
+            model.id == source.c.id,
+            # unchanged rows are not written at all
+            tuple_(*(getattr(model, name) for name in STATS_COLUMNS)).is_distinct_from(
+                tuple_(*(values[name] for name in STATS_COLUMNS))
+            ),
+        )
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
@@ -0,0 +1,9 @@
+from .database import dal_get_sync_horizon, dal_get_tombstones, dal_get_tombstones_since
+from .service import svc_get_changes
+
+__all__ = [
+    "dal_get_sync_horizon",
+    "dal_get_tombstones",
+    "dal_get_tombstones_since",
+    "svc_get_changes",
+]
@@ -0,0 +1,134 @@
+import datetime
+import uuid
+from collections.abc import Sequence
+
+from sqlalchemy import Integer, bindparam, delete, select, text, tuple_
+from sqlalchemy.dialects.postgresql import TIMESTAMP, UUID
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import Client, Doctor, Tombstone, Visit
+
+# (dt_updated or dt_created, id) of the last row a stream returned
+Cursor = tuple[datetime.datetime, uuid.UUID]
+
+
+async def dal_get_sync_horizon(
+        session: AsyncSession,
+        lag_seconds: float,
+) -> datetime.datetime:
+    """
+    Rows stamped up to the horizon are committed. Every row is stamped at or after the start
+    of its transaction (now() of inserts, clock_timestamp() of updates), so the horizon is
+    just before the start of the oldest transaction still open, and at least the safety
+    lag before the database time. A long writer (the stats rebuild, a merge waiting for
+    locks) holds the horizon back instead of having its rows skipped.
+
+    Other sessions' transactions are seen in pg_stat_activity when they run as the same
+    role or the role has pg_read_all_stats, otherwise only the lag protects them.
+    """
+    return await session.scalar(SYNC_HORIZON_STMT, {"lag_seconds": lag_seconds})
+
+
+async def dal_get_changed(
+        session: AsyncSession,
+        model: type[Client | Doctor | Visit],
+        after: Cursor,
+        horizon: datetime.datetime,
+        limit: int,
+) -> Sequence[Client | Doctor | Visit]:
+    """
+    Rows created or updated after the cursor and not after the horizon, in keyset order.
+    """
+    rows = await session.scalars(
+        CHANGED_STMTS[model],
+        {"after_dt": after[0], "after_id": after[1], "horizon": horizon, "limit": limit},
+    )
+    return rows.all()
+
+
+async def dal_get_tombstones(
+        session: AsyncSession,
+        tables: Sequence[str],
+        after: Cursor,
+        horizon: datetime.datetime,
+        limit: int,
+) -> Sequence[Tombstone]:
+    rows = await session.scalars(
+        TOMBSTONES_STMT,
+        {
+            "tables": list(tables),
+            "after_dt": after[0],
+            "after_id": after[1],
+            "horizon": horizon,
+            "limit": limit,
+        },
+    )
+    return rows.all()
+
+
+async def dal_get_tombstones_since(
+        session: AsyncSession,
+        table: str,
+        since: datetime.datetime,
+        limit: int,
+) -> Sequence[Tombstone]:
+    """
+    Rows of the table deleted after ``since``, oldest first.
+    """
+    rows = await session.scalars(
+        select(Tombstone)
+        .where(Tombstone.table_name == table, Tombstone.dt_created > since)
+        .order_by(Tombstone.dt_created, Tombstone.id)
+        .limit(limit)
+    )
+    return rows.all()
+
+
+async def dal_delete_expired_tombstones(
+        session: AsyncSession,
+        before: datetime.datetime,
+) -> None:
+    await session.execute(delete(Tombstone).where(Tombstone.dt_created < before))
+    await session.commit()
+
+
+# --- HELPERS ---
+
+AFTER = tuple_(
+    bindparam("after_dt", type_=TIMESTAMP(timezone=True)),
+    bindparam("after_id", type_=UUID(as_uuid=True)),
+)
+HORIZON = bindparam("horizon", type_=TIMESTAMP(timezone=True))
+
+# least() ignores the NULL of no other open transaction
+SYNC_HORIZON_STMT = text("""
+    SELECT least(
+        now() - make_interval(secs => :lag_seconds),
+        (
+            SELECT min(xact_start) FROM pg_stat_activity
+            WHERE datname = current_database() AND pid <> pg_backend_pid()
+        ) - interval '1 microsecond'
+    )
+""")
+LIMIT = bindparam("limit", type_=Integer)
+
+CHANGED_STMTS = {
+    model: (
+        select(model)
+        .where(tuple_(model.dt_updated, model.id) > AFTER, model.dt_updated <= HORIZON)
+        .order_by(model.dt_updated, model.id)
+        .limit(LIMIT)
+    )
+    for model in (Client, Doctor, Visit)
+}
+
+TOMBSTONES_STMT = (
+    select(Tombstone)
+    .where(
+        Tombstone.table_name.in_(bindparam("tables", expanding=True)),
+        tuple_(Tombstone.dt_created, Tombstone.id) > AFTER,
+        Tombstone.dt_created <= HORIZON,
+    )
+    .order_by(Tombstone.dt_created, Tombstone.id)
+    .limit(LIMIT)
+)
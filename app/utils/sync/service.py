@@ -0,0 +1,149 @@
+import base64
+import binascii
+import datetime
+import json
+import uuid
+from collections.abc import Collection, Sequence
+from typing import Any
+
+from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette import status
+
+from app.config import get_settings
+from app.db.models import Client, Doctor, Visit
+from app.schemas import (
+    ClientResponse,
+    DoctorResponse,
+    SyncDeleted,
+    SyncEntityEnum,
+    SyncResponse,
+    VisitResponse,
+)
+
+from .database import (
+    Cursor,
+    dal_delete_expired_tombstones,
+    dal_get_changed,
+    dal_get_sync_horizon,
+    dal_get_tombstones,
+)
+
+TOKEN_VERSION = 1
+TOMBSTONES = "tombstones"
+ENTITIES = {
+    SyncEntityEnum.CLIENTS: (Client, ClientResponse, "client"),
+    SyncEntityEnum.DOCTORS: (Doctor, DoctorResponse, "doctor"),
+    SyncEntityEnum.VISITS: (Visit, VisitResponse, "visit"),
+}
+START = (datetime.datetime.min.replace(tzinfo=datetime.UTC), uuid.UUID(int=0))
+
+_syncs_until_cleanup = 1000
+
+
+async def svc_get_changes(
+        session: AsyncSession,
+        since: str | None,
+        include: Collection[SyncEntityEnum],
+) -> SyncResponse:
+    """
+    One page of changes per entity after the token's cursors. A stream which caught up
+    moves its cursor to the horizon, so tokens of idle clients do not get old.
+
+    Without a token everything is returned, and deletes are tracked from now on.
+    """
+    settings = get_settings()
+    horizon = await dal_get_sync_horizon(session, settings.SYNC_SAFETY_LAG_SECONDS)
+    expires_before = horizon - datetime.timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS)
+
+    if since is None:
+        entities = sorted(set(include), key=list(ENTITIES).index)
+        cursors = {entity.value: START for entity in entities}
+        cursors[TOMBSTONES] = (horizon, START[1])
+    else:
+        entities, cursors = _decode_token(since)
+        if cursors[TOMBSTONES][0] < expires_before:
+            raise HTTPException(
+                status_code=status.HTTP_410_GONE,
+                detail="Sync token has expired, start over without a token",
+            )
+    await _cleanup_expired(session, expires_before)
+
+    limit = settings.SYNC_PAGE_SIZE
+    response = SyncResponse(deleted=SyncDeleted(), token="", has_more=False)
+    for entity in entities:
+        model, schema, _ = ENTITIES[entity]
+        rows = await dal_get_changed(session, model, cursors[entity.value], horizon, limit)
+        setattr(response, entity.value, [schema.model_validate(row) for row in rows])
+        cursors[entity.value] = _advance(rows, "dt_updated", limit, horizon)
+        response.has_more |= len(rows) == limit
+
+    tables = {table: entity for entity, (_, _, table) in ENTITIES.items() if entity in entities}
+    tombstones = await dal_get_tombstones(
+        session, list(tables), cursors[TOMBSTONES], horizon, limit
+    )
+    for tombstone in tombstones:
+        getattr(response.deleted, tables[tombstone.table_name].value).append(tombstone.record_id)
+    cursors[TOMBSTONES] = _advance(tombstones, "dt_created", limit, horizon)
+    response.has_more |= len(tombstones) == limit
+
+    response.token = _encode_token(entities, cursors)
+    return response
+
+
+# --- HELPERS ---
+
+def _advance(
+        rows: Sequence[Any],
+        dt_field: str,
+        limit: int,
+        horizon: datetime.datetime,
+) -> Cursor:
+    """
+    Last returned row while the stream has more, otherwise the horizon. Rows stamped exactly
+    at the horizon may be sent twice, which the client tolerates as an update.
+    """
+    if len(rows) < limit:
+        return horizon, START[1]
+    return getattr(rows[-1], dt_field), rows[-1].id
+
+
+def _encode_token(entities: list[SyncEntityEnum], cursors: dict[str, Cursor]) -> str:
+    payload = {
+        "v": TOKEN_VERSION,
+        "e": [entity.value for entity in entities],
+        "c": {name: [dt.isoformat(), str(record_id)] for name, (dt, record_id) in cursors.items()},
+    }
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_token(token: str) -> tuple[list[SyncEntityEnum], dict[str, Cursor]]:
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+        if payload["v"] != TOKEN_VERSION:
+            raise ValueError("unknown token version")
+        entities = [SyncEntityEnum(value) for value in payload["e"]]
+        cursors = {
+            name: (datetime.datetime.fromisoformat(dt), uuid.UUID(record_id))
+            for name, (dt, record_id) in payload["c"].items()
+        }
+        if set(cursors) != {entity.value for entity in entities} | {TOMBSTONES}:
+            raise ValueError("cursors do not match entities")
+        if any(dt.tzinfo is None for dt, _ in cursors.values()):
+            raise ValueError("cursors must be timezone-aware")
+    except (
+        binascii.Error, UnicodeDecodeError, AttributeError, KeyError, TypeError, ValueError
+    ) as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Malformed sync token"
+        ) from e
+    return entities, cursors
+
+
+async def _cleanup_expired(session: AsyncSession, before: datetime.datetime) -> None:
+    global _syncs_until_cleanup
+    _syncs_until_cleanup -= 1
+    if _syncs_until_cleanup <= 0:
+        _syncs_until_cleanup = 1000
+        await dal_delete_expired_tombstones(session, before)
@@ -1,15 +1,31 @@
 from .database import (
     create_new_visit,
+    dal_count_visits_by_filter,
+    dal_stream_visits_by_filter,
     delete_visit_by_id,
     get_visit_by_id,
+    get_visits_by_ids,
     update_visit,
 )
-from .service import svc_get_visits_by_filter
+from .service import (
+    svc_cancel_visit_series,
+    svc_create_visit_series,
+    svc_get_visits_by_filter,
+    svc_stream_visit_changes,
+    svc_update_visit_series,
+)
 
 __all__ = [
     "get_visit_by_id",
+    "get_visits_by_ids",
     "create_new_visit",
     "update_visit",
     "delete_visit_by_id",
     "svc_get_visits_by_filter",
+    "svc_stream_visit_changes",
+    "svc_create_visit_series",
+    "svc_update_visit_series",
+    "svc_cancel_visit_series",
+    "dal_count_visits_by_filter",
+    "dal_stream_visits_by_filter",
 ]
\ No newline at end of file
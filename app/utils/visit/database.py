@@ -1,11 +1,53 @@
+import datetime
+import json
 import uuid
+from collections.abc import AsyncIterator
+from functools import lru_cache
 from typing import Any
 
-from sqlalchemy import Date, Sequence, Time, asc, cast, desc, select, update, Select, func
+from sqlalchemy import (
+    Date,
+    Integer,
+    Select,
+    Sequence,
+    String,
+    Row,
+    Time,
+    and_,
+    any_,
+    asc,
+    bindparam,
+    case,
+    cast,
+    column,
+    delete,
+    desc,
+    func,
+    insert,
+    or_,
+    select,
+    text,
+    update,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, TEXT, TIMESTAMP, UUID
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.models import Visit
-from app.schemas.visit import VisitCreateRequest, VisitSearchRequest, VisitUpdateRequest
+from app.db import Explain
+from app.db.enums import AuditActionEnum, VisitStatusEnum
+from app.db.models import Client, Doctor, Visit, doctor_speciality
+from app.db.models.visit import SEARCH_CONFIG
+from app.schemas.visit import (
+    MAX_VISIT_DURATION,
+    VisitCreateRequest,
+    VisitSearchRequest,
+    VisitUpdateRequest,
+)
+from app.services.audit import audit_state, audit_writer, audited_columns
+from app.services.result_cache import result_cache
+from app.utils.audit import previous_row, previous_state
+from app.utils.stats import STATS_FIELDS, dal_refresh_visit_stats
+
+from .series import VisitSlot
 
 
 async def get_visit_by_id(
@@ -19,14 +61,30 @@ async def get_visit_by_id(
     return visit
 
 
+async def get_visits_by_ids(
+        session: AsyncSession,
+        visit_ids: list[uuid.UUID],
+) -> Sequence[Visit]:
+    """
+    One ``id = ANY(:ids)`` query, rows come in no particular order.
+    """
+    visits = await session.scalars(VISITS_BY_IDS_STMT, {"ids": visit_ids})
+    return visits.all()
+
+
 async def create_new_visit(
         session: AsyncSession,
         potential_visit: VisitCreateRequest
 ) -> Visit:
     visit = Visit(**potential_visit.model_dump())
     session.add(visit)
+    await session.flush()
+    await dal_refresh_visit_stats(session, [visit.client_id], [visit.doctor_id])
     await session.commit()
     await session.refresh(visit)
+    after = audit_state(visit)
+    await result_cache.visits_changed(after)
+    audit_writer.record("visit", visit.id, AuditActionEnum.CREATE, after=after)
     return visit
 
 
@@ -36,26 +94,206 @@ async def update_visit(
         update_request: VisitUpdateRequest,
 ) -> Visit | None:
     values = update_request.model_dump(exclude_none=True)
-    visit = await session.scalar(
+    # the previous row also gives the previous owners, whose statistics change too
+    previous, previous_columns = previous_row(Visit, visit_id)
+    row = (await session.execute(
         update(Visit)
-        .where(Visit.id == visit_id)
+        .where(Visit.id == previous.c.id)
         .values(**values)
-        .returning(Visit)
-    )
+        .returning(Visit, *previous_columns)
+    )).first()
+    if row is None:
+        await session.commit()
+        return None
+
+    visit, before = row[0], previous_state(row)
+    if STATS_FIELDS & values.keys():
+        await dal_refresh_visit_stats(
+            session, [visit.client_id, before["client_id"]], [visit.doctor_id, before["doctor_id"]]
+        )
     await session.commit()
+    after = audit_state(visit)
+    await result_cache.visits_changed(before, after)
+    audit_writer.record("visit", visit.id, AuditActionEnum.UPDATE, before, after)
     return visit
 
 
 async def delete_visit_by_id(
         session: AsyncSession,
         visit_id: uuid.UUID,
-) -> None:
+) -> bool:
+    """
+    False if there is no such visit.
+    """
     visit = await session.scalar(
         select(Visit)
         .where(Visit.id == visit_id)
     )
+    if visit is None:
+        await session.commit()
+        return False
+    before = audit_state(visit)
     await session.delete(visit)
+    await session.flush()
+    await dal_refresh_visit_stats(session, [visit.client_id], [visit.doctor_id])
+    await session.commit()
+    await result_cache.visits_changed(before)
+    audit_writer.record("visit", visit_id, AuditActionEnum.DELETE, before=before)
+    return True
+
+
+async def dal_lock_visit_slots(
+        session: AsyncSession,
+        slots: Sequence[VisitSlot],
+) -> None:
+    """
+    Serializes bookings of the doctors and cabinets of the slots until the transaction ends,
+    so a conflict check stays true until the visits are written. Keys are locked in one
+    order by every booking, two of them never wait for each other.
+    """
+    keys = sorted(
+        {f"doctor:{slot.doctor_id}" for slot in slots}
+        | {f"cabinet:{slot.cabinet}" for slot in slots if slot.cabinet}
+    )
+    # a text statement keeps the LazySession transaction open
+    await session.execute(LOCK_VISIT_SLOTS_STMT, {"keys": keys})
+
+
+async def dal_find_visit_conflicts(
+        session: AsyncSession,
+        slots: Sequence[VisitSlot],
+        exclude_series_id: uuid.UUID | None = None,
+) -> list[Row]:
+    """
+    Visits of the same doctor or in the same cabinet overlapping any of the slots,
+    found by one range query. Rows have the 0-based slot position and the reason.
+    """
+    rows = await session.execute(
+        VISIT_CONFLICTS_STMT,
+        {
+            "starts": [slot.start_date for slot in slots],
+            "ends": [slot.end_date for slot in slots],
+            "doctor_ids": [slot.doctor_id for slot in slots],
+            "cabinets": [slot.cabinet for slot in slots],
+            "exclude_series_id": exclude_series_id,
+        },
+    )
+    return rows.all()
+
+
+async def dal_create_visit_series(
+        session: AsyncSession,
+        series_id: uuid.UUID,
+        rows: list[dict[str, Any]],
+) -> Sequence[Visit]:
+    """
+    Inserts all occurrences with one multi-row INSERT in one transaction.
+    """
+    await session.execute(insert(Visit).values(rows))
+    await dal_refresh_visit_stats(
+        session, (row["client_id"] for row in rows), (row["doctor_id"] for row in rows)
+    )
+    await session.commit()
+    visits = await dal_get_visit_series(session, series_id)
+    states = [audit_state(visit) for visit in visits]
+    await result_cache.visits_changed(*states)
+    for visit, after in zip(visits, states, strict=True):
+        audit_writer.record("visit", visit.id, AuditActionEnum.CREATE, after=after)
+    return visits
+
+
+async def dal_get_visit_series(
+        session: AsyncSession,
+        series_id: uuid.UUID,
+        from_index: int = 0,
+) -> Sequence[Visit]:
+    visits = await session.scalars(
+        select(Visit)
+        .where(Visit.series_id == series_id, Visit.series_index >= from_index)
+        .order_by(Visit.series_index)
+    )
+    return visits.all()
+
+
+async def dal_update_visit_series(
+        session: AsyncSession,
+        occurrences: Sequence[Visit],
+        values: dict[str, Any],
+        moved: list[tuple[uuid.UUID, datetime.datetime, datetime.datetime]] | None = None,
+) -> Sequence[Visit]:
+    """
+    Applies the same values to all occurrences with one UPDATE, ``moved`` holds
+    new (id, start_date, end_date) of every occurrence when the time changes.
+    """
+    stmt = update(Visit).values(**values)
+    if moved:
+        stmt = stmt.values(
+            start_date=MOVED_VISITS.c.start_date,
+            end_date=MOVED_VISITS.c.end_date,
+        ).where(Visit.id == MOVED_VISITS.c.id)
+        params = {
+            "moved_ids": [visit_id for visit_id, _, _ in moved],
+            "moved_starts": [start_date for _, start_date, _ in moved],
+            "moved_ends": [end_date for _, _, end_date in moved],
+        }
+    else:
+        stmt = stmt.where(Visit.id == any_(bindparam("ids", type_=ARRAY(UUID(as_uuid=True)))))
+        params = {"ids": [visit.id for visit in occurrences]}
+
+    previous_owners = [(visit.client_id, visit.doctor_id) for visit in occurrences]
+    # taken before RETURNING refreshes the same objects
+    before = {visit.id: audit_state(visit) for visit in occurrences}
+    visits = (await session.scalars(
+        stmt.returning(Visit),
+        params,
+        execution_options={"synchronize_session": False},
+    )).all()
+
+    if moved or STATS_FIELDS & values.keys():
+        client_ids = [visit.client_id for visit in visits] + [owner[0] for owner in previous_owners]
+        doctor_ids = [visit.doctor_id for visit in visits] + [owner[1] for owner in previous_owners]
+        await dal_refresh_visit_stats(session, client_ids, doctor_ids)
+    await session.commit()
+    after = {visit.id: audit_state(visit) for visit in visits}
+    await result_cache.visits_changed(*before.values(), *after.values())
+    for visit in visits:
+        audit_writer.record(
+            "visit", visit.id, AuditActionEnum.UPDATE, before.get(visit.id), after[visit.id]
+        )
+    return sorted(visits, key=lambda visit: visit.series_index)
+
+
+async def dal_delete_visit_series(
+        session: AsyncSession,
+        series_id: uuid.UUID,
+        from_index: int = 0,
+) -> tuple[list[uuid.UUID], list[uuid.UUID]]:
+    """
+    Deletes unpaid occurrences from from_index on with one DELETE.
+    Returns ids of the deleted and of the kept paid occurrences.
+    """
+    in_range = and_(Visit.series_id == series_id, Visit.series_index >= from_index)
+    deleted = (await session.execute(
+        delete(Visit)
+        .where(in_range, Visit.status != VisitStatusEnum.PAID)
+        .returning(Visit.id, *audited_columns(Visit)),
+        execution_options={"synchronize_session": False},
+    )).all()
+    kept_paid = (await session.scalars(
+        select(Visit.id)
+        .where(in_range, Visit.status == VisitStatusEnum.PAID)
+        .order_by(Visit.series_index)
+    )).all()
+
+    await dal_refresh_visit_stats(
+        session, (row.client_id for row in deleted), (row.doctor_id for row in deleted)
+    )
     await session.commit()
+    await result_cache.visits_changed(*(row._asdict() for row in deleted))
+    for row in deleted:
+        before = row._asdict()
+        audit_writer.record("visit", before.pop("id"), AuditActionEnum.DELETE, before=before)
+    return [row.id for row in deleted], list(kept_paid)
 
 
 async def dal_get_visits_by_filter(
@@ -65,60 +303,305 @@ async def dal_get_visits_by_filter(
         offset: int = 0,
 ) -> Sequence[Visit]:
     visits = await session.scalars(
-        _search_stmt(search, select(Visit))
-        .limit(limit).offset(offset)
+        _page_stmt(_search_mask(search)),
+        {**_search_params(search), "limit": limit, "offset": offset},
     )
     return visits
 
 
+async def dal_get_visit_fields_by_filter(
+        session: AsyncSession,
+        search: VisitSearchRequest,
+        fields: list[str],
+        limit: int = 10,
+        offset: int = 0,
+) -> list[dict[str, Any]]:
+    """
+    Selects only the requested fields. Client and doctor are joined only
+    when one of their fields is requested, relationships are never loaded.
+    """
+    rows = await session.execute(
+        _fields_page_stmt(tuple(fields), _search_mask(search)),
+        {**_search_params(search), "limit": limit, "offset": offset},
+    )
+    return [row._asdict() for row in rows]
+
+
 async def dal_count_visits_by_filter(
         session: AsyncSession,
         search: VisitSearchRequest,
-) -> Sequence[Visit]:
-    result = await session.scalar(
-        select(func.count()).select_from(
-            _search_stmt(search, select(Visit)).subquery()
+        cap: int | None = None,
+) -> int:
+    """
+    Counts filtered visits. With ``cap`` counting stops after ``cap + 1`` rows,
+    so a result above ``cap`` only means "more than cap".
+    """
+    if cap is None:
+        result = await session.scalar(
+            _count_stmt(_search_mask(search)),
+            _search_params(search),
+        )
+    else:
+        result = await session.scalar(
+            _capped_count_stmt(_search_mask(search)),
+            {**_search_params(search), "count_cap": cap + 1},
         )
-    )
     return result or 0
 
 
+async def dal_estimate_visits_by_filter(
+        session: AsyncSession,
+        search: VisitSearchRequest,
+) -> int:
+    """
+    Planner row estimate of the filtered visits, the table statistics without filters.
+    """
+    mask = _search_mask(search)
+    if not mask:
+        reltuples = await session.scalar(TABLE_ESTIMATE_STMT)
+        # -1 until the table has been vacuumed or analyzed
+        if reltuples is not None and reltuples >= 0:
+            return int(reltuples)
+
+    plan = await session.scalar(Explain(_estimate_stmt(mask)), _search_params(search))
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
 async def dal_total_visits_cost_by_filter(
         session: AsyncSession,
         search: VisitSearchRequest,
 ) -> float:
-    filtered_costs = _search_stmt(
-        search,
-        select(Visit.cost.label("cost")),
-    ).subquery()
-
     result = await session.scalar(
-        select(func.coalesce(func.sum(filtered_costs.c.cost), 0))
+        _total_cost_stmt(_search_mask(search)),
+        _search_params(search),
     )
-
     return float(result)
 
 
+async def dal_stream_visits_by_filter(
+        session: AsyncSession,
+        search: VisitSearchRequest,
+        batch_size: int = 1000,
+) -> AsyncIterator[Sequence[Visit]]:
+    """
+    Yields filtered visits in batches from a server-side cursor.
+    """
+    result = await session.stream_scalars(
+        _filtered_stmt(_search_mask(search)),
+        _search_params(search),
+        execution_options={"yield_per": batch_size},
+    )
+    async for partition in result.partitions():
+        yield partition
+
+
+async def dal_get_visits_changed_since(
+        session: AsyncSession,
+        since: datetime.datetime,
+        doctor_id: uuid.UUID | None = None,
+        cabinet: str | None = None,
+        day: datetime.date | None = None,
+        timezone: str = "UTC",
+        limit: int = 500,
+) -> Sequence[Visit]:
+    """
+    Visits changed after ``since``, ``day`` is a day in ``timezone``.
+    """
+    stmt = select(Visit).where(Visit.dt_updated > since)
+    if doctor_id:
+        stmt = stmt.where(Visit.doctor_id == doctor_id)
+    if cabinet:
+        stmt = stmt.where(Visit.cabinet == cabinet)
+    if day:
+        stmt = stmt.where(cast(func.timezone(timezone, Visit.start_date), Date) == day)
+    visits = await session.scalars(
+        stmt
+        .order_by(Visit.dt_updated.asc(), Visit.id.asc())
+        .limit(limit)
+    )
+    return visits.all()
+
+
 # --- HELPERS ---
 
-def _search_stmt(search: VisitSearchRequest, stmt: Select[Any]) -> Select[Any]:
-    if search.client_id:
-        stmt = stmt.where(Visit.client_id == search.client_id)
-    if search.doctor_id:
-        stmt = stmt.where(Visit.doctor_id == search.doctor_id)
-    if search.start_date:
-        stmt = stmt.where(Visit.start_date >= search.start_date)
-    if search.end_date:
-        stmt = stmt.where(Visit.end_date <= search.end_date)
-    if search.cabinet:
-        stmt = stmt.where(Visit.cabinet == search.cabinet)
-    if search.procedure:
-        stmt = stmt.where(Visit.procedure == search.procedure)
-    if search.status:
-        stmt = stmt.where(Visit.status == search.status)
-
-    stmt = stmt.order_by(
+VISITS_BY_IDS_STMT = select(Visit).where(
+    Visit.id == any_(bindparam("ids", type_=ARRAY(UUID(as_uuid=True))))
+)
+
+LOCK_VISIT_SLOTS_STMT = text(
+    "SELECT count(pg_advisory_xact_lock(hashtextextended(key, 0))) "
+    "FROM unnest(CAST(:keys AS text[])) AS key"
+)
+
+CONFLICT_SLOTS = func.unnest(
+    bindparam("starts", type_=ARRAY(TIMESTAMP(timezone=True))),
+    bindparam("ends", type_=ARRAY(TIMESTAMP(timezone=True))),
+    bindparam("doctor_ids", type_=ARRAY(UUID(as_uuid=True))),
+    bindparam("cabinets", type_=ARRAY(TEXT)),
+).table_valued(
+    column("start_date", TIMESTAMP(timezone=True)),
+    column("end_date", TIMESTAMP(timezone=True)),
+    column("doctor_id", UUID(as_uuid=True)),
+    column("cabinet", TEXT),
+    with_ordinality="position",
+).render_derived(name="slot")
+
+VISIT_CONFLICTS_STMT = (
+    select(
+        (CONFLICT_SLOTS.c.position - 1).label("position"),
+        Visit.id,
+        Visit.start_date,
+        Visit.end_date,
+        case(
+            (Visit.doctor_id == CONFLICT_SLOTS.c.doctor_id, "doctor"),
+            else_="cabinet",
+        ).label("reason"),
+    )
+    .select_from(CONFLICT_SLOTS)
+    .join(
+        Visit,
+        and_(
+            Visit.start_date < CONFLICT_SLOTS.c.end_date,
+            Visit.start_date > CONFLICT_SLOTS.c.start_date - MAX_VISIT_DURATION,
+            Visit.end_date > CONFLICT_SLOTS.c.start_date,
+            or_(
+                Visit.doctor_id == CONFLICT_SLOTS.c.doctor_id,
+                Visit.cabinet == CONFLICT_SLOTS.c.cabinet,
+            ),
+        ),
+    )
+    .where(
+        Visit.series_id.is_distinct_from(
+            bindparam("exclude_series_id", type_=UUID(as_uuid=True))
+        )
+    )
+    .order_by(CONFLICT_SLOTS.c.position, Visit.start_date)
+)
+
+MOVED_VISITS = func.unnest(
+    bindparam("moved_ids", type_=ARRAY(UUID(as_uuid=True))),
+    bindparam("moved_starts", type_=ARRAY(TIMESTAMP(timezone=True))),
+    bindparam("moved_ends", type_=ARRAY(TIMESTAMP(timezone=True))),
+).table_valued(
+    column("id", UUID(as_uuid=True)),
+    column("start_date", TIMESTAMP(timezone=True)),
+    column("end_date", TIMESTAMP(timezone=True)),
+).render_derived(name="moved")
+
+# VisitResponse fields which are not visit columns
+JOINED_FIELDS = {
+    "client_name": (Client, Client.full_name),
+    "client_phone_number": (Client, Client.phone_number),
+    "doctor_name": (Doctor, Doctor.full_name),
+}
+
+
+# Optional VisitSearchRequest filters. Conditions take their values from bound
+# parameters named after the fields, so a statement depends only on which
+# filters are set and is built and compiled once per combination.
+SEARCH_QUERY = func.websearch_to_tsquery(SEARCH_CONFIG, bindparam("q", type_=String))
+SEARCH_CONDITIONS = {
+    "client_id": Visit.client_id == bindparam("client_id"),
+    "doctor_id": Visit.doctor_id == bindparam("doctor_id"),
+    "start_date": Visit.start_date >= bindparam("start_date"),
+    "end_date": Visit.end_date <= bindparam("end_date"),
+    "cabinet": Visit.cabinet == bindparam("cabinet"),
+    "procedure": Visit.procedure == bindparam("procedure"),
+    "status": Visit.status == bindparam("status"),
+    # semi-join through ix__doctor_speciality__speciality_id_doctor_id and ix__visit__doctor_id
+    "speciality_id": Visit.doctor_id.in_(
+        select(doctor_speciality.c.doctor_id)
+        .where(doctor_speciality.c.speciality_id == bindparam("speciality_id"))
+    ),
+    "q": Visit.search_vector.op("@@")(SEARCH_QUERY),
+}
+LIMIT = bindparam("limit", type_=Integer)
+OFFSET = bindparam("offset", type_=Integer)
+
+TABLE_ESTIMATE_STMT = text(
+    f"SELECT reltuples FROM pg_class WHERE oid = '{Visit.__tablename__}'::regclass"
+)
+
+# 2 ** len(SEARCH_CONDITIONS) masks per statement kind at most
+STATEMENT_CACHE_SIZE = 2 ** len(SEARCH_CONDITIONS)
+
+
+def _search_mask(search: VisitSearchRequest) -> tuple[str, ...]:
+    return tuple(name for name in SEARCH_CONDITIONS if getattr(search, name))
+
+
+def _search_params(search: VisitSearchRequest) -> dict[str, Any]:
+    return {name: getattr(search, name) for name in _search_mask(search)}
+
+
+def _search_stmt(
+        mask: tuple[str, ...],
+        stmt: Select[Any],
+        ordered: bool = True,
+) -> Select[Any]:
+    for name in mask:
+        stmt = stmt.where(SEARCH_CONDITIONS[name])
+    if not ordered:
+        return stmt
+    if "q" in mask:
+        stmt = stmt.order_by(desc(func.ts_rank(Visit.search_vector, SEARCH_QUERY)))
+    return stmt.order_by(
         desc(cast(Visit.start_date, Date)),
         asc(cast(Visit.start_date, Time))
     )
-    return stmt
+
+
+@lru_cache(maxsize=STATEMENT_CACHE_SIZE)
+def _filtered_stmt(mask: tuple[str, ...]) -> Select[Any]:
+    return _search_stmt(mask, select(Visit))
+
+
+@lru_cache(maxsize=STATEMENT_CACHE_SIZE)
+def _page_stmt(mask: tuple[str, ...]) -> Select[Any]:
+    return _filtered_stmt(mask).limit(LIMIT).offset(OFFSET)
+
+
+@lru_cache(maxsize=STATEMENT_CACHE_SIZE)
+def _fields_page_stmt(fields: tuple[str, ...], mask: tuple[str, ...]) -> Select[Any]:
+    columns = []
+    joined = set()
+    for field in fields:
+        if field in JOINED_FIELDS:
+            model, column = JOINED_FIELDS[field]
+            joined.add(model)
+            columns.append(column.label(field))
+        else:
+            columns.append(getattr(Visit, field))
+
+    stmt = select(*columns)
+    if Client in joined:
+        stmt = stmt.join(Client, Client.id == Visit.client_id)
+    if Doctor in joined:
+        stmt = stmt.join(Doctor, Doctor.id == Visit.doctor_id)
+    return _search_stmt(mask, stmt).limit(LIMIT).offset(OFFSET)
+
+
+@lru_cache(maxsize=STATEMENT_CACHE_SIZE)
+def _count_stmt(mask: tuple[str, ...]) -> Select[Any]:
+    return _search_stmt(mask, select(func.count()).select_from(Visit), ordered=False)
+
+
+@lru_cache(maxsize=STATEMENT_CACHE_SIZE)
+def _capped_count_stmt(mask: tuple[str, ...]) -> Select[Any]:
+    limited = (
+        _search_stmt(mask, select(Visit.id), ordered=False)
+        .limit(bindparam("count_cap", type_=Integer))
+    )
+    return select(func.count()).select_from(limited.subquery())
+
+
+@lru_cache(maxsize=STATEMENT_CACHE_SIZE)
+def _estimate_stmt(mask: tuple[str, ...]) -> Select[Any]:
+    return _search_stmt(mask, select(Visit.id), ordered=False)
+
+
+@lru_cache(maxsize=STATEMENT_CACHE_SIZE)
+def _total_cost_stmt(mask: tuple[str, ...]) -> Select[Any]:
+    return _search_stmt(mask, select(func.coalesce(func.sum(Visit.cost), 0)), ordered=False)
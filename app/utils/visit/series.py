@@ -0,0 +1,77 @@
+import contextlib
+import datetime
+import uuid
+from collections.abc import Iterator
+from typing import NamedTuple
+from zoneinfo import ZoneInfo
+
+from app.schemas.visit_series import RecurrenceFrequencyEnum, VisitRecurrenceRule
+
+DEFAULT_VISIT_DURATION = datetime.timedelta(hours=1)
+
+
+class VisitSlot(NamedTuple):
+    """
+    Time, doctor and cabinet of a planned occurrence, checked for conflicts.
+    """
+    start_date: datetime.datetime
+    end_date: datetime.datetime
+    doctor_id: uuid.UUID
+    cabinet: str | None
+
+
+def expand_recurrence(
+        rule: VisitRecurrenceRule,
+        start: datetime.datetime,
+        timezone: ZoneInfo,
+        max_occurrences: int,
+) -> list[datetime.datetime]:
+    """
+    Start times of the occurrences. Arithmetic is done on the clinic's wall clock,
+    so a weekly 10:00 visit stays at 10:00 across UTC offset changes.
+    """
+    if start.tzinfo is None:
+        start = start.replace(tzinfo=timezone)
+    occurrences = []
+    for local in _candidates(rule, start.astimezone(timezone)):
+        if rule.until is not None and local.date() > rule.until:
+            break
+        if rule.count is not None and len(occurrences) >= rule.count:
+            break
+        if len(occurrences) >= max_occurrences:
+            raise ValueError(f"A series may have at most {max_occurrences} occurrences")
+        occurrences.append(local)
+    return occurrences
+
+
+# --- HELPERS ---
+
+def _candidates(
+        rule: VisitRecurrenceRule,
+        start: datetime.datetime,
+) -> Iterator[datetime.datetime]:
+    if rule.frequency == RecurrenceFrequencyEnum.DAILY:
+        step = 0
+        while True:
+            yield start + datetime.timedelta(days=step * rule.interval)
+            step += 1
+
+    elif rule.frequency == RecurrenceFrequencyEnum.WEEKLY:
+        weekdays = sorted(set(rule.weekdays or [start.weekday()]))
+        week_start = start - datetime.timedelta(days=start.weekday())
+        while True:
+            for weekday in weekdays:
+                candidate = week_start + datetime.timedelta(days=weekday)
+                if candidate >= start:
+                    yield candidate
+            week_start += datetime.timedelta(weeks=rule.interval)
+
+    else:
+        step = 0
+        while True:
+            month_index = start.month - 1 + step * rule.interval
+            year, month = start.year + month_index // 12, month_index % 12 + 1
+            # like RFC 5545: a month without this day has no occurrence
+            with contextlib.suppress(ValueError):
+                yield start.replace(year=year, month=month)
+            step += 1
@@ -1,7 +1,56 @@
+import asyncio
+import datetime
+import json
+import uuid
+from collections.abc import AsyncIterator, Awaitable, Callable, Sequence
+from zoneinfo import ZoneInfo
+
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import Row
 from sqlalchemy.ext.asyncio import AsyncSession
+from starlette import status
+
+from .database import (
+    dal_count_visits_by_filter,
+    dal_create_visit_series,
+    dal_delete_visit_series,
+    dal_estimate_visits_by_filter,
+    dal_find_visit_conflicts,
+    dal_get_visit_series,
+    dal_get_visit_fields_by_filter,
+    dal_get_visits_by_filter,
+    dal_get_visits_changed_since,
+    dal_lock_visit_slots,
+    dal_total_visits_cost_by_filter,
+    dal_update_visit_series,
+)
+from .series import DEFAULT_VISIT_DURATION, VisitSlot, expand_recurrence
+from app.config import get_settings
+from app.db.connection import SessionManager
+from app.db.models import Tombstone, Visit
+from app.schemas import (
+    CountModeEnum,
+    PageVisitResponse,
+    PartialPageVisitResponse,
+    VisitConflict,
+    VisitResponse,
+    VisitSearchRequest,
+    VisitSeriesCancelResponse,
+    VisitSeriesCreateRequest,
+    VisitSeriesResponse,
+    VisitUpdateRequest,
+)
+from app.services.change_feed import ChangeFeed, ChangeFilter
+from app.services.result_cache import NAMES, VISITS, client_scope, doctor_scope, result_cache
+from app.utils.common import SingleFlight
+from app.utils.sync import dal_get_tombstones_since
 
-from .database import dal_count_visits_by_filter, dal_get_visits_by_filter, dal_total_visits_cost_by_filter
-from app.schemas import VisitSearchRequest, VisitResponse, PageVisitResponse
+CHANGE_FEED_RETRY_MS = 3000
+
+_visit_pages: SingleFlight[tuple, PageVisitResponse | PartialPageVisitResponse] = SingleFlight(
+    "visit_pages"
+)
 
 
 async def svc_get_visits_by_filter(
@@ -9,17 +58,358 @@ async def svc_get_visits_by_filter(
         search: VisitSearchRequest,
         limit: int = 10,
         offset: int = 0,
-) -> PageVisitResponse:
-    visits_db = await dal_get_visits_by_filter(session, search, limit, offset)
-    visits = [VisitResponse.model_validate(visit) for visit in visits_db]
+        fields: list[str] | None = None,
+        count_mode: CountModeEnum = CountModeEnum.EXACT,
+) -> PageVisitResponse | PartialPageVisitResponse:
+    """
+    Identical requests running at the same moment (every front desk screen opening
+    today's list) share one set of queries and its page. The page is cached until a visit
+    of its doctor, client or days changes, or a client or doctor is renamed.
+    """
+    key = (
+        search.model_dump_json(exclude_none=True),
+        limit,
+        offset,
+        None if fields is None else tuple(fields),
+        count_mode,
+    )
+    return await result_cache.get_or_compute(
+        ("visit_pages", key),
+        _page_scopes(search),
+        lambda: _visit_pages.do(
+            key, lambda: _get_visits_by_filter(session, search, limit, offset, fields, count_mode)
+        ),
+    )
+
+
+async def _get_visits_by_filter(
+        session: AsyncSession,
+        search: VisitSearchRequest,
+        limit: int,
+        offset: int,
+        fields: list[str] | None,
+        count_mode: CountModeEnum,
+) -> PageVisitResponse | PartialPageVisitResponse:
+    if fields is not None:
+        visits = await dal_get_visit_fields_by_filter(session, search, fields, limit, offset)
+        page_class = PartialPageVisitResponse
+    else:
+        visits_db = await dal_get_visits_by_filter(session, search, limit, offset)
+        visits = [VisitResponse.model_validate(visit) for visit in visits_db]
+        page_class = PageVisitResponse
     total_cost = await dal_total_visits_cost_by_filter(session, search)
 
-    total = await dal_count_visits_by_filter(session, search)
+    total, count_mode, total_capped = await _count_visits(session, search, count_mode)
 
-    return PageVisitResponse(
+    return page_class(
         total=total,
         limit=limit,
         offset=offset,
         items=visits,
         total_cost=total_cost,
+        count_mode=count_mode,
+        total_capped=total_capped,
+    )
+
+
+async def svc_create_visit_series(
+        session: AsyncSession,
+        request: VisitSeriesCreateRequest,
+) -> VisitSeriesResponse:
+    """
+    Expands the rule, checks all occurrences for conflicts at once and inserts them together
+    under the locks of the doctor and the cabinet. Conflicting occurrences reject the series
+    unless skip_conflicts is set.
+    """
+    settings = get_settings()
+    template = request.template
+    try:
+        starts = expand_recurrence(
+            request.rule,
+            template.start_date,
+            ZoneInfo(settings.CLINIC_TIMEZONE),
+            settings.SERIES_MAX_OCCURRENCES,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e)) from e
+    if not starts:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="The rule has no occurrences",
+        )
+
+    duration = DEFAULT_VISIT_DURATION
+    if template.end_date is not None:
+        duration = template.end_date - template.start_date
+    slots = [
+        VisitSlot(start, start + duration, template.doctor_id, template.cabinet)
+        for start in starts
+    ]
+    await dal_lock_visit_slots(session, slots)
+    conflicts = _conflicts(slots, await dal_find_visit_conflicts(session, slots))
+    conflicted = {conflict.series_index for conflict in conflicts}
+    if conflicts and (not request.skip_conflicts or len(conflicted) == len(slots)):
+        _raise_conflicts(conflicts)
+
+    series_id = uuid.uuid4()
+    values = template.model_dump()
+    rows = [
+        {
+            **values,
+            "start_date": slot.start_date,
+            "end_date": slot.end_date,
+            "series_id": series_id,
+            "series_index": index,
+        }
+        for index, slot in enumerate(slots)
+        if index not in conflicted
+    ]
+    visits = await dal_create_visit_series(session, series_id, rows)
+
+    skipped = list({conflict.series_index: conflict for conflict in reversed(conflicts)}.values())
+    return VisitSeriesResponse(
+        series_id=series_id,
+        items=[VisitResponse.model_validate(visit) for visit in visits],
+        skipped=sorted(skipped, key=lambda conflict: conflict.series_index),
+    )
+
+
+async def svc_update_visit_series(
+        session: AsyncSession,
+        series_id: uuid.UUID,
+        from_index: int,
+        update_request: VisitUpdateRequest,
+) -> Sequence[Visit]:
+    """
+    Edits this and following occurrences. A new start or end date is given for the
+    occurrence at from_index, the following ones move by the same wall-clock offset.
+    """
+    occurrences = await dal_get_visit_series(session, series_id, from_index)
+    if not occurrences:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+
+    values = update_request.model_dump(exclude_none=True)
+    new_start = values.pop("start_date", None)
+    new_end = values.pop("end_date", None)
+    moved = None
+    if new_start is not None or new_end is not None:
+        timezone = ZoneInfo(get_settings().CLINIC_TIMEZONE)
+        anchor = occurrences[0]
+        start_delta = _wall_clock_delta(anchor.start_date, new_start, timezone)
+        end_delta = _wall_clock_delta(anchor.end_date, new_end, timezone)
+        if new_end is None:
+            end_delta = start_delta
+        moved = [
+            (
+                visit.id,
+                visit.start_date.astimezone(timezone) + start_delta,
+                visit.end_date.astimezone(timezone) + end_delta,
+            )
+            for visit in occurrences
+        ]
+
+    if moved or {"doctor_id", "cabinet"} & values.keys():
+        slots = [
+            VisitSlot(
+                moved[position][1] if moved else visit.start_date,
+                moved[position][2] if moved else visit.end_date,
+                values.get("doctor_id", visit.doctor_id),
+                values.get("cabinet", visit.cabinet),
+            )
+            for position, visit in enumerate(occurrences)
+        ]
+        await dal_lock_visit_slots(session, slots)
+        conflicts = await dal_find_visit_conflicts(session, slots, exclude_series_id=series_id)
+        if conflicts:
+            _raise_conflicts(_conflicts(slots, conflicts, occurrences))
+
+    if not values and not moved:
+        return occurrences
+    return await dal_update_visit_series(session, occurrences, values, moved)
+
+
+async def svc_cancel_visit_series(
+        session: AsyncSession,
+        series_id: uuid.UUID,
+        from_index: int,
+) -> VisitSeriesCancelResponse:
+    deleted, kept_paid = await dal_delete_visit_series(session, series_id, from_index)
+    if not deleted and not kept_paid:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    return VisitSeriesCancelResponse(deleted=deleted, kept_paid=kept_paid)
+
+
+async def svc_stream_visit_changes(
+        feed: ChangeFeed,
+        change_filter: ChangeFilter,
+        since: datetime.datetime | None,
+        is_disconnected: Callable[[], Awaitable[bool]],
+) -> AsyncIterator[str]:
+    """
+    Server-sent events with visit changes. Event ids are dt_updated values, so a reconnecting
+    client passes the last one as Last-Event-ID and first receives what it missed: changed
+    visits matching the filter and deletions from the tombstones. Tombstones keep only the
+    id, so every deleted visit is replayed whatever the filter, unknown ids are to be
+    ignored. Deletions older than SYNC_TOMBSTONE_RETENTION_DAYS are lost, a client away
+    that long refetches.
+    """
+    settings = get_settings()
+    subscription = feed.subscribe(change_filter)
+    try:
+        yield f"retry: {CHANGE_FEED_RETRY_MS}\n\n"
+        if since is not None:
+            async with SessionManager().get_session_maker()() as session:
+                missed = await dal_get_visits_changed_since(
+                    session,
+                    since,
+                    doctor_id=change_filter.doctor_id,
+                    cabinet=change_filter.cabinet,
+                    day=change_filter.day,
+                    timezone=settings.CLINIC_TIMEZONE,
+                    limit=settings.CHANGE_FEED_RESUME_LIMIT + 1,
+                )
+                deleted = await dal_get_tombstones_since(
+                    session, "visit", since, settings.CHANGE_FEED_RESUME_LIMIT + 1
+                )
+            if len(missed) + len(deleted) > settings.CHANGE_FEED_RESUME_LIMIT:
+                yield _sse_event("reset", {"reason": "too many changes"})
+            else:
+                events = [
+                    (visit.dt_updated, _visit_change_payload(visit)) for visit in missed
+                ] + [
+                    (tombstone.dt_created, _visit_delete_payload(tombstone))
+                    for tombstone in deleted
+                ]
+                for event_id, payload in sorted(events, key=lambda event: event[0]):
+                    yield _sse_event("change", payload, event_id)
+
+        while not await is_disconnected():
+            try:
+                event = await asyncio.wait_for(
+                    subscription.queue.get(), settings.CHANGE_FEED_KEEPALIVE_SECONDS
+                )
+            except TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            if event is None:
+                break
+            yield _sse_event("change", event, event.get("dt_updated"))
+    finally:
+        feed.unsubscribe(subscription)
+
+
+def _page_scopes(search: VisitSearchRequest) -> list[str]:
+    """
+    The narrowest scope holding every visit the filter can match, names are shown in rows.
+    """
+    if search.doctor_id is not None:
+        return [NAMES, doctor_scope(search.doctor_id)]
+    if search.client_id is not None:
+        return [NAMES, client_scope(search.client_id)]
+    if search.start_date is not None and search.end_date is not None:
+        days = result_cache.date_range_scopes(search.start_date, search.end_date)
+        if days is not None:
+            return [NAMES, *days]
+    return [NAMES, VISITS]
+
+
+def _conflicts(
+        slots: list[VisitSlot],
+        rows: list[Row],
+        occurrences: Sequence[Visit] | None = None,
+) -> list[VisitConflict]:
+    """
+    Conflict rows reference slots by position, the series index is the position
+    for a new series and the occurrence's index when editing.
+    """
+    return [
+        VisitConflict(
+            series_index=occurrences[row.position].series_index if occurrences else row.position,
+            start_date=slots[row.position].start_date,
+            end_date=slots[row.position].end_date,
+            visit_id=row.id,
+            reason=row.reason,
+        )
+        for row in rows
+    ]
+
+
+def _raise_conflicts(conflicts: list[VisitConflict]) -> None:
+    raise HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail={
+            "message": "Occurrences overlap existing visits of the doctor or in the cabinet",
+            "conflicts": jsonable_encoder(conflicts),
+        },
+    )
+
+
+def _wall_clock_delta(
+        current: datetime.datetime,
+        new: datetime.datetime | None,
+        timezone: ZoneInfo,
+) -> datetime.timedelta:
+    if new is None:
+        return datetime.timedelta()
+    if new.tzinfo is None:
+        new = new.replace(tzinfo=timezone)
+    return (
+        new.astimezone(timezone).replace(tzinfo=None)
+        - current.astimezone(timezone).replace(tzinfo=None)
     )
+
+
+async def _count_visits(
+        session: AsyncSession,
+        search: VisitSearchRequest,
+        count_mode: CountModeEnum,
+) -> tuple[int, CountModeEnum, bool]:
+    """
+    Returns (total, mode actually used, whether total is a lower bound).
+    Small estimates are replaced by a capped count, which is cheap there and exact.
+    """
+    if count_mode == CountModeEnum.EXACT:
+        return await dal_count_visits_by_filter(session, search), CountModeEnum.EXACT, False
+
+    cap = get_settings().VISIT_COUNT_CAP
+    if count_mode == CountModeEnum.ESTIMATE:
+        estimate = await dal_estimate_visits_by_filter(session, search)
+        if estimate >= cap:
+            return estimate, CountModeEnum.ESTIMATE, False
+
+    total = await dal_count_visits_by_filter(session, search, cap=cap)
+    if total > cap:
+        return cap, CountModeEnum.CAPPED, True
+    return total, CountModeEnum.EXACT, False
+
+
+def _visit_change_payload(visit: Visit) -> dict:
+    return {
+        "table": "visit",
+        "op": "UPDATE",
+        "id": str(visit.id),
+        "client_id": str(visit.client_id),
+        "doctor_id": str(visit.doctor_id),
+        "cabinet": visit.cabinet,
+        "start_date": visit.start_date.isoformat(),
+        "dt_updated": visit.dt_updated.isoformat(),
+    }
+
+
+def _visit_delete_payload(tombstone: Tombstone) -> dict:
+    return {
+        "table": "visit",
+        "op": "DELETE",
+        "id": str(tombstone.record_id),
+        "dt_updated": tombstone.dt_created.isoformat(),
+    }
+
+
+def _sse_event(event: str, data: dict, event_id: datetime.datetime | str | None = None) -> str:
+    lines = [f"event: {event}"]
+    if isinstance(event_id, datetime.datetime):
+        event_id = event_id.isoformat()
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"data: {json.dumps(data, ensure_ascii=False)}")
+    return "\n".join(lines) + "\n\n"
@@ -0,0 +1,86 @@
+"""
+Thundering herd: many identical list requests arrive at the same moment, the pool has
+fewer connections than requests. Compares running every request's queries with sharing
+one run through SingleFlight, as svc_get_visits_by_filter and the substring finders do.
+
+Does not need a database, a query holds a pool slot for --query-ms.
+
+Usage:
+    python benchmarks/single_flight.py --requests 60 --pool-size 10 --query-ms 40
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.utils.common import SingleFlight  # noqa: E402
+
+# a visit page runs the page, count and total cost queries
+QUERIES_PER_REQUEST = 3
+
+
+class Database:
+    def __init__(self, pool_size: int, query_seconds: float) -> None:
+        self.pool = asyncio.Semaphore(pool_size)
+        self.query_seconds = query_seconds
+        self.queries = 0
+
+    async def visit_page(self) -> list[int]:
+        for _ in range(QUERIES_PER_REQUEST):
+            async with self.pool:
+                self.queries += 1
+                await asyncio.sleep(self.query_seconds)
+        return list(range(10))
+
+
+async def herd(
+        requests: int,
+        waves: int,
+        pool_size: int,
+        query_seconds: float,
+        coalesce: bool,
+) -> tuple[list[float], int]:
+    database = Database(pool_size, query_seconds)
+    flight: SingleFlight[str, list[int]] = SingleFlight("benchmark")
+
+    async def request() -> float:
+        started = time.perf_counter()
+        if coalesce:
+            await flight.do("start_date=today", database.visit_page)
+        else:
+            await database.visit_page()
+        return (time.perf_counter() - started) * 1000
+
+    latencies: list[float] = []
+    for _ in range(waves):
+        latencies += await asyncio.gather(*(request() for _ in range(requests)))
+    return latencies, database.queries
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=60, help="identical requests per wave")
+    parser.add_argument("--waves", type=int, default=5)
+    parser.add_argument("--pool-size", type=int, default=10)
+    parser.add_argument("--query-ms", type=float, default=40)
+    args = parser.parse_args()
+
+    print(f"{'mode':<12} {'queries':>8} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for name, coalesce in (("per request", False), ("coalesced", True)):
+        latencies, queries = asyncio.run(
+            herd(args.requests, args.waves, args.pool_size, args.query_ms / 1000, coalesce)
+        )
+        latencies.sort()
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+        print(
+            f"{name:<12} {queries:>8} {statistics.median(latencies):>8.1f} "
+            f"{p99:>8.1f} {latencies[-1]:>8.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
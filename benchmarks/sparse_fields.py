@@ -0,0 +1,52 @@
+"""
+Measures payload size and latency of list endpoints with and without ``fields=``.
+
+Usage (API must be running, e.g. ``make run``):
+    python benchmarks/sparse_fields.py --base-url http://127.0.0.1:8080/api/v1 --repeat 50
+"""
+import argparse
+import statistics
+import time
+import urllib.parse
+import urllib.request
+
+# typical widget queries: calendar cells, doctor and client dropdowns
+SCENARIOS = (
+    ("visits calendar", "/visits/", {"limit": 100}, "start_date,end_date,doctor_id,cabinet,status"),
+    ("doctor dropdown", "/doctors/", {"search_substr": ""}, "full_name"),
+    ("client typeahead", "/clients/", {"search_substr": "а"}, "full_name,phone_number"),
+)
+
+
+def measure(url: str, repeat: int) -> tuple[int, float]:
+    timings = []
+    size = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        with urllib.request.urlopen(url) as response:
+            size = len(response.read())
+        timings.append((time.perf_counter() - started) * 1000)
+    return size, statistics.median(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--base-url", default="http://127.0.0.1:8080/api/v1")
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"{'scenario':<18} {'full B':>9} {'sparse B':>9} {'saved':>7} {'full ms':>8} {'sparse ms':>9}")
+    for name, path, params, fields in SCENARIOS:
+        full_url = f"{args.base_url}{path}?{urllib.parse.urlencode(params)}"
+        sparse_url = f"{full_url}&{urllib.parse.urlencode({'fields': fields})}"
+        full_size, full_ms = measure(full_url, args.repeat)
+        sparse_size, sparse_ms = measure(sparse_url, args.repeat)
+        saved = 1 - sparse_size / full_size if full_size else 0
+        print(
+            f"{name:<18} {full_size:>9} {sparse_size:>9} {saved:>6.0%} "
+            f"{full_ms:>8.2f} {sparse_ms:>9.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Measures Python CPU spent on building and compiling the visit list statements per request:
+the previous per-request builder against the cached per-filter-mask statements.
+
+Does not need a database, the statements are compiled for the asyncpg dialect.
+
+Usage:
+    python benchmarks/statement_cache.py --requests 20000
+"""
+import argparse
+import datetime
+import random
+import sys
+import time
+import uuid
+from pathlib import Path
+from typing import Any
+
+from sqlalchemy import Date, Time, asc, cast, desc, func, select
+from sqlalchemy.dialects.postgresql.asyncpg import dialect as asyncpg_dialect
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.db.enums import VisitStatusEnum  # noqa: E402
+from app.db.models import Visit  # noqa: E402
+from app.db.models.visit import SEARCH_CONFIG  # noqa: E402
+from app.schemas import VisitSearchRequest  # noqa: E402
+from app.utils.visit.database import (  # noqa: E402
+    _count_stmt,
+    _page_stmt,
+    _search_mask,
+    _search_params,
+    _total_cost_stmt,
+)
+
+DIALECT = asyncpg_dialect()
+
+
+def random_search(rnd: random.Random) -> VisitSearchRequest:
+    values = {
+        "client_id": uuid.uuid4(),
+        "doctor_id": uuid.uuid4(),
+        "start_date": datetime.datetime(2024, 1, 1) + datetime.timedelta(days=rnd.randrange(365)),
+        "end_date": datetime.datetime(2025, 1, 1),
+        "cabinet": str(rnd.randrange(1, 30)),
+        "procedure": rnd.choice(("Осмотр", "УЗИ", "Анализ крови")),
+        "status": rnd.choice(list(VisitStatusEnum)),
+        "q": rnd.choice(("узи", "осмотр терапевта", "кабинет 12")),
+    }
+    # list screens usually set one to three filters
+    chosen = rnd.sample(sorted(values), rnd.randint(0, 3))
+    return VisitSearchRequest(**{name: values[name] for name in chosen})
+
+
+def previous_statements(search: VisitSearchRequest) -> list[Any]:
+    """
+    The statements svc_get_visits_by_filter used to build on every request.
+    """
+    stmt = select(Visit)
+    if search.client_id:
+        stmt = stmt.where(Visit.client_id == search.client_id)
+    if search.doctor_id:
+        stmt = stmt.where(Visit.doctor_id == search.doctor_id)
+    if search.start_date:
+        stmt = stmt.where(Visit.start_date >= search.start_date)
+    if search.end_date:
+        stmt = stmt.where(Visit.end_date <= search.end_date)
+    if search.cabinet:
+        stmt = stmt.where(Visit.cabinet == search.cabinet)
+    if search.procedure:
+        stmt = stmt.where(Visit.procedure == search.procedure)
+    if search.status:
+        stmt = stmt.where(Visit.status == search.status)
+    if search.q:
+        query = func.websearch_to_tsquery(SEARCH_CONFIG, search.q)
+        stmt = stmt.where(Visit.search_vector.op("@@")(query))
+        stmt = stmt.order_by(desc(func.ts_rank(Visit.search_vector, query)))
+    stmt = stmt.order_by(desc(cast(Visit.start_date, Date)), asc(cast(Visit.start_date, Time)))
+
+    filtered = stmt.subquery()
+    return [
+        stmt.limit(10).offset(0),
+        select(func.count()).select_from(filtered),
+        select(func.coalesce(func.sum(filtered.c.cost), 0)),
+    ]
+
+
+def cached_statements(search: VisitSearchRequest) -> list[Any]:
+    mask = _search_mask(search)
+    _search_params(search)
+    return [_page_stmt(mask), _count_stmt(mask), _total_cost_stmt(mask)]
+
+
+def run(
+        build,
+        searches: list[VisitSearchRequest],
+        compiled_cache: dict[Any, Any] | None,
+) -> float:
+    """
+    Mimics what the engine does before sending a statement: cache key, then
+    a compiled cache lookup (or a compilation when there is no cache).
+    """
+    started = time.process_time()
+    for search in searches:
+        for stmt in build(search):
+            if compiled_cache is None:
+                stmt.compile(dialect=DIALECT)
+                continue
+            key = stmt._generate_cache_key()
+            if key not in compiled_cache:
+                compiled_cache[key] = stmt.compile(dialect=DIALECT)
+    return (time.process_time() - started) / len(searches) * 1_000_000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rnd = random.Random(args.seed)
+    searches = [random_search(rnd) for _ in range(args.requests)]
+
+    builders = (("previous", previous_statements), ("cached", cached_statements))
+    # the first compilation of every variant is not what we measure
+    compiled_caches: dict[str, dict[Any, Any]] = {name: {} for name, _ in builders}
+    for name, build in builders:
+        run(build, searches[:500], compiled_caches[name])
+
+    print(f"{'builder':<10} {'compiled cache':<15} {'us per request':>15}")
+    for cache_name, use_cache in (("on", True), ("off", False)):
+        for name, build in builders:
+            per_request = run(build, searches, compiled_caches[name] if use_cache else None)
+            print(f"{name:<10} {cache_name:<15} {per_request:>15.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,4 @@
+#!/bin/bash
+# Allows streaming replication connections for the local read replica (docker compose --profile replica).
+set -e
+echo "host replication ${POSTGRES_USER} all scram-sha-256" >> "$PGDATA/pg_hba.conf"
@@ -0,0 +1,52 @@
+import pytest
+from app.utils.common import phone_digits, phone_search_digits, phone_search_prefixes
+
+
+@pytest.mark.parametrize(
+    ("phone_number", "expected"),
+    [
+        ("+7 (999) 123-45-67", "79991234567"),
+        ("8 999 123 45 67", "79991234567"),
+        ("89991234567", "79991234567"),
+        ("999 123-45-67", "79991234567"),
+        # only complete Russian numbers get the 7 prefix
+        ("8 800", "8800"),
+        ("999-12", "99912"),
+        ("+44 20 7946 0958", "442079460958"),
+        ("+1 (212) 555-0100", "12125550100"),
+    ],
+)
+def test_phone_digits(phone_number, expected):
+    assert phone_digits(phone_number) == expected
+
+
+@pytest.mark.parametrize("phone_number", ["", "   ", "n/a", "+-()"])
+def test_phone_digits_without_digits(phone_number):
+    assert phone_digits(phone_number) is None
+
+
+@pytest.mark.parametrize(
+    ("digits", "expected"),
+    [
+        ("8999", {"8999", "7999"}),
+        ("999", {"999", "7999"}),
+        ("7999", {"7999"}),
+        ("4420", {"4420"}),
+    ],
+)
+def test_phone_search_prefixes(digits, expected):
+    assert phone_search_prefixes(digits) == expected
+
+
+@pytest.mark.parametrize(
+    ("search_substr", "expected"),
+    [
+        ("+7 (999) 12", "799912"),
+        ("8-999", "8999"),
+        ("Ivanov", None),
+        ("999a", None),
+        ("()", None),
+    ],
+)
+def test_phone_search_digits(search_substr, expected):
+    assert phone_search_digits(search_substr) == expected
@@ -0,0 +1,138 @@
+import asyncio
+
+import pytest
+from app.utils.common import SingleFlight, skip_coalescing
+
+
+class Backend:
+    """
+    A function for SingleFlight.do which blocks until released and counts its runs.
+    """
+
+    def __init__(self, result="value") -> None:
+        self.result = result
+        self.runs = 0
+        self.started = asyncio.Event()
+        self.release = asyncio.Event()
+
+    async def __call__(self):
+        self.runs += 1
+        self.started.set()
+        await self.release.wait()
+        if isinstance(self.result, Exception):
+            raise self.result
+        return self.result
+
+
+async def settle() -> None:
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_concurrent_calls_share_one_run():
+    async def scenario():
+        flight, backend = SingleFlight("test"), Backend()
+        tasks = [asyncio.create_task(flight.do("key", backend)) for _ in range(3)]
+        await settle()
+        backend.release.set()
+        assert await asyncio.gather(*tasks) == ["value"] * 3
+        assert (backend.runs, flight.calls, flight.coalesced) == (1, 1, 2)
+        assert flight.in_flight == 0
+
+    asyncio.run(scenario())
+
+
+def test_different_keys_run_separately():
+    async def scenario():
+        flight, backend = SingleFlight("test"), Backend()
+        backend.release.set()
+        await asyncio.gather(flight.do("a", backend), flight.do("b", backend))
+        assert backend.runs == 2
+
+    asyncio.run(scenario())
+
+
+def test_nothing_is_kept_after_the_call():
+    async def scenario():
+        flight, backend = SingleFlight("test"), Backend()
+        backend.release.set()
+        await flight.do("key", backend)
+        await flight.do("key", backend)
+        assert backend.runs == 2
+
+    asyncio.run(scenario())
+
+
+def test_waiters_get_the_exception():
+    async def scenario():
+        flight, backend = SingleFlight("test"), Backend(LookupError("gone"))
+        tasks = [asyncio.create_task(flight.do("key", backend)) for _ in range(2)]
+        await settle()
+        backend.release.set()
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        assert all(isinstance(result, LookupError) for result in results)
+        assert backend.runs == 1
+
+    asyncio.run(scenario())
+
+
+def test_waiter_reruns_when_the_leader_is_cancelled():
+    async def scenario():
+        flight, backend = SingleFlight("test"), Backend()
+        leader = asyncio.create_task(flight.do("key", backend))
+        await backend.started.wait()
+        waiter = asyncio.create_task(flight.do("key", backend))
+        await settle()
+
+        backend.started.clear()
+        leader.cancel()
+        await backend.started.wait()
+        backend.release.set()
+
+        assert await waiter == "value"
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        assert (backend.runs, flight.calls, flight.coalesced) == (2, 2, 0)
+        assert flight.in_flight == 0
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_waiter_does_not_cancel_the_leader():
+    async def scenario():
+        flight, backend = SingleFlight("test"), Backend()
+        leader = asyncio.create_task(flight.do("key", backend))
+        await backend.started.wait()
+        waiter = asyncio.create_task(flight.do("key", backend))
+        await settle()
+
+        waiter.cancel()
+        await settle()
+        backend.release.set()
+
+        assert await leader == "value"
+        assert waiter.cancelled()
+        assert backend.runs == 1
+
+    asyncio.run(scenario())
+
+
+def test_skip_coalescing_runs_alone():
+    async def fresh_read(flight, backend):
+        skip_coalescing.set(True)
+        return await flight.do("key", backend)
+
+    async def scenario():
+        flight, backend = SingleFlight("test"), Backend()
+        leader = asyncio.create_task(flight.do("key", backend))
+        await backend.started.wait()
+        fresh = asyncio.create_task(fresh_read(flight, backend))
+        await settle()
+        assert backend.runs == 2
+
+        backend.release.set()
+        assert await asyncio.gather(leader, fresh) == ["value", "value"]
+        assert (flight.calls, flight.coalesced) == (2, 0)
+        assert flight.in_flight == 0
+
+    asyncio.run(scenario())
@@ -0,0 +1,88 @@
+import base64
+import datetime
+import json
+import uuid
+from types import SimpleNamespace
+
+import pytest
+from app.schemas import SyncEntityEnum
+from app.utils.sync.service import START, TOMBSTONES, _advance, _decode_token, _encode_token
+from fastapi import HTTPException
+
+HORIZON = datetime.datetime(2026, 10, 19, 12, tzinfo=datetime.UTC)
+
+
+def encode(payload) -> str:
+    raw = json.dumps(payload).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def valid_payload() -> dict:
+    return {
+        "v": 1,
+        "e": ["clients"],
+        "c": {
+            "clients": [HORIZON.isoformat(), str(uuid.uuid4())],
+            TOMBSTONES: [HORIZON.isoformat(), str(START[1])],
+        },
+    }
+
+
+def test_token_round_trip():
+    entities = [SyncEntityEnum.CLIENTS, SyncEntityEnum.VISITS]
+    cursors = {
+        "clients": (HORIZON, uuid.uuid4()),
+        "visits": START,
+        TOMBSTONES: (HORIZON, START[1]),
+    }
+    assert _decode_token(_encode_token(entities, cursors)) == (entities, cursors)
+
+
+def with_changes(**changes) -> str:
+    payload = valid_payload()
+    payload.update(changes)
+    return encode(payload)
+
+
+@pytest.mark.parametrize(
+    "token",
+    [
+        "",
+        "not base64!",
+        base64.urlsafe_b64encode(b"\xff\xfe").decode(),
+        encode([1, 2]),
+        encode("token"),
+        with_changes(v=2),
+        with_changes(e=["patients"]),
+        with_changes(e="clients"),
+        with_changes(c=[]),
+        with_changes(c={"clients": [HORIZON.isoformat(), str(uuid.uuid4())]}),
+        with_changes(c={"clients": [HORIZON.isoformat()], TOMBSTONES: [HORIZON.isoformat()]}),
+        with_changes(c={"clients": [HORIZON.isoformat(), "x"], TOMBSTONES: [1, "y"]}),
+        with_changes(
+            c={
+                "clients": ["2026-10-19T12:00:00", str(uuid.uuid4())],
+                TOMBSTONES: [HORIZON.isoformat(), str(START[1])],
+            }
+        ),
+    ],
+)
+def test_malformed_token(token):
+    with pytest.raises(HTTPException) as error:
+        _decode_token(token)
+    assert error.value.status_code == 400
+
+
+def test_advance_stops_at_the_horizon_when_caught_up():
+    rows = [SimpleNamespace(id=uuid.uuid4(), dt_updated=HORIZON)]
+    assert _advance(rows, "dt_updated", 2, HORIZON) == (HORIZON, START[1])
+    assert _advance([], "dt_updated", 2, HORIZON) == (HORIZON, START[1])
+
+
+def test_advance_continues_after_the_last_row_of_a_full_page():
+    earlier = HORIZON - datetime.timedelta(minutes=5)
+    rows = [
+        SimpleNamespace(id=uuid.uuid4(), dt_created=earlier),
+        SimpleNamespace(id=uuid.uuid4(), dt_created=earlier),
+    ]
+    assert _advance(rows, "dt_created", 2, HORIZON) == (earlier, rows[-1].id)
@@ -0,0 +1,85 @@
+import datetime
+import uuid
+from zoneinfo import ZoneInfo
+
+import pytest
+from app.schemas.visit import MAX_VISIT_DURATION, VisitCreateRequest
+from app.schemas.visit_series import RecurrenceFrequencyEnum, VisitRecurrenceRule
+from app.utils.visit.series import expand_recurrence
+from pydantic import ValidationError
+
+MOSCOW = ZoneInfo("Europe/Moscow")
+BERLIN = ZoneInfo("Europe/Berlin")
+
+
+def monthly(**kwargs) -> VisitRecurrenceRule:
+    return VisitRecurrenceRule(frequency=RecurrenceFrequencyEnum.MONTHLY, **kwargs)
+
+
+def test_monthly_skips_months_without_the_day():
+    start = datetime.datetime(2026, 1, 31, 10, tzinfo=MOSCOW)
+    occurrences = expand_recurrence(monthly(count=4), start, MOSCOW, max_occurrences=100)
+    assert [local.date() for local in occurrences] == [
+        datetime.date(2026, 1, 31),
+        datetime.date(2026, 3, 31),
+        datetime.date(2026, 5, 31),
+        datetime.date(2026, 7, 31),
+    ]
+
+
+def test_monthly_leap_day_occurs_in_leap_years_only():
+    start = datetime.datetime(2028, 2, 29, 9, tzinfo=MOSCOW)
+    rule = monthly(interval=12, until=datetime.date(2036, 12, 31))
+    occurrences = expand_recurrence(rule, start, MOSCOW, max_occurrences=100)
+    assert [local.year for local in occurrences] == [2028, 2032, 2036]
+
+
+def test_monthly_crosses_the_year():
+    start = datetime.datetime(2026, 11, 15, 12, tzinfo=MOSCOW)
+    rule = monthly(interval=2, count=3)
+    occurrences = expand_recurrence(rule, start, MOSCOW, max_occurrences=100)
+    assert [local.date() for local in occurrences] == [
+        datetime.date(2026, 11, 15),
+        datetime.date(2027, 1, 15),
+        datetime.date(2027, 3, 15),
+    ]
+
+
+def test_weekly_keeps_the_wall_clock_across_offset_changes():
+    # Berlin leaves summer time on 2026-10-25
+    start = datetime.datetime(2026, 10, 20, 10, tzinfo=BERLIN)
+    rule = VisitRecurrenceRule(count=2)
+    occurrences = expand_recurrence(rule, start, BERLIN, max_occurrences=100)
+    assert [local.hour for local in occurrences] == [10, 10]
+    elapsed = occurrences[1].astimezone(datetime.UTC) - occurrences[0].astimezone(datetime.UTC)
+    assert elapsed == datetime.timedelta(days=7, hours=1)
+
+
+def test_naive_start_is_clinic_time():
+    start = datetime.datetime(2026, 10, 19, 10)
+    occurrences = expand_recurrence(VisitRecurrenceRule(count=1), start, MOSCOW, 100)
+    assert occurrences == [datetime.datetime(2026, 10, 19, 10, tzinfo=MOSCOW)]
+
+
+def test_until_is_inclusive():
+    start = datetime.datetime(2026, 10, 19, 10, tzinfo=MOSCOW)
+    rule = VisitRecurrenceRule(
+        frequency=RecurrenceFrequencyEnum.DAILY, until=datetime.date(2026, 10, 21)
+    )
+    occurrences = expand_recurrence(rule, start, MOSCOW, max_occurrences=100)
+    assert len(occurrences) == 3
+
+
+def test_too_many_occurrences():
+    start = datetime.datetime(2026, 10, 19, 10, tzinfo=MOSCOW)
+    rule = VisitRecurrenceRule(frequency=RecurrenceFrequencyEnum.DAILY, count=10)
+    with pytest.raises(ValueError, match="at most 5 occurrences"):
+        expand_recurrence(rule, start, MOSCOW, max_occurrences=5)
+
+
+def test_template_longer_than_max_duration_is_rejected():
+    start = datetime.datetime(2026, 10, 19, 10, tzinfo=MOSCOW)
+    fields = {"client_id": uuid.uuid4(), "doctor_id": uuid.uuid4(), "start_date": start}
+    VisitCreateRequest(**fields, end_date=start + MAX_VISIT_DURATION)
+    with pytest.raises(ValidationError, match="may last at most"):
+        VisitCreateRequest(**fields, end_date=start + MAX_VISIT_DURATION + datetime.timedelta(1))
@@ -11,14 +11,19 @@ export type VisitQueryParams = {
     cabinet?: string
     procedure?: string
     status?: VisitStatusEnum
+    count_mode?: CountMode
 }
 
+export type CountMode = 'exact' | 'capped' | 'estimate'
+
 export type VisitPageResponse = {
     total: number
     limit: number
     offset: number
     items: VisitResponse[]
     total_cost?: number
+    count_mode?: CountMode
+    total_capped?: boolean
 }
 
 export async function fetchVisits(params: VisitQueryParams): Promise<VisitPageResponse> {
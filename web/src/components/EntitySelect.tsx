@@ -1,7 +1,6 @@
 import {Select} from 'antd'
 import {useQuery} from '@tanstack/react-query'
-import {api} from '../lib/api'
-import type {ClientResponse, DoctorResponse} from '../api'
+import {directorySync} from '../lib/sync'
 
 type Props = {
     entity: 'clients' | 'doctors'
@@ -14,13 +13,11 @@ type Props = {
 
 type Option = { value: string; label: string }
 
+/** Списки берутся из локальной копии, с сервера приходят только изменения */
 async function fetchOptions(entity: 'clients' | 'doctors'): Promise<Option[]> {
-    if (entity === 'clients') {
-        const res = await api.get<ClientResponse[]>('/clients/', {params: {search_substr: ''}})
-        return res.data.map(c => ({value: c.id, label: c.full_name}))
-    }
-    const res = await api.get<DoctorResponse[]>('/doctors/', {params: {search_substr: ''}})
-    return res.data.map(d => ({value: d.id, label: d.full_name}))
+    const cache = await directorySync.sync()
+    return Array.from(cache[entity].values(), e => ({value: e.id, label: e.full_name}))
+        .sort((a, b) => a.label.localeCompare(b.label))
 }
 
 export default function EntitySelect({entity, value, onChange, allowClear, placeholder, fullWidth = false}: Props) {
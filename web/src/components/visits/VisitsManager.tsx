@@ -21,6 +21,7 @@ import dayjs, {Dayjs} from 'dayjs'
 import {api} from '../../lib/api'
 import type {VisitCreateRequest, VisitResponse, VisitStatusEnum, VisitUpdateRequest} from '../../api'
 import {fetchVisits, type VisitPageResponse, type VisitQueryParams} from '../../api/visits'
+import {useVisitChangeFeed} from '../../lib/changeFeed'
 import {getErrorMessage} from '../../lib/errors'
 import EntitySelect from '../EntitySelect'
 import {Info, Pencil, Trash2} from 'lucide-react'
@@ -42,14 +43,17 @@ import { formatPhoneNumber } from '../../lib/phone'
 type DoctorMini = { id: string; full_name: string; speciality: string }
 type ClientMini = { id: string; full_name: string; phone_number?: string | null; date_of_birth?: string | null }
 
-async function fetchDoctorMini(id: string): Promise<DoctorMini> {
-    const r = await api.get<DoctorMini>(`/doctors/${id}`)
-    return r.data
-}
-
-async function fetchClientMini(id: string): Promise<ClientMini> {
-    const r = await api.get<ClientMini>(`/clients/${id}`)
-    return r.data
+// the /batch endpoints accept up to 100 ids per request
+const BATCH_SIZE = 100
+
+async function fetchBatch<T extends { id: string }>(path: string, ids: string[]): Promise<Record<string, T>> {
+    const chunks: string[][] = []
+    for (let i = 0; i < ids.length; i += BATCH_SIZE) chunks.push(ids.slice(i, i + BATCH_SIZE))
+    const pages = await Promise.all(chunks.map(async (chunk) => {
+        const r = await api.get<{ items: T[]; missing: string[] }>(`${path}/batch`, {params: {ids: chunk.join(',')}})
+        return r.data.items
+    }))
+    return Object.fromEntries(pages.flat().map(item => [item.id, item]))
 }
 
 const {RangePicker} = DatePicker
@@ -351,6 +355,7 @@ export default function VisitsManager({context, show, defaultLimit = 30, onTotal
         } else {
             p.limit = pageSize
             p.offset = (page - 1) * pageSize
+            p.count_mode = 'capped'
         }
         if (clientId) p.client_id = clientId
         if (doctorId) p.doctor_id = doctorId
@@ -367,9 +372,12 @@ export default function VisitsManager({context, show, defaultLimit = 30, onTotal
         return p
     }, [isDoctorDayMode, clientId, doctorId, status, cabinet, procedure, day, range, pageSize, page])
 
+    useVisitChangeFeed()
+
     const {data, isLoading} = useQuery<VisitPageResponse>({
         queryKey: ['visits', params],
         queryFn: () => fetchVisits(params),
+        refetchOnWindowFocus: false,
     })
 
     const tableData: RowData[] = useMemo(() => {
@@ -421,12 +429,12 @@ export default function VisitsManager({context, show, defaultLimit = 30, onTotal
 
         ;(async () => {
             try {
-                const [cPairs, dPairs] = await Promise.all([
-                    Promise.all(uniqueClients.map(async (id) => [id, await fetchClientMini(id)] as const)),
-                    Promise.all(uniqueDoctors.map(async (id) => [id, await fetchDoctorMini(id)] as const)),
+                const [clients, doctors] = await Promise.all([
+                    fetchBatch<ClientMini>('/clients', uniqueClients),
+                    fetchBatch<DoctorMini>('/doctors', uniqueDoctors),
                 ])
-                setClientsMap(Object.fromEntries(cPairs))
-                setDoctorsMap(Object.fromEntries(dPairs))
+                setClientsMap(clients)
+                setDoctorsMap(doctors)
             } catch {
                 // тихо игнорируем — печать всё равно пройдёт с базовыми полями
             }
@@ -987,6 +995,7 @@ export default function VisitsManager({context, show, defaultLimit = 30, onTotal
                             current: page,
                             pageSize: pageSize,
                             total: data?.total ?? 0,
+                            showTotal: (total) => (data?.total_capped ? `${total}+` : `${total}`),
                             showSizeChanger: true,
                             pageSizeOptions: [1, 10, 20, 30, 50, 100],
                             locale: {
@@ -1,5 +1,65 @@
-import axios from 'axios'
+import axios, { type AxiosError, type InternalAxiosRequestConfig } from 'axios'
 
 export const api = axios.create({
     baseURL: import.meta.env.VITE_API_BASE || "/api/v1"
 })
+
+const MAX_POST_RETRIES = 2
+const MAX_OVERLOAD_RETRIES = 2
+const MAX_RETRY_AFTER_SECONDS = 5
+
+/** Своя для каждой вкладки: по ней сервер направляет чтение после записи на основную БД */
+const CLIENT_ID_KEY = 'medcenter-client-id'
+
+function clientId(): string {
+    let id = sessionStorage.getItem(CLIENT_ID_KEY)
+    if (!id) {
+        id = crypto.randomUUID()
+        sessionStorage.setItem(CLIENT_ID_KEY, id)
+    }
+    return id
+}
+
+type RetryableConfig = InternalAxiosRequestConfig & { retryCount?: number, overloadRetryCount?: number }
+
+/** Каждый запрос несёт X-Client-Id вкладки */
+api.interceptors.request.use((config) => {
+    config.headers.set('X-Client-Id', clientId())
+    return config
+})
+
+/** Каждый POST получает Idempotency-Key, повторы отправляются с тем же ключом */
+api.interceptors.request.use((config) => {
+    if (config.method === 'post' && !config.headers.get('Idempotency-Key')) {
+        config.headers.set('Idempotency-Key', crypto.randomUUID())
+    }
+    return config
+})
+
+/** Сервер перегружен (503) или превышен лимит запросов (429): GET повторяется после Retry-After */
+api.interceptors.response.use(undefined, async (error: AxiosError) => {
+    const config = error.config as RetryableConfig | undefined
+    const status = error.response?.status
+    if (!config || config.method !== 'get' || (status !== 503 && status !== 429)) {
+        throw error
+    }
+    config.overloadRetryCount = (config.overloadRetryCount ?? 0) + 1
+    const retryAfter = Number(error.response?.headers['retry-after'])
+    if (config.overloadRetryCount > MAX_OVERLOAD_RETRIES || !(retryAfter <= MAX_RETRY_AFTER_SECONDS)) {
+        throw error
+    }
+    await new Promise((resolve) => setTimeout(resolve, retryAfter * 1000))
+    return api.request(config)
+})
+
+api.interceptors.response.use(undefined, async (error: AxiosError) => {
+    const config = error.config as RetryableConfig | undefined
+    if (!config || config.method !== 'post' || error.response) {
+        throw error
+    }
+    config.retryCount = (config.retryCount ?? 0) + 1
+    if (config.retryCount > MAX_POST_RETRIES) {
+        throw error
+    }
+    return api.request(config)
+})
@@ -0,0 +1,31 @@
+import { useEffect } from 'react'
+import { useQueryClient } from '@tanstack/react-query'
+import { api } from './api'
+
+const INVALIDATE_DEBOUNCE_MS = 300
+
+/**
+ * Подписка на поток изменений визитов (SSE).
+ * Вместо периодического опроса кеш визитов сбрасывается только при реальных изменениях.
+ */
+export function useVisitChangeFeed() {
+    const qc = useQueryClient()
+
+    useEffect(() => {
+        const url = new URL(`${api.defaults.baseURL}/visits/changes`, window.location.origin)
+        const source = new EventSource(url)
+        let timer: ReturnType<typeof setTimeout> | undefined
+
+        const invalidate = () => {
+            clearTimeout(timer)
+            timer = setTimeout(() => qc.invalidateQueries({ queryKey: ['visits'] }), INVALIDATE_DEBOUNCE_MS)
+        }
+        source.addEventListener('change', invalidate)
+        source.addEventListener('reset', invalidate)
+
+        return () => {
+            clearTimeout(timer)
+            source.close()
+        }
+    }, [qc])
+}
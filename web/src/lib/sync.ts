@@ -0,0 +1,77 @@
+import axios from 'axios'
+import { api } from './api'
+import type { ClientResponse, DoctorResponse, VisitResponse } from '../api'
+
+export type SyncEntity = 'clients' | 'doctors' | 'visits'
+
+type SyncResponse = {
+    clients: ClientResponse[]
+    doctors: DoctorResponse[]
+    visits: VisitResponse[]
+    deleted: Record<SyncEntity, string[]>
+    token: string
+    has_more: boolean
+}
+
+export type SyncCache = {
+    clients: Map<string, ClientResponse>
+    doctors: Map<string, DoctorResponse>
+    visits: Map<string, VisitResponse>
+}
+
+const ENTITIES: SyncEntity[] = ['clients', 'doctors', 'visits']
+
+/** Локальная копия справочников: после первой загрузки приходят только изменения */
+class SyncStore {
+    private cache: SyncCache = { clients: new Map(), doctors: new Map(), visits: new Map() }
+    private token: string | null = null
+    private running: Promise<SyncCache> | null = null
+
+    constructor(private readonly include: SyncEntity[]) {}
+
+    /** Догружает изменения с прошлого вызова, одновременные вызовы ждут один запрос */
+    sync(): Promise<SyncCache> {
+        this.running ??= this.pull().finally(() => { this.running = null })
+        return this.running
+    }
+
+    private async pull(): Promise<SyncCache> {
+        let hasMore = true
+        while (hasMore) {
+            let data: SyncResponse
+            try {
+                const res = await api.get<SyncResponse>('/sync/', {
+                    params: this.token ? { since: this.token } : { include: this.include },
+                    paramsSerializer: { indexes: null },
+                })
+                data = res.data
+            } catch (e) {
+                if (axios.isAxiosError(e) && e.response?.status === 410 && this.token) {
+                    // токен устарел: загружаем всё заново
+                    this.reset()
+                    continue
+                }
+                throw e
+            }
+            this.apply(data)
+            this.token = data.token
+            hasMore = data.has_more
+        }
+        return this.cache
+    }
+
+    private apply(data: SyncResponse) {
+        for (const entity of ENTITIES) {
+            const target = this.cache[entity] as Map<string, { id: string }>
+            for (const item of data[entity]) target.set(item.id, item)
+            for (const id of data.deleted[entity]) target.delete(id)
+        }
+    }
+
+    private reset() {
+        this.token = null
+        this.cache = { clients: new Map(), doctors: new Map(), visits: new Map() }
+    }
+}
+
+export const directorySync = new SyncStore(['clients', 'doctors'])